@@ -9,11 +9,46 @@ efficiently apply various backoff and retry strategies in your Python
 code.
 
 """
-from backoff_utils._backoff import backoff
+from backoff_utils._backoff import backoff, supports_async
 from backoff_utils._decorator import apply_backoff
+from backoff_utils._batch import backoff_map, BackoffResult
+from backoff_utils._policy import RetryPolicy, BackoffTimeoutError, AttemptTimeoutError
+from backoff_utils._clock import Clock, MonotonicClock, VirtualClock
+from backoff_utils._budget import RetryBudget
+from backoff_utils._circuit_breaker import CircuitBreaker, CircuitOpenError
+from backoff_utils._events import RetryListener, RetryEvent
+from backoff_utils._metrics import RetryMetrics
+from backoff_utils._tracing import TracingListener
+from backoff_utils._adaptive import AdaptiveController
+from backoff_utils._retry_after import parse_retry_after
+from backoff_utils._hedge import Hedge
+from backoff_utils._single_flight import SingleFlight
 
 
 __all__ = [
     'backoff',
-    'apply_backoff'
+    'apply_backoff',
+    'backoff_map',
+    'BackoffResult',
+    'RetryPolicy',
+    'RetryBudget',
+    'CircuitBreaker',
+    'RetryListener',
+    'RetryEvent',
+    'RetryMetrics',
+    'TracingListener',
+    'AdaptiveController',
+    'parse_retry_after',
+    'Hedge',
+    'SingleFlight',
+    'BackoffTimeoutError',
+    'AttemptTimeoutError',
+    'CircuitOpenError',
+    'Clock',
+    'MonotonicClock',
+    'VirtualClock'
 ]
+
+if supports_async:
+    from backoff_utils._async_backoff import async_backoff
+    __all__.append('async_backoff')
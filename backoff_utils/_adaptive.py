@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._adaptive
+#########################
+
+Implements the :class:`AdaptiveController` class, which learns how long to wait
+between attempts from the outcomes of the backoff calls it observes, and which
+is applied by the :class:`Adaptive <backoff_utils.strategies.Adaptive>`
+strategy.
+
+"""
+from validator_collection import validators, checkers
+
+from backoff_utils._events import RetryListener
+from backoff_utils._shared import _Shared
+
+
+class AdaptiveController(RetryListener, _Shared):
+    """A thread-safe record of how a dependency has been behaving, shared between
+    any number of backoff calls, which adjusts the delay applied by the
+    :class:`Adaptive <backoff_utils.strategies.Adaptive>` strategy using
+    *additive-increase / multiplicative-decrease* (AIMD):
+
+    * each failed attempt multiplies the delay by ``increase`` (up to
+      ``max_delay``), so calls back off quickly while the dependency is down,
+      and
+    * each successful attempt subtracts ``decrease`` seconds from the delay (down
+      to ``min_delay``), so delays shrink gradually once it has recovered.
+
+    The controller also keeps an exponentially-weighted moving average of the
+    :attr:`success_rate` of attempts, and of the :attr:`recovery_time`: the
+    number of seconds calls that failed took to succeed. The first retry of a
+    call never waits longer than the recovery time, so calls do not keep sleeping
+    for a second when the dependency usually recovers within milliseconds.
+
+    Any number of strategies can share a controller, typically by name using
+    :func:`named() <AdaptiveController.named>`:
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, strategies
+
+      @apply_backoff(strategies.Adaptive(controller = 'inventory-service'),
+                     max_tries = 5)
+      def get_inventory(item_id):
+          pass
+
+    The controller learns from the calls it observes as a
+    :class:`RetryListener <backoff_utils._events.RetryListener>`, and is notified
+    automatically by any backoff call that applies an
+    :class:`Adaptive <backoff_utils.strategies.Adaptive>` strategy. Every failed
+    attempt counts as a failure, including attempts whose error is not retried
+    and attempts whose result is rejected by ``retry_on_result``.
+    """
+
+    _REGISTRY = {}
+
+    def __init__(self,
+                 initial_delay = 1.0,
+                 min_delay = 0.05,
+                 max_delay = 60.0,
+                 increase = 2.0,
+                 decrease = 0.1,
+                 smoothing = 0.2):
+        """
+        :param initial_delay: The number of seconds to delay before the controller
+          has observed any attempts. Defaults to ``1.0``.
+        :type initial_delay: :class:`float <python:float>`
+
+        :param min_delay: The shortest delay (in seconds) the controller will
+          apply. Defaults to ``0.05``.
+        :type min_delay: :class:`float <python:float>`
+
+        :param max_delay: The longest delay (in seconds) the controller will
+          apply. Defaults to ``60.0``.
+        :type max_delay: :class:`float <python:float>`
+
+        :param increase: The factor the delay is multiplied by after each failed
+          attempt. Defaults to ``2.0``.
+        :type increase: :class:`float <python:float>`
+
+        :param decrease: The number of seconds subtracted from the delay after
+          each successful attempt. Defaults to ``0.1``.
+        :type decrease: :class:`float <python:float>`
+
+        :param smoothing: The weight given to each new observation by the moving
+          averages of the :attr:`success_rate` and :attr:`recovery_time`, between
+          ``0`` (exclusive) and ``1``. Defaults to ``0.2``.
+        :type smoothing: :class:`float <python:float>`
+
+        :raises ValueError: if ``min_delay`` is not positive, ``max_delay`` is
+          less than ``min_delay``, ``increase`` is less than ``1``,
+          ``decrease`` is negative, or ``smoothing`` is not between ``0`` and
+          ``1``
+        """
+        super(AdaptiveController, self).__init__()
+
+        self.min_delay = validators.float(min_delay, minimum = 0)
+        if not self.min_delay:
+            raise ValueError('min_delay must be greater than 0')
+        self.max_delay = validators.float(max_delay, minimum = self.min_delay)
+        self.increase = validators.float(increase, minimum = 1)
+        self.decrease = validators.float(decrease, minimum = 0)
+        self.smoothing = validators.float(smoothing, minimum = 0, maximum = 1)
+        if not self.smoothing:
+            raise ValueError('smoothing must be greater than 0')
+
+        self.initial_delay = validators.float(initial_delay, minimum = 0)
+        self._setup()
+        self.reset()
+
+    def __repr__(self):
+        return '<{}(min_delay = {}, max_delay = {}, increase = {}, ' \
+               'decrease = {})>'.format(self.__class__.__name__,
+                                        self.min_delay,
+                                        self.max_delay,
+                                        self.increase,
+                                        self.decrease)
+
+    @property
+    def delay(self):
+        """The number of seconds currently applied between attempts.
+
+        :rtype: :class:`float <python:float>`
+        """
+        return self._delay
+
+    @property
+    def success_rate(self):
+        """The moving average of the proportion of attempts that succeeded, or
+        :class:`None <python:None>` if no attempts have been observed.
+
+        :rtype: :class:`float <python:float>` / :class:`None <python:None>`
+        """
+        return self._success_rate
+
+    @property
+    def recovery_time(self):
+        """The moving average of the number of seconds between the first failed
+        attempt of a call and the start of its successful attempt, or
+        :class:`None <python:None>` if no call has recovered yet.
+
+        :rtype: :class:`float <python:float>` / :class:`None <python:None>`
+        """
+        return self._recovery_time
+
+    def reset(self):
+        """Forget every outcome observed so far, returning to the
+        ``initial_delay``."""
+        with self._lock:
+            self._delay = min(self.max_delay, max(self.min_delay,
+                                                  self.initial_delay))
+            self._success_rate = None
+            self._recovery_time = None
+
+    def _average(self, average, value):
+        """Return the moving ``average`` updated with ``value``."""
+        if average is None:
+            return float(value)
+
+        return average + self.smoothing * (value - average)
+
+    def record_success(self, recovery_time = None):
+        """Record a successful attempt, shrinking the delay by ``decrease``.
+
+        :param recovery_time: If the attempt succeeded after earlier attempts of
+          the same call failed, the number of seconds it took to recover.
+        :type recovery_time: :class:`float <python:float>` /
+          :class:`None <python:None>`
+        """
+        with self._lock:
+            self._delay = max(self.min_delay, self._delay - self.decrease)
+            self._success_rate = self._average(self._success_rate, 1)
+            if recovery_time is not None:
+                self._recovery_time = self._average(self._recovery_time,
+                                                    max(0.0, recovery_time))
+
+    def record_failure(self):
+        """Record a failed attempt, growing the delay by a factor of
+        ``increase``."""
+        with self._lock:
+            self._delay = min(self.max_delay, self._delay * self.increase)
+            self._success_rate = self._average(self._success_rate, 0)
+
+    def on_attempt_end(self, event):
+        if event.failed:
+            event.state.setdefault(self, event.elapsed)
+            self.record_failure()
+            return
+
+        failed_at = event.state.pop(self, None)
+        if failed_at is None:
+            self.record_success()
+        else:
+            self.record_success(event.elapsed - event.duration - failed_at)
+
+
+def _get_adaptive_controller(value):
+    """Return ``value`` as an :class:`AdaptiveController`, looking it up by name
+    if it is a string, or creating a new one if it is
+    :class:`None <python:None>`.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, an
+      :class:`AdaptiveController`, or a name
+    """
+    if value is None:
+        return AdaptiveController()
+    if isinstance(value, AdaptiveController):
+        return value
+
+    if checkers.is_string(value):
+        return AdaptiveController.named(value)
+
+    raise TypeError('controller must be None, an AdaptiveController, or a name')
@@ -0,0 +1,653 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._async_backoff
+##############################
+
+Implements the ``async_backoff()`` coroutine which awaits a function/coroutine
+call and retries on failure based on arguments passed to the ``async_backoff()``
+coroutine, sleeping using :func:`asyncio.sleep() <python:asyncio.sleep>` so that
+the event loop is never blocked.
+
+.. note::
+
+  This module relies on ``async`` / ``await`` syntax, and is only available on
+  Python 3.5 or higher.
+
+"""
+import asyncio
+import inspect
+from functools import wraps
+
+from backoff_utils._backoff import _validate_arguments
+from backoff_utils._clock import DEFAULT_CLOCK
+from backoff_utils._events import _RejectedResult
+from backoff_utils._policy import AttemptTimeoutError, RetryPolicy
+
+
+async def async_backoff(to_execute,
+                        args = None,
+                        kwargs = None,
+                        strategy = None,
+                        retry_execute = None,
+                        retry_args = None,
+                        retry_kwargs = None,
+                        max_tries = None,
+                        max_delay = None,
+                        catch_exceptions = None,
+                        on_failure = None,
+                        on_success = None,
+                        clock = None,
+                        skip_late_attempt = False,
+                        sleeper = None,
+                        retry_budget = None,
+                        circuit_breaker = None,
+                        listeners = None,
+                        giveup = None,
+                        retry_on_result = None,
+                        retry_after = None,
+                        retry_after_overrides = False,
+                        hedge = None,
+                        attempt_timeout = None,
+                        single_flight = None):
+    """Retry a (coroutine) function call multiple times with a delay per the
+    strategy given, without blocking the event loop.
+
+    Accepts the same arguments as :func:`backoff() <backoff_utils._backoff.backoff>`.
+    If ``to_execute`` or ``retry_execute`` return an awaitable (e.g. because they
+    are ``async def`` functions), the awaitable is awaited. Unless a ``sleeper``
+    is supplied, delays between attempts are applied using
+    :func:`asyncio.sleep() <python:asyncio.sleep>`.
+
+    :param to_execute: The function call that is to be attempted.
+    :type to_execute: callable / coroutine function
+
+    :param args: The positional arguments to pass to the function on the first attempt.
+
+      If ``retry_args`` is :class:`None <python:None>`, will re-use these
+      arguments on retry attempts as well.
+    :type args: iterable / :class:`None <python:None>`.
+
+    :param kwargs: The keyword arguments to pass to the function on the first attempt.
+
+      If ``retry_kwargs`` is :class:`None <python:None>`, will re-use these keyword
+      arguments on retry attempts as well.
+    :type kwargs: :class:`dict <python:dict>` / :class:`None <python:None>`
+
+    :param strategy: The :class:`BackoffStrategy` to use when determining the
+      delay between retry attempts.
+
+      If :class:`None <python:None>`, defaults to :class:`Exponential`.
+    :type strategy: :class:`BackoffStrategy`
+
+    :param retry_execute: The function to call on retry attempts.
+
+      If :class:`None <python:None>`, will retry ``to_execute``.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_execute: callable / coroutine function / :class:`None <python:None>`
+
+    :param retry_args: The positional arguments to pass to the function on retry attempts.
+
+      If :class:`None <python:None>`, will re-use ``args``.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_args: iterable / :class:`None <python:None>`
+
+    :param retry_kwargs: The keyword arguments to pass to the function on retry attempts.
+
+      If :class:`None <python:None>`, will re-use ``kwargs``.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_kwargs: :class:`dict <python:dict>` / :class:`None <python:None>`
+
+    :param max_tries: The maximum number of times to attempt the call.
+
+      If :class:`None <python:None>`, will apply an environment variable
+      ``BACKOFF_DEFAULT_TRIES``. If that environment variable is not set, will
+      apply a default of ``3``.
+    :type max_tries: int / :class:`None <python:None>`
+
+    :param max_delay: The maximum number of seconds to wait befor giving up
+      once and for all. If :class:`None <python:None>`, will apply an environment variable
+      ``BACKOFF_DEFAULT_DELAY`` if that environment variable is set. If it is not
+      set, will not apply a max delay at all.
+
+      The delay before each retry attempt is shortened if necessary so that it
+      does not overshoot ``max_delay``.
+    :type max_delay: :class:`None <python:None>` / int
+
+    :param catch_exceptions: The exception class (or classes) to catch and retry.
+      As with an ``except`` clause, subclasses of these classes are caught too. If
+      :class:`None <python:None>`, will catch all exceptions.
+
+      Defaults to :class:`None <python:None>`.
+
+      .. note::
+
+        The older ``type(ValueError())`` form is still supported, and is equivalent
+        to ``ValueError``. Exception instances are also accepted, and match their
+        class.
+
+    :type catch_exceptions: :class:`Exception <python:Exception>` class /
+      iterable of :class:`Exception <python:Exception>` classes /
+      :class:`None <python:None>`
+
+    :param on_failure: The :class:`exception <python:Exception>` or function to call
+      when all retry attempts have failed.
+
+      Defaults to :class:`None <python:None>`.
+    :type on_failure: :class:`Exception <python:Exception>` / function /
+      :class:`None <python:None>`
+
+    :param on_success: The function to call when the operation was successful.
+
+      Defaults to :class:`None <python:None>`.
+    :type on_success: callable / :class:`None <python:None>`
+
+    :param clock: The :class:`Clock <backoff_utils._clock.Clock>` used to measure
+      elapsed time against ``max_delay``.
+
+      If :class:`None <python:None>`, applies a
+      :class:`MonotonicClock <backoff_utils._clock.MonotonicClock>`, which is
+      unaffected by changes to the system's wall-clock time.
+
+      Defaults to :class:`None <python:None>`.
+    :type clock: :class:`Clock <backoff_utils._clock.Clock>` /
+      :class:`None <python:None>`
+
+    :param skip_late_attempt: If ``True``, will give up as soon as the delay
+      before the next attempt would reach ``max_delay``, rather than making one
+      final attempt just as ``max_delay`` elapses. Has no effect if there is no
+      ``max_delay``.
+
+      Defaults to ``False``.
+    :type skip_late_attempt: :class:`bool <python:bool>`
+
+    :param sleeper: The function to call to wait between retry attempts, which
+      receives the number of seconds to wait.
+
+      If :class:`None <python:None>`, applies the ``clock``'s ``sleep()`` method
+      if it has one (e.g. a :class:`VirtualClock <backoff_utils._clock.VirtualClock>`),
+      and otherwise :func:`asyncio.sleep() <python:asyncio.sleep>`.
+      If ``sleeper`` returns an awaitable, it is awaited.
+
+      Defaults to :class:`None <python:None>`.
+    :type sleeper: callable / :class:`None <python:None>`
+
+    :param retry_budget: The :class:`RetryBudget <backoff_utils._budget.RetryBudget>`
+      (or the name of the budget) to withdraw a token from before each retry
+      attempt, and to deposit in after each successful call. If the budget is
+      exhausted, will give up rather than retrying, even if ``max_tries`` has not
+      been reached.
+
+      If :class:`None <python:None>`, retries are not limited by a budget.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_budget: :class:`RetryBudget <backoff_utils._budget.RetryBudget>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param circuit_breaker: The
+      :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` (or
+      the name of the circuit breaker) that records the outcome of each attempt.
+      While it is open, will raise
+      :class:`CircuitOpenError <backoff_utils._circuit_breaker.CircuitOpenError>`
+      instead of making the first attempt, and will give up rather than
+      retrying.
+
+      If :class:`None <python:None>`, no circuit breaker is applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type circuit_breaker: :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param listeners: The :class:`RetryListener <backoff_utils._events.RetryListener>`
+      (or listeners) to notify as each attempt starts and ends, before each
+      retry, and when giving up.
+
+      If :class:`None <python:None>`, no events are created.
+
+      Defaults to :class:`None <python:None>`.
+    :type listeners: :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      iterable of :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      :class:`None <python:None>`
+
+    :param giveup: A function that receives each exception caught per
+      ``catch_exceptions``, and returns ``True`` if the call should give up rather
+      than retry it (e.g. because an HTTP error's status code shows that retrying
+      will not help). If :class:`None <python:None>`, every exception caught is
+      retried.
+
+      Defaults to :class:`None <python:None>`.
+    :type giveup: callable / :class:`None <python:None>`
+
+    :param retry_on_result: A function that receives the value returned by each
+      attempt, and returns ``True`` if the attempt should be retried as if it had
+      failed (e.g. because it returned :class:`None <python:None>` or an HTTP 503
+      response). If the call gives up while the value is still rejected (e.g.
+      because ``max_tries`` has been reached), the last value is returned and
+      ``on_success`` is not called. If :class:`None <python:None>`, every value
+      returned is accepted.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_on_result: callable / :class:`None <python:None>`
+
+    :param retry_after: A function that receives each exception caught per
+      ``catch_exceptions`` (or each value rejected by ``retry_on_result``), and
+      returns the number of seconds the server asked to wait before retrying
+      (e.g. read from an HTTP ``Retry-After`` header using
+      :func:`parse_retry_after() <backoff_utils._retry_after.parse_retry_after>`),
+      or :class:`None <python:None>` if it gave no hint. The strategy's delay is
+      lengthened to at least the hint (or replaced by it, per
+      ``retry_after_overrides``). If waiting as long as the hint asks would
+      overshoot ``max_delay``, the call gives up instead. If
+      :class:`None <python:None>`, the strategy's delays are applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_after: callable / :class:`None <python:None>`
+
+    :param retry_after_overrides: If ``True``, the delay returned by
+      ``retry_after`` replaces the strategy's delay, even if it is shorter. If
+      ``False``, it only ever lengthens the strategy's delay. Defaults to
+      ``False``.
+    :type retry_after_overrides: :class:`bool <python:bool>`
+
+    :param hedge: The :class:`Hedge <backoff_utils._hedge.Hedge>` (or the name of
+      a shared hedge) to apply to the first attempt of each call. If the first
+      attempt is slower than the hedge's threshold, a second attempt is made in
+      parallel (per ``retry_execute``), and the first to succeed is returned.
+
+      If :class:`None <python:None>`, calls are not hedged.
+
+      Defaults to :class:`None <python:None>`.
+    :type hedge: :class:`Hedge <backoff_utils._hedge.Hedge>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param attempt_timeout: The number of seconds each attempt may take before it
+      is abandoned and retried. Either a fixed number of seconds, or a
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` whose
+      delays are applied as the timeouts of successive attempts (so that timeouts
+      can grow from one attempt to the next). No attempt runs past ``max_delay``.
+
+      Attempts are timed out using
+      :func:`asyncio.wait_for() <python:asyncio.wait_for>`, which cancels them.
+      An attempt that blocks the event loop (e.g. a regular function that does
+      not return an awaitable) cannot be timed out.
+
+      If :class:`None <python:None>`, attempts may take as long as they take.
+
+      Defaults to :class:`None <python:None>`.
+    :type attempt_timeout: :class:`float <python:float>` /
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` /
+      :class:`None <python:None>`
+
+    :param single_flight: The
+      :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` (or the name
+      of a shared single-flight) that coalesces concurrent calls. A call made while
+      an identical call (of the same function, with the same key) is in flight
+      waits for it, and shares its outcome rather than running its own retry loop.
+
+      If :class:`None <python:None>`, calls are not coalesced.
+
+      Defaults to :class:`None <python:None>`.
+
+      .. note::
+
+        Unlike :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>`,
+        ``single_flight = True`` is not supported: a new single-flight applied to
+        each call would never have an identical call in flight to coalesce with.
+    :type single_flight: :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :returns: The result of the attempted function.
+
+    :raises ValueError: if ``to_execute`` is :class:`None <python:None>`, or
+      ``single_flight`` is ``True``
+
+    Example:
+
+    .. code-block:: python
+
+      from backoff_utils import async_backoff
+
+      async def some_function(arg1, arg2, kwarg1 = None):
+          # Coroutine does something
+          pass
+
+      result = await async_backoff(some_function,
+                                   args = ['value1', 'value2'],
+                                   kwargs = { 'kwarg1': 'value3' },
+                                   max_tries = 3,
+                                   max_delay = 30,
+                                   strategy = strategies.Exponential)
+
+    """
+    (to_execute,
+     args,
+     kwargs,
+     retry_execute,
+     retry_args,
+     retry_kwargs) = _validate_arguments(to_execute,
+                                         args,
+                                         kwargs,
+                                         retry_execute,
+                                         retry_args,
+                                         retry_kwargs,
+                                         single_flight = single_flight)
+
+    policy = RetryPolicy(strategy = strategy,
+                         max_tries = max_tries,
+                         max_delay = max_delay,
+                         catch_exceptions = catch_exceptions,
+                         on_failure = on_failure,
+                         on_success = on_success,
+                         clock = clock,
+                         skip_late_attempt = skip_late_attempt,
+                         sleeper = sleeper,
+                         retry_budget = retry_budget,
+                         circuit_breaker = circuit_breaker,
+                         listeners = listeners,
+                         giveup = giveup,
+                         retry_on_result = retry_on_result,
+                         retry_after = retry_after,
+                         retry_after_overrides = retry_after_overrides,
+                         hedge = hedge,
+                         attempt_timeout = attempt_timeout,
+                         single_flight = single_flight)
+
+    return await _execute_async(policy,
+                                to_execute,
+                                args = args,
+                                kwargs = kwargs,
+                                retry_execute = retry_execute,
+                                retry_args = retry_args,
+                                retry_kwargs = retry_kwargs)
+
+
+async def _execute_async(policy,
+                         to_execute,
+                         args = None,
+                         kwargs = None,
+                         retry_execute = None,
+                         retry_args = None,
+                         retry_kwargs = None):
+    """Await ``to_execute``, applying ``policy`` and falling back to
+    ``retry_execute`` on retry attempts.
+
+    This is the asynchronous equivalent of
+    :func:`RetryPolicy.execute() <backoff_utils._policy.RetryPolicy.execute>`.
+
+    :param policy: The policy to apply.
+    :type policy: :class:`RetryPolicy <backoff_utils._policy.RetryPolicy>`
+
+    :returns: The result of the attempted function.
+    """
+    args = args or ()
+    kwargs = kwargs or {}
+    if retry_execute is None:
+        retry_execute = to_execute
+    if not retry_args:
+        retry_args = args
+    if not retry_kwargs:
+        retry_kwargs = kwargs
+
+    if policy.single_flight is not None:
+        return await _coalesced(policy.single_flight,
+                                policy,
+                                to_execute,
+                                args,
+                                kwargs,
+                                retry_execute,
+                                retry_args,
+                                retry_kwargs)
+
+    return await _attempt_all(policy,
+                              to_execute,
+                              args,
+                              kwargs,
+                              retry_execute,
+                              retry_args,
+                              retry_kwargs)
+
+
+async def _attempt_all(policy,
+                       to_execute,
+                       args,
+                       kwargs,
+                       retry_execute,
+                       retry_args,
+                       retry_kwargs):
+    """Await ``to_execute``, applying ``policy`` (other than its
+    ``single_flight``) to arguments already normalized by
+    :func:`_execute_async`.
+
+    :returns: The result of the attempted function.
+    """
+    deadline = None
+    if policy.max_delay is not None:
+        deadline = policy.clock.now() + policy.max_delay
+        policy._check_timeout(deadline)                                         # pylint: disable=protected-access
+
+    policy._check_circuit()                                                     # pylint: disable=protected-access
+
+    observer = policy._observe(to_execute)                                      # pylint: disable=protected-access
+    timeouts = policy._timeouts()                                               # pylint: disable=protected-access
+    delays = None
+    failover_counter = 0
+    while True:
+        if observer is not None:
+            observer.attempt_start(failover_counter + 1)
+        try:
+            if failover_counter == 0 and policy.hedge is not None:
+                attempt = _hedged_attempt(policy.hedge,
+                                          to_execute,
+                                          args,
+                                          kwargs,
+                                          retry_execute,
+                                          retry_args,
+                                          retry_kwargs)
+            elif failover_counter == 0:
+                attempt = _attempt(to_execute, args, kwargs)
+            else:
+                attempt = _attempt(retry_execute, retry_args, retry_kwargs)
+            if timeouts is None:
+                return_value = await attempt
+            else:
+                timeout = policy._next_timeout(timeouts, deadline)              # pylint: disable=protected-access
+                try:
+                    return_value = await asyncio.wait_for(attempt, timeout)
+                except asyncio.TimeoutError:
+                    raise AttemptTimeoutError('attempt did not complete within '
+                                              '{} seconds'.format(timeout))
+        except asyncio.CancelledError:
+            raise
+        except Exception as attempt_error:                                      # pylint: disable=broad-except
+            error = attempt_error
+        else:
+            if policy.retry_on_result is None or \
+               not policy.retry_on_result(return_value):
+                if observer is not None:
+                    observer.attempt_end(failover_counter + 1, value = return_value)
+
+                policy._handle_success(return_value)                            # pylint: disable=protected-access
+
+                return return_value
+
+            error = _RejectedResult(return_value)
+
+        if observer is not None:
+            observer.attempt_end(failover_counter + 1, error = error)
+
+        if delays is None:
+            delays = policy.strategy.schedule()
+        delay = policy._plan_retry(error,                                       # pylint: disable=protected-access
+                                   failover_counter,
+                                   delays,
+                                   deadline)
+        if delay is None:
+            if observer is not None:
+                observer.giveup(failover_counter + 1, error)
+            return policy._give_up(error)                                       # pylint: disable=protected-access
+
+        if observer is not None:
+            observer.retry(failover_counter + 1, error, delay)
+        if policy.sleeper is None:
+            await asyncio.sleep(delay)
+        else:
+            slept = policy.sleeper(delay)
+            if inspect.isawaitable(slept):
+                await slept
+        failover_counter += 1
+
+
+async def _coalesced(single_flight,
+                     policy,
+                     to_execute,
+                     args,
+                     kwargs,
+                     retry_execute,
+                     retry_args,
+                     retry_kwargs):
+    """Await ``to_execute`` per :func:`_attempt_all`, unless an identical call
+    is already in flight on the running event loop, in which case await its
+    outcome instead.
+
+    This is the asynchronous equivalent of
+    :func:`SingleFlight._call() <backoff_utils._single_flight.SingleFlight._call>`:
+    followers await a future that the leader completes. If the leader is
+    cancelled, its followers make their own calls instead.
+
+    :returns: The value returned by the call in flight.
+
+    :raises Exception: the error raised by the call in flight
+    """
+    loop = asyncio.get_event_loop()
+    key = (loop, single_flight._key(to_execute, args, kwargs))                  # pylint: disable=protected-access
+    flight, leader = single_flight._join(key, loop.create_future)               # pylint: disable=protected-access
+    if not leader:
+        completed, return_value = await asyncio.shield(flight)
+        if not completed:
+            return await _attempt_all(policy,
+                                      to_execute,
+                                      args,
+                                      kwargs,
+                                      retry_execute,
+                                      retry_args,
+                                      retry_kwargs)
+        return return_value
+
+    try:
+        return_value = await _attempt_all(policy,
+                                          to_execute,
+                                          args,
+                                          kwargs,
+                                          retry_execute,
+                                          retry_args,
+                                          retry_kwargs)
+        flight.set_result((True, return_value))
+    except asyncio.CancelledError:
+        raise
+    except Exception as error:                                                  # pylint: disable=broad-except
+        flight.set_exception(error)
+        # Mark the error as retrieved, in case no followers await it.
+        flight.exception()
+        raise
+    finally:
+        single_flight._land(key)                                                # pylint: disable=protected-access
+        if not flight.done():
+            flight.set_result((False, None))
+
+    return return_value
+
+
+async def _attempt(to_execute, args, kwargs):
+    """Call ``to_execute`` with ``args`` and ``kwargs``, awaiting its result if
+    it is awaitable."""
+    return_value = to_execute(*args, **kwargs)
+    if inspect.isawaitable(return_value):
+        return_value = await return_value
+
+    return return_value
+
+
+async def _hedged_attempt(hedge,
+                          to_execute,
+                          args,
+                          kwargs,
+                          hedge_execute,
+                          hedge_args,
+                          hedge_kwargs):
+    """Await the first attempt of a call, hedging it with ``hedge_execute`` if
+    it takes longer than the ``hedge``'s threshold.
+
+    This is the asynchronous equivalent of
+    :func:`Hedge._call() <backoff_utils._hedge.Hedge._call>`: each attempt runs
+    as a task, and the attempt that loses is cancelled.
+
+    :returns: The value returned by the first attempt to succeed.
+
+    :raises Exception: the first error raised, if every attempt fails
+    """
+    threshold = hedge._start()                                                  # pylint: disable=protected-access
+    started_at = DEFAULT_CLOCK.now()
+    if threshold is None:
+        try:
+            return await _attempt(to_execute, args, kwargs)
+        finally:
+            hedge._record(DEFAULT_CLOCK.now() - started_at)                     # pylint: disable=protected-access
+
+    primary = asyncio.ensure_future(_attempt(to_execute, args, kwargs))
+    primary.add_done_callback(
+        lambda task: hedge._record(DEFAULT_CLOCK.now() - started_at)            # pylint: disable=protected-access
+    )
+    tasks = [primary]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout = threshold)
+        if done or not hedge._try_hedge():                                      # pylint: disable=protected-access
+            return await primary
+
+        tasks.append(asyncio.ensure_future(_attempt(hedge_execute,
+                                                    hedge_args,
+                                                    hedge_kwargs)))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending,
+                                               return_when = asyncio.FIRST_COMPLETED)
+            for task in tasks:
+                if task not in done:
+                    continue
+                if task.exception() is None:
+                    return task.result()
+                if error is None:
+                    error = task.exception()
+
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+def _apply_async_backoff(func, policy):
+    """Wrap the coroutine function ``func`` so that calls to it are retried
+    under ``policy``.
+
+    Used by :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>` when
+    it decorates an ``async def`` function.
+
+    :param func: The coroutine function to wrap.
+    :type func: coroutine function
+
+    :param policy: The policy to apply.
+    :type policy: :class:`RetryPolicy <backoff_utils._policy.RetryPolicy>`
+
+    :returns: A coroutine function with the same signature as ``func``.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await _execute_async(policy, func, args, kwargs)
+
+    wrapper.retry_policy = policy
+
+    return wrapper
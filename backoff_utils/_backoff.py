@@ -8,73 +8,55 @@ Implements the ``backoff()`` function which executes a function/method call
 and retries on failure based on arguments passed to the ``backoff()`` function.
 
 """
-import os
-from datetime import datetime
-import sys
-
-from validator_collection import validators, checkers
-
-import backoff_utils.strategies as strategies
-
-_ver = sys.version_info
-
-#: Python 2.x?
-is_py2 = (_ver[0] == 2)
-
-
-DEFAULT_MAX_TRIES = os.environ.get('BACKOFF_DEFAULT_TRIES', 3)
-DEFAULT_MAX_DELAY = os.environ.get('BACKOFF_DEFAULT_DELAY', None)
-
-
-class BackoffTimeoutError(Exception):
-    """Error that is raised if a backoff strategy timed out without raising
-    a different exception."""
-    pass
-
+from validator_collection import validators
+
+from backoff_utils._policy import RetryPolicy, BackoffTimeoutError, \
+    DEFAULT_MAX_TRIES, DEFAULT_MAX_DELAY, is_py2, supports_async, \
+    _handle_failure                                                             # pylint: disable=unused-import
+
+
+def _validate_arguments(to_execute,
+                        args,
+                        kwargs,
+                        retry_execute,
+                        retry_args,
+                        retry_kwargs,
+                        single_flight = None):
+    """Validate the callables and arguments supplied to :func:`backoff` or
+    :func:`async_backoff() <backoff_utils._async_backoff.async_backoff>`.
+
+    :returns: ``to_execute``, ``args``, ``kwargs``, ``retry_execute``,
+      ``retry_args``, and ``retry_kwargs``, validated.
+    :rtype: :class:`tuple <python:tuple>`
+
+    :raises ValueError: if ``to_execute`` is :class:`None <python:None>`, or
+      ``single_flight`` is ``True`` (which would apply a new single-flight to each
+      call, and so never coalesce anything)
+    :raises TypeError: if ``to_execute`` or ``retry_execute`` are not callable
+    """
+    if to_execute is None:
+        raise ValueError('to_execute cannot be None')
+    elif not callable(to_execute):
+        raise TypeError('to_execute must be callable')
 
-def _handle_failure(on_failure = None,
-                    error = None):
-    """Handle the failure of a function called by :ref:`backoff`.
+    if single_flight is True:
+        raise ValueError('single_flight = True would apply a new single-flight to '
+                         'each call, so supply a shared SingleFlight (or the name '
+                         'of one) instead')
 
-    :param on_failure: The :class:`Exception <python:Exception>` or function to call
-      when all retry attempts have failed. If :class:`None <python:None>`, will raise the last-caught
-      :class:`Exception <python:Exception>`. If an :class:`Exception <python:Exception>`,
-      will raise the exception with the same message as the last-caught exception.
-      If a function, will call the function and pass the last-raised exception, its
-      message, and stacktrace to the function. Defaults to :class:`None <python:None>`.
-    :type on_failure: :class:`Exception <python:Exception>` / function / :class:`None <python:None>`
+    if retry_execute is not None and not callable(retry_execute):
+        raise TypeError('retry_execute must be None or a callable')
 
-    :param error: The :class:`Exception <python:Exception>` that was raised. Defaults
-      to :class:`Exception <python:Exception>`.
-    :type error: :class:`Exception <python:Exception>`
-    """
-    if error is None:
-        error = Exception
-
-    is_on_failure_an_exception = False
-    if is_py2:
-        if isinstance(on_failure, Exception):
-            is_on_failure_an_exception = True
-        elif checkers.is_type(on_failure, 'type'):
-            is_on_failure_an_exception = isinstance(on_failure(), Exception)
-        else:
-            is_on_failure_an_exception = False
-    else:
-        is_on_failure_an_exception = checkers.is_type(on_failure,
-                                                      ('type', 'Exception')) and \
-                                     hasattr(on_failure, '__cause__')
-
-
-    if on_failure is None:
-        raise error
-    elif is_on_failure_an_exception:
-        raise on_failure(error.args[0])
-    else:
-        try:
-            on_failure(error, error.args[0], sys.exc_info()[2])
-        except Exception as nested_error:
-            raise nested_error
+    if args and not isinstance(args, (list, tuple)):
+        args = validators.iterable(args)
+    if kwargs and not isinstance(kwargs, dict):
+        kwargs = validators.dict(kwargs)
+    if retry_args and not isinstance(retry_args, (list, tuple)):
+        retry_args = validators.iterable(retry_args)
+    if retry_kwargs and not isinstance(retry_kwargs, dict):
+        retry_kwargs = validators.dict(retry_kwargs)
 
+    return to_execute, args, kwargs, retry_execute, retry_args, retry_kwargs
 
 
 def backoff(to_execute,
@@ -88,7 +70,20 @@ def backoff(to_execute,
             max_delay = None,
             catch_exceptions = None,
             on_failure = None,
-            on_success = None):
+            on_success = None,
+            clock = None,
+            skip_late_attempt = False,
+            sleeper = None,
+            retry_budget = None,
+            circuit_breaker = None,
+            listeners = None,
+            giveup = None,
+            retry_on_result = None,
+            retry_after = None,
+            retry_after_overrides = False,
+            hedge = None,
+            attempt_timeout = None,
+            single_flight = None):
     """Retry a function call multiple times with a delay per the strategy given.
 
     :param to_execute: The function call that is to be attempted.
@@ -144,33 +139,26 @@ def backoff(to_execute,
       once and for all. If :class:`None <python:None>`, will apply an environment variable
       ``BACKOFF_DEFAULT_DELAY`` if that environment variable is set. If it is not
       set, will not apply a max delay at all.
+
+      The delay before each retry attempt is shortened if necessary so that it
+      does not overshoot ``max_delay``.
     :type max_delay: :class:`None <python:None>` / int
 
-    :param catch_exceptions: The ``type(exception)`` to catch and retry. If
+    :param catch_exceptions: The exception class (or classes) to catch and retry.
+      As with an ``except`` clause, subclasses of these classes are caught too. If
       :class:`None <python:None>`, will catch all exceptions.
 
       Defaults to :class:`None <python:None>`.
 
-      .. caution::
-
-        The iterable must contain one or more types of exception *instances*, and not
-        class objects. For example:
-
-        .. code-block:: python
-
-          # GOOD:
-          catch_exceptions = (type(ValueError()), type(TypeError()))
+      .. note::
 
-          # BAD:
-          catch_exceptions = (type(ValueError), type(ValueError))
+        The older ``type(ValueError())`` form is still supported, and is equivalent
+        to ``ValueError``. Exception instances are also accepted, and match their
+        class.
 
-          # BAD:
-          catch_exceptions = (ValueError, TypeError)
-
-          # BAD:
-          catch_exceptions = (ValueError(), TypeError())
-
-    :type catch_exceptions: iterable of form ``[type(exception()), ...]``
+    :type catch_exceptions: :class:`Exception <python:Exception>` class /
+      iterable of :class:`Exception <python:Exception>` classes /
+      :class:`None <python:None>`
 
     :param on_failure: The :class:`exception <python:Exception>` or function to call
       when all retry attempts have failed.
@@ -198,8 +186,159 @@ def backoff(to_execute,
       Defaults to :class:`None <python:None>`.
     :type on_success: callable / :class:`None <python:None>`
 
+    :param clock: The :class:`Clock <backoff_utils._clock.Clock>` used to measure
+      elapsed time against ``max_delay``.
+
+      If :class:`None <python:None>`, applies a
+      :class:`MonotonicClock <backoff_utils._clock.MonotonicClock>`, which is
+      unaffected by changes to the system's wall-clock time.
+
+      Defaults to :class:`None <python:None>`.
+    :type clock: :class:`Clock <backoff_utils._clock.Clock>` /
+      :class:`None <python:None>`
+
+    :param skip_late_attempt: If ``True``, will give up as soon as the delay
+      before the next attempt would reach ``max_delay``, rather than making one
+      final attempt just as ``max_delay`` elapses. Has no effect if there is no
+      ``max_delay``.
+
+      Defaults to ``False``.
+    :type skip_late_attempt: :class:`bool <python:bool>`
+
+    :param sleeper: The function to call to wait between retry attempts, which
+      receives the number of seconds to wait.
+
+      If :class:`None <python:None>`, applies the ``clock``'s ``sleep()`` method
+      if it has one (e.g. a :class:`VirtualClock <backoff_utils._clock.VirtualClock>`),
+      and otherwise :func:`time.sleep() <python:time.sleep>`.
+
+      Defaults to :class:`None <python:None>`.
+    :type sleeper: callable / :class:`None <python:None>`
+
+    :param retry_budget: The :class:`RetryBudget <backoff_utils._budget.RetryBudget>`
+      (or the name of the budget) to withdraw a token from before each retry
+      attempt, and to deposit in after each successful call. If the budget is
+      exhausted, will give up rather than retrying, even if ``max_tries`` has not
+      been reached.
+
+      If :class:`None <python:None>`, retries are not limited by a budget.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_budget: :class:`RetryBudget <backoff_utils._budget.RetryBudget>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param circuit_breaker: The
+      :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` (or
+      the name of the circuit breaker) that records the outcome of each attempt.
+      While it is open, will raise
+      :class:`CircuitOpenError <backoff_utils._circuit_breaker.CircuitOpenError>`
+      instead of making the first attempt, and will give up rather than
+      retrying.
+
+      If :class:`None <python:None>`, no circuit breaker is applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type circuit_breaker: :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param listeners: The :class:`RetryListener <backoff_utils._events.RetryListener>`
+      (or listeners) to notify as each attempt starts and ends, before each
+      retry, and when giving up.
+
+      If :class:`None <python:None>`, no events are created.
+
+      Defaults to :class:`None <python:None>`.
+    :type listeners: :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      iterable of :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      :class:`None <python:None>`
+
+    :param giveup: A function that receives each exception caught per
+      ``catch_exceptions``, and returns ``True`` if the call should give up rather
+      than retry it (e.g. because an HTTP error's status code shows that retrying
+      will not help). If :class:`None <python:None>`, every exception caught is
+      retried.
+
+      Defaults to :class:`None <python:None>`.
+    :type giveup: callable / :class:`None <python:None>`
+
+    :param retry_on_result: A function that receives the value returned by each
+      attempt, and returns ``True`` if the attempt should be retried as if it had
+      failed (e.g. because it returned :class:`None <python:None>` or an HTTP 503
+      response). If the call gives up while the value is still rejected (e.g.
+      because ``max_tries`` has been reached), the last value is returned and
+      ``on_success`` is not called. If :class:`None <python:None>`, every value
+      returned is accepted.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_on_result: callable / :class:`None <python:None>`
+
+    :param retry_after: A function that receives each exception caught per
+      ``catch_exceptions`` (or each value rejected by ``retry_on_result``), and
+      returns the number of seconds the server asked to wait before retrying
+      (e.g. read from an HTTP ``Retry-After`` header using
+      :func:`parse_retry_after() <backoff_utils._retry_after.parse_retry_after>`),
+      or :class:`None <python:None>` if it gave no hint. The strategy's delay is
+      lengthened to at least the hint (or replaced by it, per
+      ``retry_after_overrides``). If waiting as long as the hint asks would
+      overshoot ``max_delay``, the call gives up instead. If
+      :class:`None <python:None>`, the strategy's delays are applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_after: callable / :class:`None <python:None>`
+
+    :param retry_after_overrides: If ``True``, the delay returned by
+      ``retry_after`` replaces the strategy's delay, even if it is shorter. If
+      ``False``, it only ever lengthens the strategy's delay. Defaults to
+      ``False``.
+    :type retry_after_overrides: :class:`bool <python:bool>`
+
+    :param hedge: The :class:`Hedge <backoff_utils._hedge.Hedge>` (or the name of
+      a shared hedge) to apply to the first attempt of each call. If the first
+      attempt is slower than the hedge's threshold, a second attempt is made in
+      parallel (per ``retry_execute``), and the first to succeed is returned.
+
+      If :class:`None <python:None>`, calls are not hedged.
+
+      Defaults to :class:`None <python:None>`.
+    :type hedge: :class:`Hedge <backoff_utils._hedge.Hedge>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param attempt_timeout: The number of seconds each attempt may take before it
+      is abandoned and retried. Either a fixed number of seconds, or a
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` whose
+      delays are applied as the timeouts of successive attempts (so that timeouts
+      can grow from one attempt to the next). No attempt runs past ``max_delay``.
+
+      If :class:`None <python:None>`, attempts may take as long as they take.
+
+      Defaults to :class:`None <python:None>`.
+    :type attempt_timeout: :class:`float <python:float>` /
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` /
+      :class:`None <python:None>`
+
+    :param single_flight: The
+      :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` (or the name
+      of a shared single-flight) that coalesces concurrent calls. A call made while
+      an identical call (of the same function, with the same key) is in flight
+      waits for it, and shares its outcome rather than running its own retry loop.
+
+      If :class:`None <python:None>`, calls are not coalesced.
+
+      Defaults to :class:`None <python:None>`.
+
+      .. note::
+
+        Unlike :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>`,
+        ``single_flight = True`` is not supported: a new single-flight applied to
+        each call would never have an identical call in flight to coalesce with.
+    :type single_flight: :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
     :returns: The result of the attempted function.
 
+    :raises ValueError: if ``to_execute`` is :class:`None <python:None>`, or
+      ``single_flight`` is ``True``
+
     Example:
 
     .. code-block:: python
@@ -218,132 +357,42 @@ def backoff(to_execute,
                        strategy = strategies.Exponential)
 
     """
-    # pylint: disable=too-many-branches,too-many-statements
-
-    if to_execute is None:
-        raise ValueError('to_execute cannot be None')
-    elif not checkers.is_callable(to_execute):
-        raise TypeError('to_execute must be callable')
-
-    if strategy is None:
-        strategy = strategies.Exponential
-
-    if not hasattr(strategy, 'IS_INSTANTIATED'):
-        raise TypeError('strategy must be a BackoffStrategy or descendent')
-    if not strategy.IS_INSTANTIATED:
-        test_strategy = strategy(attempt = 0)
-    else:
-        test_strategy = strategy
-
-    if not checkers.is_type(test_strategy, 'BackoffStrategy'):
-        raise TypeError('strategy must be a BackoffStrategy or descendent')
-
-    if args:
-        args = validators.iterable(args)
-    if kwargs:
-        kwargs = validators.dict(kwargs)
-
-    if retry_execute is None:
-        retry_execute = to_execute
-    elif not checkers.is_callable(retry_execute):
-        raise TypeError('retry_execute must be None or a callable')
-
-    if not retry_args:
-        retry_args = args
-    else:
-        retry_args = validators.iterable(retry_args)
-
-    if not retry_kwargs:
-        retry_kwargs = kwargs
-    else:
-        retry_kwargs = validators.dict(retry_kwargs)
-
-    if max_tries is None:
-        max_tries = DEFAULT_MAX_TRIES
-
-    max_tries = validators.integer(max_tries)
-
-    if max_delay is None:
-        max_delay = DEFAULT_MAX_DELAY
-
-    if catch_exceptions is None:
-        catch_exceptions = [type(Exception())]
-    else:
-        if not checkers.is_iterable(catch_exceptions):
-            catch_exceptions = [catch_exceptions]
-
-        catch_exceptions = validators.iterable(catch_exceptions)
-
-    if on_failure is not None and not checkers.is_callable(on_failure):
-        raise TypeError('on_failure must be None or a callable')
-
-    if on_success is not None and not checkers.is_callable(on_success):
-        raise TypeError('on_success must be None or a callable')
-
-    cached_error = None
-
-    return_value = None
-    returned = False
-    failover_counter = 0
-    start_time = datetime.utcnow()
-    while failover_counter <= (max_tries):
-        elapsed_time = (datetime.utcnow() - start_time).total_seconds()
-        if max_delay is not None and elapsed_time >= max_delay:
-            if cached_error is None:
-                raise BackoffTimeoutError('backoff timed out after:'
-                                          ' {}s'.format(elapsed_time))
-            else:
-                _handle_failure(on_failure, cached_error)
-        if failover_counter == 0:
-            try:
-                if args is not None and kwargs is not None:
-                    return_value = to_execute(*args, **kwargs)
-                elif args is not None:
-                    return_value = to_execute(*args)
-                elif kwargs is not None:
-                    return_value = to_execute(**kwargs)
-                else:
-                    return_value = to_execute()
-                returned = True
-                break
-            except Exception as error:                                          # pylint: disable=broad-except
-                if type(error) in catch_exceptions:
-                    cached_error = error
-                    strategy.delay(failover_counter)
-                    failover_counter += 1
-                    continue
-                else:
-                    _handle_failure(on_failure = on_failure,
-                                    error = error)
-                    return
-        else:
-            try:
-                if retry_args is not None and retry_kwargs is not None:
-                    return_value = retry_execute(*retry_args, **retry_kwargs)
-                elif retry_args is not None:
-                    return_value = retry_execute(*retry_args)
-                elif retry_kwargs is not None:
-                    return_value = retry_execute(**retry_kwargs)
-                else:
-                    return_value = retry_execute()
-                returned = True
-                break
-            except Exception as error:                                          # pylint: disable=broad-except
-                if type(error) in catch_exceptions:
-                    strategy.delay(failover_counter)
-                    cached_error = error
-                    failover_counter += 1
-                    continue
-                else:
-                    _handle_failure(on_failure = on_failure,
-                                    error = error)
-                    return
-
-    if not returned:
-        _handle_failure(on_failure = on_failure,
-                        error = cached_error)
-        return
-    elif returned and on_success is not None:
-        on_success(return_value)
-
-    return return_value
+    (to_execute,
+     args,
+     kwargs,
+     retry_execute,
+     retry_args,
+     retry_kwargs) = _validate_arguments(to_execute,
+                                         args,
+                                         kwargs,
+                                         retry_execute,
+                                         retry_args,
+                                         retry_kwargs,
+                                         single_flight = single_flight)
+
+    policy = RetryPolicy(strategy = strategy,
+                         max_tries = max_tries,
+                         max_delay = max_delay,
+                         catch_exceptions = catch_exceptions,
+                         on_failure = on_failure,
+                         on_success = on_success,
+                         clock = clock,
+                         skip_late_attempt = skip_late_attempt,
+                         sleeper = sleeper,
+                         retry_budget = retry_budget,
+                         circuit_breaker = circuit_breaker,
+                         listeners = listeners,
+                         giveup = giveup,
+                         retry_on_result = retry_on_result,
+                         retry_after = retry_after,
+                         retry_after_overrides = retry_after_overrides,
+                         hedge = hedge,
+                         attempt_timeout = attempt_timeout,
+                         single_flight = single_flight)
+
+    return policy.execute(to_execute,
+                          args = args,
+                          kwargs = kwargs,
+                          retry_execute = retry_execute,
+                          retry_args = retry_args,
+                          retry_kwargs = retry_kwargs)
@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._batch
+#########################
+
+Implements the ``backoff_map()`` function which applies a backoff strategy to
+each of many independent function calls, running their retry loops in parallel
+on a pool of threads or processes.
+
+"""
+import functools
+import multiprocessing
+import pickle
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, \
+    FIRST_COMPLETED, wait
+
+from validator_collection import validators
+
+import backoff_utils.strategies as strategies
+from backoff_utils._adaptive import AdaptiveController
+from backoff_utils._metrics import RetryMetrics
+from backoff_utils._policy import RetryPolicy
+
+#: Does :class:`ProcessPoolExecutor <python:concurrent.futures.ProcessPoolExecutor>`
+#: support an ``initializer`` (Python 3.7+)?
+_supports_initializer = (sys.version_info >= (3, 7))
+
+#: The pickled policy and function applied by this (worker) process, and their
+#: unpickled values. Populated by :func:`_initialize_worker`.
+_worker_state = {}
+
+
+class BackoffResult(object):
+    """The outcome of applying a backoff strategy to a single item passed to
+    :func:`backoff_map() <backoff_utils._batch.backoff_map>`."""
+
+    def __init__(self,
+                 index,
+                 item,
+                 value = None,
+                 error = None):
+        """
+        :param index: The position of ``item`` in the iterable that was mapped.
+        :type index: :class:`int <python:int>`
+
+        :param item: The item that was passed to the function.
+
+        :param value: The value returned by the function, if it succeeded.
+
+        :param error: The exception raised once all retry attempts for ``item``
+          had failed, or :class:`None <python:None>` if it succeeded.
+        :type error: :class:`Exception <python:Exception>` /
+          :class:`None <python:None>`
+        """
+        self.index = index
+        self.item = item
+        self.value = value
+        self.error = error
+
+    def __repr__(self):
+        if self.succeeded:
+            return '<{}(index = {}, value = {!r})>'.format(self.__class__.__name__,
+                                                           self.index,
+                                                           self.value)
+
+        return '<{}(index = {}, error = {!r})>'.format(self.__class__.__name__,
+                                                       self.index,
+                                                       self.error)
+
+    @property
+    def succeeded(self):
+        """``True`` if the function eventually succeeded for the item, otherwise
+        ``False``.
+
+        :rtype: :class:`bool <python:bool>`
+        """
+        return self.error is None
+
+    def result(self):
+        """Return the value returned by the function, or re-raise the exception
+        that caused it to fail.
+
+        :returns: The value returned by the function.
+
+        :raises Exception: the exception that caused the function to fail
+        """
+        if self.error is not None:
+            raise self.error
+
+        return self.value
+
+
+def _default_workers():
+    """Return the number of worker threads to use if none is given, matching
+    :class:`ThreadPoolExecutor <python:concurrent.futures.ThreadPoolExecutor>`
+    on Python 3.8+."""
+    try:
+        cpus = multiprocessing.cpu_count()
+    except NotImplementedError:
+        cpus = 1
+
+    return min(32, cpus + 4)
+
+
+def _apply(policy, to_execute, index, item):
+    """Call ``to_execute`` with ``item`` under ``policy``, capturing the outcome.
+
+    :rtype: :class:`BackoffResult`
+    """
+    try:
+        value = policy.call(to_execute, item)
+    except Exception as error:                                                  # pylint: disable=broad-except
+        return BackoffResult(index, item, error = error)
+
+    return BackoffResult(index, item, value = value)
+
+
+def _initialize_worker(payload):
+    """Unpickle the policy and function in ``payload`` for use by this worker
+    process."""
+    policy, to_execute = pickle.loads(payload)
+    _worker_state['payload'] = payload
+    _worker_state['policy'] = policy
+    _worker_state['to_execute'] = to_execute
+
+
+def _apply_in_worker(index, item, payload = None):
+    """Call the function with ``item`` under the policy unpickled by
+    :func:`_initialize_worker`, capturing the outcome.
+
+    :param payload: The pickled policy and function. Only supplied where the
+      process pool does not support an ``initializer``, in which case it is only
+      unpickled the first time each worker process receives it.
+    :type payload: :class:`bytes <python:bytes>` / :class:`None <python:None>`
+
+    :rtype: :class:`BackoffResult`
+    """
+    if payload is not None and _worker_state.get('payload') != payload:
+        _initialize_worker(payload)
+
+    return _apply(_worker_state['policy'],
+                  _worker_state['to_execute'],
+                  index,
+                  item)
+
+
+def _pickle_for_workers(policy, to_execute):
+    """Pickle ``policy`` and ``to_execute`` so they can be sent to worker
+    processes.
+
+    :rtype: :class:`bytes <python:bytes>`
+
+    :raises TypeError: if either cannot be pickled
+    """
+    try:
+        return pickle.dumps((policy, to_execute), pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError) as error:
+        raise TypeError('to_execute and the backoff configuration must be '
+                        'picklable to use processes: {}'.format(error))
+
+
+def _shared_state(policy):
+    """Return the names of the arguments of ``policy`` that hold state shared
+    between calls, which would be copied into each worker process (rather than
+    shared by them) if the policy were sent to a process pool.
+
+    :rtype: :class:`list <python:list>` of :class:`str <python:str>`
+    """
+    names = [name for name in ('retry_budget',
+                               'circuit_breaker',
+                               'hedge',
+                               'single_flight')
+             if getattr(policy, name) is not None]
+    if strategies._controller(policy.strategy) is not None:                    # pylint: disable=protected-access
+        names.append('strategy')
+    if any(isinstance(listener, (RetryMetrics, AdaptiveController))
+           for listener in policy.listeners):
+        names.append('listeners')
+
+    return names
+
+
+def backoff_map(to_execute,
+                iterable,
+                workers = None,
+                ordered = True,
+                strategy = None,
+                max_tries = None,
+                max_delay = None,
+                catch_exceptions = None,
+                on_failure = None,
+                on_success = None,
+                clock = None,
+                skip_late_attempt = False,
+                sleeper = None,
+                processes = False,
+                retry_budget = None,
+                circuit_breaker = None,
+                listeners = None,
+                giveup = None,
+                retry_on_result = None,
+                retry_after = None,
+                retry_after_overrides = False,
+                hedge = None,
+                attempt_timeout = None,
+                single_flight = None):
+    """Call ``to_execute`` once for each item in ``iterable``, retrying each call
+    with a delay per the strategy given, and running the calls in parallel on a
+    pool of threads (or processes).
+
+    Each item's retry loop runs independently: a call that is waiting to retry
+    does not hold up calls for other items, and a call that fails (once all of
+    its retry attempts are exhausted) does not stop the others. Instead, the
+    outcome of each call is returned as a :class:`BackoffResult`.
+
+    :param to_execute: The function to call for each item. It receives the item
+      as its only argument.
+    :type to_execute: callable
+
+    :param iterable: The items to call ``to_execute`` with. Items are consumed
+      lazily, as workers become available.
+    :type iterable: iterable
+
+    :param workers: The number of threads (or processes) to use. If
+      :class:`None <python:None>`, uses the same default as
+      :class:`ThreadPoolExecutor <python:concurrent.futures.ThreadPoolExecutor>`
+      (or the number of CPUs, if ``processes`` is ``True``). Defaults to
+      :class:`None <python:None>`.
+    :type workers: :class:`int <python:int>` / :class:`None <python:None>`
+
+    :param ordered: If ``True``, results are returned in the same order as
+      ``iterable``. If ``False``, results are returned as soon as each call has
+      finished. Defaults to ``True``.
+    :type ordered: :class:`bool <python:bool>`
+
+    :param strategy: The :class:`BackoffStrategy` to use when determining the
+      delay between retry attempts.
+
+      If :class:`None <python:None>`, defaults to :class:`Exponential`.
+    :type strategy: :class:`BackoffStrategy`
+
+    :param max_tries: The maximum number of times to attempt each call.
+
+      If :class:`None <python:None>`, will apply an environment variable
+      ``BACKOFF_DEFAULT_TRIES``. If that environment variable is not set, will
+      apply a default of ``3``.
+    :type max_tries: int / :class:`None <python:None>`
+
+    :param max_delay: The maximum number of seconds to spend on each call before
+      giving up once and for all. If :class:`None <python:None>`, will apply an
+      environment variable ``BACKOFF_DEFAULT_DELAY`` if that environment variable
+      is set. If it is not set, will not apply a max delay at all.
+    :type max_delay: :class:`None <python:None>` / int
+
+    :param catch_exceptions: The exception class (or classes) to catch and retry.
+      As with an ``except`` clause, subclasses of these classes are caught too. If
+      :class:`None <python:None>`, will catch all exceptions.
+
+      Defaults to :class:`None <python:None>`.
+
+      .. note::
+
+        The older ``type(ValueError())`` form is still supported, and is equivalent
+        to ``ValueError``. Exception instances are also accepted, and match their
+        class.
+
+    :type catch_exceptions: :class:`Exception <python:Exception>` class /
+      iterable of :class:`Exception <python:Exception>` classes /
+      :class:`None <python:None>`
+
+    :param on_failure: The :class:`exception <python:Exception>` or function to
+      call when all retry attempts for an item have failed. Whatever it raises is
+      captured as the item's :attr:`BackoffResult.error`.
+
+      Defaults to :class:`None <python:None>`.
+    :type on_failure: :class:`Exception <python:Exception>` / function /
+      :class:`None <python:None>`
+
+    :param on_success: The function to call when the call for an item was
+      successful. It is called from the worker thread.
+
+      Defaults to :class:`None <python:None>`.
+    :type on_success: callable / :class:`None <python:None>`
+
+    :param clock: The :class:`Clock <backoff_utils._clock.Clock>` used to measure
+      elapsed time against ``max_delay``.
+
+      If :class:`None <python:None>`, applies a
+      :class:`MonotonicClock <backoff_utils._clock.MonotonicClock>`.
+
+      Defaults to :class:`None <python:None>`.
+    :type clock: :class:`Clock <backoff_utils._clock.Clock>` /
+      :class:`None <python:None>`
+
+    :param skip_late_attempt: If ``True``, will give up on an item as soon as the
+      delay before its next attempt would reach ``max_delay``.
+
+      Defaults to ``False``.
+    :type skip_late_attempt: :class:`bool <python:bool>`
+
+    :param sleeper: The function to call to wait between retry attempts, which
+      receives the number of seconds to wait. It is called from the worker
+      thread.
+
+      If :class:`None <python:None>`, applies the ``clock``'s ``sleep()`` method
+      if it has one, and otherwise :func:`time.sleep() <python:time.sleep>`.
+
+      Defaults to :class:`None <python:None>`.
+    :type sleeper: callable / :class:`None <python:None>`
+
+    :param processes: If ``True``, runs the calls on a pool of processes rather
+      than threads, so that CPU-bound work is not limited by the GIL.
+
+      ``to_execute`` and the backoff configuration are pickled once, and each
+      worker process unpickles them once when it starts. All of the retry
+      attempts for an item are then made within the same worker process, so
+      only the item and its :class:`BackoffResult` are sent between processes.
+      As a result, ``to_execute``, the backoff configuration, each item, and
+      each result must be picklable.
+
+      Each worker process works with its own copy of the backoff configuration,
+      so objects that accumulate state shared between calls (a ``retry_budget``,
+      ``circuit_breaker``, ``hedge`` or ``single_flight``, an
+      :class:`Adaptive <backoff_utils.strategies.Adaptive>` ``strategy``, or
+      :class:`RetryMetrics <backoff_utils._metrics.RetryMetrics>` and
+      :class:`AdaptiveController <backoff_utils._adaptive.AdaptiveController>`
+      ``listeners``) cannot be applied. Other listeners are notified within the
+      worker processes, so changes they make to their own state are not seen by
+      the calling process.
+
+      Defaults to ``False``.
+    :type processes: :class:`bool <python:bool>`
+
+    :param retry_budget: The :class:`RetryBudget <backoff_utils._budget.RetryBudget>`
+      (or the name of the budget) to withdraw a token from before each retry
+      attempt, and to deposit in after each successful call. If the budget is
+      exhausted, will give up rather than retrying, even if ``max_tries`` has not
+      been reached.
+
+      If :class:`None <python:None>`, retries are not limited by a budget.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_budget: :class:`RetryBudget <backoff_utils._budget.RetryBudget>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param circuit_breaker: The
+      :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` (or
+      the name of the circuit breaker) that records the outcome of each attempt.
+      While it is open, items fail with a
+      :class:`CircuitOpenError <backoff_utils._circuit_breaker.CircuitOpenError>`
+      instead of making their first attempt, and give up rather than retrying.
+
+      If :class:`None <python:None>`, no circuit breaker is applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type circuit_breaker: :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param listeners: The :class:`RetryListener <backoff_utils._events.RetryListener>`
+      (or listeners) to notify as each attempt starts and ends, before each
+      retry, and when giving up.
+
+      If :class:`None <python:None>`, no events are created.
+
+      Defaults to :class:`None <python:None>`.
+    :type listeners: :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      iterable of :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      :class:`None <python:None>`
+
+    :param giveup: A function that receives each exception caught per
+      ``catch_exceptions``, and returns ``True`` if the call should give up rather
+      than retry it (e.g. because an HTTP error's status code shows that retrying
+      will not help). If :class:`None <python:None>`, every exception caught is
+      retried.
+
+      Defaults to :class:`None <python:None>`.
+    :type giveup: callable / :class:`None <python:None>`
+
+    :param retry_on_result: A function that receives the value returned by each
+      attempt, and returns ``True`` if the attempt should be retried as if it had
+      failed (e.g. because it returned :class:`None <python:None>` or an HTTP 503
+      response). If the call gives up while the value is still rejected (e.g.
+      because ``max_tries`` has been reached), the last value is returned and
+      ``on_success`` is not called. If :class:`None <python:None>`, every value
+      returned is accepted.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_on_result: callable / :class:`None <python:None>`
+
+    :param retry_after: A function that receives each exception caught per
+      ``catch_exceptions`` (or each value rejected by ``retry_on_result``), and
+      returns the number of seconds the server asked to wait before retrying
+      (e.g. read from an HTTP ``Retry-After`` header using
+      :func:`parse_retry_after() <backoff_utils._retry_after.parse_retry_after>`),
+      or :class:`None <python:None>` if it gave no hint. The strategy's delay is
+      lengthened to at least the hint (or replaced by it, per
+      ``retry_after_overrides``). If waiting as long as the hint asks would
+      overshoot ``max_delay``, the call gives up instead. If
+      :class:`None <python:None>`, the strategy's delays are applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_after: callable / :class:`None <python:None>`
+
+    :param retry_after_overrides: If ``True``, the delay returned by
+      ``retry_after`` replaces the strategy's delay, even if it is shorter. If
+      ``False``, it only ever lengthens the strategy's delay. Defaults to
+      ``False``.
+    :type retry_after_overrides: :class:`bool <python:bool>`
+
+    :param hedge: The :class:`Hedge <backoff_utils._hedge.Hedge>` (or the name of
+      a shared hedge) to apply to the first attempt of each call. If the first
+      attempt is slower than the hedge's threshold, a second attempt is made in
+      parallel (per ``retry_execute``), and the first to succeed is returned.
+
+      If :class:`None <python:None>`, calls are not hedged.
+
+      Defaults to :class:`None <python:None>`.
+    :type hedge: :class:`Hedge <backoff_utils._hedge.Hedge>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param attempt_timeout: The number of seconds each attempt may take before it
+      is abandoned and retried. Either a fixed number of seconds, or a
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` whose
+      delays are applied as the timeouts of successive attempts (so that timeouts
+      can grow from one attempt to the next). No attempt runs past ``max_delay``.
+
+      If :class:`None <python:None>`, attempts may take as long as they take.
+
+      Defaults to :class:`None <python:None>`.
+    :type attempt_timeout: :class:`float <python:float>` /
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` /
+      :class:`None <python:None>`
+
+    :param single_flight: The
+      :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` (or the name
+      of a shared single-flight) that coalesces concurrent calls. A call made while
+      an identical call (of the same function, with the same key) is in flight
+      waits for it, and shares its outcome rather than running its own retry loop.
+
+      If :class:`None <python:None>`, calls are not coalesced.
+
+      Defaults to :class:`None <python:None>`.
+    :type single_flight: :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :returns: An iterator which yields one :class:`BackoffResult` per item.
+    :rtype: iterator of :class:`BackoffResult`
+
+    :raises ValueError: if ``to_execute`` is :class:`None <python:None>`,
+      ``workers`` is less than 1, or ``processes`` is ``True`` and the backoff
+      configuration holds state shared between calls
+    :raises TypeError: if ``to_execute`` is not callable, the backoff
+      configuration is of the wrong type, or ``processes`` is ``True`` and either
+      cannot be pickled
+
+    Example:
+
+    .. code-block:: python
+
+      from backoff_utils import backoff_map, strategies
+
+      for result in backoff_map(upload_file,
+                                file_names,
+                                workers = 16,
+                                strategy = strategies.Exponential,
+                                max_tries = 5):
+          if not result.succeeded:
+              print('Could not upload {}: {}'.format(result.item, result.error))
+
+    .. caution::
+
+      A :class:`VirtualClock <backoff_utils._clock.VirtualClock>` is not
+      thread-safe, and so should not be used as the ``clock`` here. (When using
+      ``processes``, each worker process would receive its own copy.)
+
+    """
+    if to_execute is None:
+        raise ValueError('to_execute cannot be None')
+    elif not callable(to_execute):
+        raise TypeError('to_execute must be callable')
+
+    if workers is None and processes:
+        workers = multiprocessing.cpu_count()
+    elif workers is None:
+        workers = _default_workers()
+    else:
+        workers = validators.integer(workers, minimum = 1)
+
+    policy = RetryPolicy(strategy = strategy,
+                         max_tries = max_tries,
+                         max_delay = max_delay,
+                         catch_exceptions = catch_exceptions,
+                         on_failure = on_failure,
+                         on_success = on_success,
+                         clock = clock,
+                         skip_late_attempt = skip_late_attempt,
+                         sleeper = sleeper,
+                         retry_budget = retry_budget,
+                         circuit_breaker = circuit_breaker,
+                         listeners = listeners,
+                         giveup = giveup,
+                         retry_on_result = retry_on_result,
+                         retry_after = retry_after,
+                         retry_after_overrides = retry_after_overrides,
+                         hedge = hedge,
+                         attempt_timeout = attempt_timeout,
+                         single_flight = single_flight)
+
+    if processes:
+        shared = _shared_state(policy)
+        if shared:
+            raise ValueError('{} cannot be shared between worker processes, so '
+                             'cannot be applied when processes is '
+                             'True'.format(', '.join(shared)))
+
+        payload = _pickle_for_workers(policy, to_execute)
+        if _supports_initializer:
+            executor_factory = functools.partial(ProcessPoolExecutor,
+                                                 max_workers = workers,
+                                                 initializer = _initialize_worker,
+                                                 initargs = (payload, ))
+            task = _apply_in_worker
+        else:
+            executor_factory = functools.partial(ProcessPoolExecutor,
+                                                 max_workers = workers)
+            task = functools.partial(_apply_in_worker, payload = payload)
+    else:
+        executor_factory = functools.partial(ThreadPoolExecutor,
+                                             max_workers = workers)
+        task = functools.partial(_apply, policy, to_execute)
+
+    if ordered:
+        return _map_ordered(executor_factory, task, iterable, workers)
+
+    return _map_unordered(executor_factory, task, iterable, workers)
+
+
+def _map_ordered(executor_factory, task, iterable, workers):
+    """Yield the :class:`BackoffResult` for each item in ``iterable``, in order,
+    by submitting ``task`` to the executor returned by ``executor_factory``.
+
+    No more than twice as many calls as there are ``workers`` are queued at once,
+    so that ``iterable`` is only consumed as results are needed.
+    """
+    items = enumerate(iterable)
+    pending = deque()
+    with executor_factory() as executor:
+        try:
+            for index, item in items:
+                pending.append(executor.submit(task, index, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _map_unordered(executor_factory, task, iterable, workers):
+    """Yield the :class:`BackoffResult` for each item in ``iterable`` as soon as
+    it is available, by submitting ``task`` to the executor returned by
+    ``executor_factory``.
+
+    No more than twice as many calls as there are ``workers`` are queued at once,
+    so that ``iterable`` is only consumed as results are needed.
+    """
+    items = enumerate(iterable)
+    pending = set()
+    with executor_factory() as executor:
+        try:
+            for index, item in items:
+                pending.add(executor.submit(task, index, item))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+
+            while pending:
+                done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._budget
+#########################
+
+Implements the :class:`RetryBudget` class, a token bucket shared between any
+number of backoff calls which caps how many retries they may make in total.
+
+"""
+from validator_collection import validators, checkers
+
+from backoff_utils._clock import DEFAULT_CLOCK
+from backoff_utils._shared import _Shared
+
+
+class RetryBudget(_Shared):
+    """A thread-safe token bucket that caps the number of retries made across
+    every backoff call it is supplied to.
+
+    Each successful call deposits ``ratio`` tokens in the bucket, and each retry
+    attempt withdraws one. When there is less than one token left, calls give up
+    rather than retrying (handling their last error per ``on_failure``). To allow
+    retries when traffic is light, the bucket is also topped up with
+    ``min_per_second`` tokens per second. The bucket never holds more than
+    ``capacity`` tokens, and starts full.
+
+    As a result, when a dependency goes down, retries are limited to roughly
+    ``ratio`` times the recent rate of successful calls (plus
+    ``min_per_second``), instead of multiplying the load on the dependency by
+    ``max_tries``.
+
+    Budgets are typically shared by name, using :func:`named() <RetryBudget.named>`:
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, RetryBudget
+
+      @apply_backoff(max_tries = 5,
+                     retry_budget = RetryBudget.named('inventory-service'))
+      def get_inventory(item_id):
+          pass
+
+    Passing the name itself (``retry_budget = 'inventory-service'``) is
+    equivalent.
+
+    """
+
+    _REGISTRY = {}
+
+    def __init__(self,
+                 ratio = 0.2,
+                 min_per_second = 1.0,
+                 capacity = 10.0,
+                 clock = None):
+        """
+        :param ratio: The number of tokens deposited by each successful call,
+          i.e. the number of retries allowed per successful call. Defaults to
+          ``0.2``.
+        :type ratio: :class:`float <python:float>`
+
+        :param min_per_second: The number of tokens added to the bucket per
+          second, regardless of traffic. Defaults to ``1.0``.
+        :type min_per_second: :class:`float <python:float>`
+
+        :param capacity: The maximum number of tokens the bucket can hold, which
+          is also the number it starts with. Defaults to ``10.0``.
+        :type capacity: :class:`float <python:float>`
+
+        :param clock: The :class:`Clock <backoff_utils._clock.Clock>` used to
+          top up the bucket over time. If :class:`None <python:None>`, applies a
+          :class:`MonotonicClock <backoff_utils._clock.MonotonicClock>`.
+          Defaults to :class:`None <python:None>`.
+        :type clock: :class:`Clock <backoff_utils._clock.Clock>` /
+          :class:`None <python:None>`
+
+        :raises ValueError: if ``ratio``, ``min_per_second``, or ``capacity`` are
+          negative
+        :raises TypeError: if ``clock`` is not a
+          :class:`Clock <backoff_utils._clock.Clock>`
+        """
+        self.ratio = validators.float(ratio, minimum = 0)
+        self.min_per_second = validators.float(min_per_second, minimum = 0)
+        self.capacity = validators.float(capacity, minimum = 0)
+
+        if clock is None:
+            clock = DEFAULT_CLOCK
+        elif not callable(getattr(clock, 'now', None)):
+            raise TypeError('clock must be None or a Clock')
+        self.clock = clock
+
+        self._setup()
+        self._tokens = self.capacity
+        self._updated = clock.now()
+
+    def __repr__(self):
+        return '<{}(ratio = {}, min_per_second = {}, capacity = {})>'.format(
+            self.__class__.__name__,
+            self.ratio,
+            self.min_per_second,
+            self.capacity
+        )
+
+    @property
+    def tokens(self):
+        """The number of tokens currently in the bucket.
+
+        :rtype: :class:`float <python:float>`
+        """
+        with self._lock:
+            self._top_up()
+            return self._tokens
+
+    def _top_up(self):
+        """Add the tokens accrued (at ``min_per_second``) since the bucket was
+        last updated. Must be called while holding the lock."""
+        now = self.clock.now()
+        if self.min_per_second:
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        """Record a successful call, depositing ``ratio`` tokens in the bucket."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_withdraw(self):
+        """Withdraw a token for a retry attempt, if one is available.
+
+        :returns: ``True`` if a token was withdrawn (and the retry may be made),
+          otherwise ``False``.
+        :rtype: :class:`bool <python:bool>`
+        """
+        with self._lock:
+            self._top_up()
+            if self._tokens < 1:
+                return False
+
+            self._tokens -= 1
+
+            return True
+
+
+def _get_retry_budget(value):
+    """Return ``value`` as a :class:`RetryBudget`, looking it up by name if it is
+    a string.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, a
+      :class:`RetryBudget`, or a name
+    """
+    if value is None or isinstance(value, RetryBudget):
+        return value
+
+    if checkers.is_string(value):
+        return RetryBudget.named(value)
+
+    raise TypeError('retry_budget must be None, a RetryBudget, or a name')
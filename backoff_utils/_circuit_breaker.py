@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._circuit_breaker
+#################################
+
+Implements the :class:`CircuitBreaker` class, which remembers failures across
+backoff calls so that calls to a dependency that is known to be down can fail
+fast.
+
+"""
+from validator_collection import validators, checkers
+
+from backoff_utils._clock import DEFAULT_CLOCK
+from backoff_utils._shared import _Shared
+
+
+class CircuitOpenError(Exception):
+    """Error that is raised if a call is rejected by an open
+    :class:`CircuitBreaker` before its first attempt."""
+    pass
+
+
+class CircuitBreaker(_Shared):
+    """A thread-safe circuit breaker that can be shared by any number of backoff
+    calls.
+
+    The circuit breaker starts out **closed**, and every attempt is allowed
+    through. Once ``failure_threshold`` attempts in a row have failed, it
+    **opens**: calls then fail fast, raising :class:`CircuitOpenError` instead of
+    making their first attempt, and calls that are already retrying give up
+    (handling their last error per ``on_failure``) instead of waiting to retry.
+
+    After ``recovery_timeout`` seconds, the circuit breaker becomes
+    **half-open** and lets a single trial attempt through (while continuing to
+    reject every other attempt). If the trial succeeds, the circuit breaker
+    closes again. If it fails, the circuit breaker re-opens for another
+    ``recovery_timeout`` seconds.
+
+    Only the exceptions that the backoff call would retry (per its
+    ``catch_exceptions``) count as failures.
+
+    Circuit breakers are typically shared by name, using
+    :func:`named() <CircuitBreaker.named>`:
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, CircuitBreaker
+
+      @apply_backoff(max_tries = 5,
+                     circuit_breaker = CircuitBreaker.named('inventory-service'))
+      def get_inventory(item_id):
+          pass
+
+    Passing the name itself (``circuit_breaker = 'inventory-service'``) is
+    equivalent.
+
+    """
+
+    _REGISTRY = {}
+
+    #: The state in which every attempt is allowed through.
+    CLOSED = 'closed'
+
+    #: The state in which every attempt is rejected.
+    OPEN = 'open'
+
+    #: The state in which a single trial attempt is allowed through.
+    HALF_OPEN = 'half-open'
+
+    def __init__(self,
+                 failure_threshold = 5,
+                 recovery_timeout = 30,
+                 clock = None):
+        """
+        :param failure_threshold: The number of attempts in a row that must fail
+          for the circuit breaker to open. Defaults to ``5``.
+        :type failure_threshold: :class:`int <python:int>`
+
+        :param recovery_timeout: The number of seconds the circuit breaker stays
+          open before letting a trial attempt through. Defaults to ``30``.
+        :type recovery_timeout: :class:`float <python:float>`
+
+        :param clock: The :class:`Clock <backoff_utils._clock.Clock>` used to
+          measure ``recovery_timeout``. If :class:`None <python:None>`, applies a
+          :class:`MonotonicClock <backoff_utils._clock.MonotonicClock>`.
+          Defaults to :class:`None <python:None>`.
+        :type clock: :class:`Clock <backoff_utils._clock.Clock>` /
+          :class:`None <python:None>`
+
+        :raises ValueError: if ``failure_threshold`` is less than ``1``, or
+          ``recovery_timeout`` is negative
+        :raises TypeError: if ``clock`` is not a
+          :class:`Clock <backoff_utils._clock.Clock>`
+        """
+        self.failure_threshold = validators.integer(failure_threshold,
+                                                    minimum = 1)
+        self.recovery_timeout = validators.float(recovery_timeout, minimum = 0)
+
+        if clock is None:
+            clock = DEFAULT_CLOCK
+        elif not callable(getattr(clock, 'now', None)):
+            raise TypeError('clock must be None or a Clock')
+        self.clock = clock
+
+        self._setup()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._trial_started_at = None
+
+    def __repr__(self):
+        return '<{}(failure_threshold = {}, recovery_timeout = {}, state = {})>'.format(
+            self.__class__.__name__,
+            self.failure_threshold,
+            self.recovery_timeout,
+            self.state
+        )
+
+    @property
+    def state(self):
+        """The current state of the circuit breaker: :attr:`CLOSED`,
+        :attr:`OPEN`, or :attr:`HALF_OPEN`.
+
+        An open circuit breaker is reported as half-open once
+        ``recovery_timeout`` has elapsed, even if no trial attempt has been made
+        yet.
+
+        :rtype: :class:`str <python:str>`
+        """
+        with self._lock:
+            if self._state == self.OPEN and self._recovery_due(self.clock.now()):
+                return self.HALF_OPEN
+
+            return self._state
+
+    @property
+    def failure_count(self):
+        """The number of attempts in a row that have failed.
+
+        :rtype: :class:`int <python:int>`
+        """
+        return self._failures
+
+    def _recovery_due(self, now):
+        """Indicate whether ``recovery_timeout`` has elapsed since the circuit
+        breaker opened. Must be called while holding the lock."""
+        return now - self._opened_at >= self.recovery_timeout
+
+    def allow_request(self):
+        """Indicate whether an attempt may be made, reserving the trial attempt
+        if the circuit breaker is half-open.
+
+        If the trial attempt is not reported (via
+        :func:`record_success() <CircuitBreaker.record_success>` or
+        :func:`record_failure() <CircuitBreaker.record_failure>`) within
+        ``recovery_timeout`` seconds, another trial attempt is allowed through.
+
+        :rtype: :class:`bool <python:bool>`
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+
+            now = self.clock.now()
+            if self._state == self.OPEN:
+                if not self._recovery_due(now):
+                    return False
+                self._state = self.HALF_OPEN
+            elif self._trial_started_at is not None and \
+                 now - self._trial_started_at < self.recovery_timeout:
+                return False
+
+            self._trial_started_at = now
+
+            return True
+
+    def release_request(self):
+        """Release the trial attempt reserved by
+        :func:`allow_request() <CircuitBreaker.allow_request>` when it will not be
+        made after all (e.g. because a retry budget refused it), so that the next
+        request may make it without waiting for ``recovery_timeout``."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_started_at = None
+
+    def record_success(self):
+        """Record a successful attempt, closing the circuit breaker."""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        """Record a failed attempt, opening the circuit breaker if it is
+        half-open or ``failure_threshold`` attempts in a row have now failed."""
+        with self._lock:
+            self._failures += 1
+            if self._state == self.OPEN:
+                return
+
+            if self._state == self.HALF_OPEN or \
+               self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self.clock.now()
+
+    def reset(self):
+        """Close the circuit breaker and forget any failures recorded."""
+        self.record_success()
+
+
+def _get_circuit_breaker(value):
+    """Return ``value`` as a :class:`CircuitBreaker`, looking it up by name if it
+    is a string.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, a
+      :class:`CircuitBreaker`, or a name
+    """
+    if value is None or isinstance(value, CircuitBreaker):
+        return value
+
+    if checkers.is_string(value):
+        return CircuitBreaker.named(value)
+
+    raise TypeError('circuit_breaker must be None, a CircuitBreaker, or a name')
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._clock
+#########################
+
+Implements the clocks used to measure elapsed time against ``max_delay``.
+
+"""
+import abc
+import time
+
+from backoff_utils.strategies import _add_metaclass
+
+try:
+    _monotonic = time.monotonic
+except AttributeError:
+    # Python 2.7 has no monotonic clock in its standard library.
+    _monotonic = time.time
+
+
+@_add_metaclass(abc.ABCMeta)
+class Clock(object):
+    """Abstract Base Class that defines the interface of the clocks used to
+    enforce ``max_delay``.
+
+    To supply your own clock (e.g. in tests), subclass :class:`Clock` and
+    implement :func:`now() <Clock.now>`.
+    """
+
+    def __repr__(self):
+        return '<{}>'.format(self.__class__.__name__)
+
+    @abc.abstractmethod
+    def now(self):
+        """Return the current time in seconds.
+
+        The value is only ever compared to other values returned by the same
+        clock, so it may be measured from any (fixed) point of reference.
+
+        :rtype: :class:`float <python:float>`
+        """
+        pass
+
+
+class MonotonicClock(Clock):
+    """A :class:`Clock` that reads :func:`time.monotonic() <python:time.monotonic>`,
+    and so is unaffected by changes to the system's wall-clock time (e.g. by NTP).
+
+    This is the clock applied by default.
+
+    .. note::
+
+      Python 2.7 does not provide a monotonic clock, so on Python 2.7 this clock
+      reads :func:`time.time() <python:time.time>` instead.
+    """
+
+    def now(self):
+        return _monotonic()
+
+
+#: The :class:`Clock` applied if no clock is supplied.
+DEFAULT_CLOCK = MonotonicClock()
+
+
+class VirtualClock(Clock):
+    """A :class:`Clock` whose time only moves when it is told to, which can be
+    used to test retry logic without actually waiting.
+
+    When a :class:`VirtualClock` is supplied as the ``clock`` and no ``sleeper``
+    is supplied, its :func:`sleep() <VirtualClock.sleep>` is used to wait between
+    retry attempts. Waiting therefore advances the clock instantly, while
+    ``max_delay`` is still enforced against the time that would have elapsed.
+
+    .. code-block:: python
+
+      from backoff_utils import backoff, strategies, VirtualClock
+
+      clock = VirtualClock()
+      backoff(some_function,
+              strategy = strategies.Exponential,
+              max_tries = 5,
+              max_delay = 30,
+              clock = clock)
+
+      clock.now()       # the number of seconds that would have passed
+      clock.sleeps      # each of the delays that would have been applied
+
+    .. caution::
+
+      A :class:`VirtualClock` is not thread-safe, and should only be shared by
+      calls made from a single thread.
+
+    """
+
+    def __init__(self, start = 0.0):
+        """
+        :param start: The time the clock starts at. Defaults to ``0.0``.
+        :type start: :class:`float <python:float>`
+        """
+        self.time = float(start)
+        self.sleeps = []
+
+    def __repr__(self):
+        return '<{}(time = {})>'.format(self.__class__.__name__, self.time)
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds):
+        """Advance the clock by ``seconds`` instantly, recording the delay in
+        :attr:`sleeps`.
+
+        :param seconds: The number of seconds to advance the clock by.
+        :type seconds: :class:`float <python:float>`
+        """
+        self.sleeps.append(seconds)
+        self.time += seconds
+
+    def advance(self, seconds):
+        """Advance the clock by ``seconds`` without recording a delay (e.g. to
+        simulate time spent by the function being retried).
+
+        :param seconds: The number of seconds to advance the clock by.
+        :type seconds: :class:`float <python:float>`
+        """
+        self.time += seconds
@@ -6,19 +6,36 @@ backoff_utils._decoratory
 
 Implements the ``@apply_backoff()`` decorator which can be applied to
 function/method calls and retries on failure based on arguments passed to the
-``backoff()`` function.
+decorator.
 
 """
 from functools import wraps
 
-from backoff_utils._backoff import backoff
+from backoff_utils._policy import RetryPolicy, supports_async
+
+if supports_async:
+    from asyncio import iscoroutinefunction
+    from backoff_utils._async_backoff import _apply_async_backoff
 
 def apply_backoff(strategy = None,
                   max_tries = None,
                   max_delay = None,
                   catch_exceptions = None,
                   on_failure = None,
-                  on_success = None):
+                  on_success = None,
+                  clock = None,
+                  skip_late_attempt = False,
+                  sleeper = None,
+                  retry_budget = None,
+                  circuit_breaker = None,
+                  listeners = None,
+                  giveup = None,
+                  retry_on_result = None,
+                  retry_after = None,
+                  retry_after_overrides = False,
+                  hedge = None,
+                  attempt_timeout = None,
+                  single_flight = None):
     """Decorator that applies a backoff strategy to a decorated function/method.
 
     :param strategy: The :class:`BackoffStrategy` to use when determining the
@@ -39,33 +56,26 @@ def apply_backoff(strategy = None,
       If :class:`None <python:None>`, will apply an environment variable
       ``BACKOFF_DEFAULT_DELAY`` if that environment variable is set. If it is not
       set, will not apply a max delay at all.
+
+      The delay before each retry attempt is shortened if necessary so that it
+      does not overshoot ``max_delay``.
     :type max_delay: :class:`None <python:None>` / class:`int <python:int>`
 
-    :param catch_exceptions: The ``type(exception)`` to catch and retry. If
+    :param catch_exceptions: The exception class (or classes) to catch and retry.
+      As with an ``except`` clause, subclasses of these classes are caught too. If
       :class:`None <python:None>`, will catch all exceptions.
 
       Defaults to :class:`None <python:None>`.
 
-      .. caution::
-
-        The iterable must contain one or more types of exception *instances*, and not
-        class objects. For example:
-
-        .. code-block:: python
-
-          # GOOD:
-          catch_exceptions = (type(ValueError()), type(TypeError()))
+      .. note::
 
-          # BAD:
-          catch_exceptions = (type(ValueError), type(ValueError))
+        The older ``type(ValueError())`` form is still supported, and is equivalent
+        to ``ValueError``. Exception instances are also accepted, and match their
+        class.
 
-          # BAD:
-          catch_exceptions = (ValueError, TypeError)
-
-          # BAD:
-          catch_exceptions = (ValueError(), TypeError())
-
-    :type catch_exceptions: iterable of form ``[type(exception()), ...]``
+    :type catch_exceptions: :class:`Exception <python:Exception>` class /
+      iterable of :class:`Exception <python:Exception>` classes /
+      :class:`None <python:None>`
 
     :param on_failure: The :class:`exception <python:Exception>` or function to call
       when all retry attempts have failed.
@@ -94,11 +104,175 @@ def apply_backoff(strategy = None,
       Defaults to :class:`None <python:None>`.
     :type on_success: callable / :class:`None <python:None>`
 
+    :param clock: The :class:`Clock <backoff_utils._clock.Clock>` used to measure
+      elapsed time against ``max_delay``.
+
+      If :class:`None <python:None>`, applies a
+      :class:`MonotonicClock <backoff_utils._clock.MonotonicClock>`, which is
+      unaffected by changes to the system's wall-clock time.
+
+      Defaults to :class:`None <python:None>`.
+    :type clock: :class:`Clock <backoff_utils._clock.Clock>` /
+      :class:`None <python:None>`
+
+    :param skip_late_attempt: If ``True``, will give up as soon as the delay
+      before the next attempt would reach ``max_delay``, rather than making one
+      final attempt just as ``max_delay`` elapses. Has no effect if there is no
+      ``max_delay``.
+
+      Defaults to ``False``.
+    :type skip_late_attempt: :class:`bool <python:bool>`
+
+    :param sleeper: The function to call to wait between retry attempts, which
+      receives the number of seconds to wait.
+
+      If :class:`None <python:None>`, applies the ``clock``'s ``sleep()`` method
+      if it has one (e.g. a :class:`VirtualClock <backoff_utils._clock.VirtualClock>`),
+      and otherwise :func:`time.sleep() <python:time.sleep>` (or
+      :func:`asyncio.sleep() <python:asyncio.sleep>` if the decorated function is
+      a coroutine function).
+
+      Defaults to :class:`None <python:None>`.
+    :type sleeper: callable / :class:`None <python:None>`
+
+    :param retry_budget: The :class:`RetryBudget <backoff_utils._budget.RetryBudget>`
+      (or the name of the budget) to withdraw a token from before each retry
+      attempt, and to deposit in after each successful call. If the budget is
+      exhausted, will give up rather than retrying, even if ``max_tries`` has not
+      been reached.
+
+      If :class:`None <python:None>`, retries are not limited by a budget.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_budget: :class:`RetryBudget <backoff_utils._budget.RetryBudget>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param circuit_breaker: The
+      :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` (or
+      the name of the circuit breaker) that records the outcome of each attempt.
+      While it is open, will raise
+      :class:`CircuitOpenError <backoff_utils._circuit_breaker.CircuitOpenError>`
+      instead of making the first attempt, and will give up rather than
+      retrying.
+
+      If :class:`None <python:None>`, no circuit breaker is applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type circuit_breaker: :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param listeners: The :class:`RetryListener <backoff_utils._events.RetryListener>`
+      (or listeners) to notify as each attempt starts and ends, before each
+      retry, and when giving up.
+
+      If :class:`None <python:None>`, no events are created.
+
+      Defaults to :class:`None <python:None>`.
+    :type listeners: :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      iterable of :class:`RetryListener <backoff_utils._events.RetryListener>` /
+      :class:`None <python:None>`
+
+    :param giveup: A function that receives each exception caught per
+      ``catch_exceptions``, and returns ``True`` if the call should give up rather
+      than retry it (e.g. because an HTTP error's status code shows that retrying
+      will not help). If :class:`None <python:None>`, every exception caught is
+      retried.
+
+      Defaults to :class:`None <python:None>`.
+    :type giveup: callable / :class:`None <python:None>`
+
+    :param retry_on_result: A function that receives the value returned by each
+      attempt, and returns ``True`` if the attempt should be retried as if it had
+      failed (e.g. because it returned :class:`None <python:None>` or an HTTP 503
+      response). If the call gives up while the value is still rejected (e.g.
+      because ``max_tries`` has been reached), the last value is returned and
+      ``on_success`` is not called. If :class:`None <python:None>`, every value
+      returned is accepted.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_on_result: callable / :class:`None <python:None>`
+
+    :param retry_after: A function that receives each exception caught per
+      ``catch_exceptions`` (or each value rejected by ``retry_on_result``), and
+      returns the number of seconds the server asked to wait before retrying
+      (e.g. read from an HTTP ``Retry-After`` header using
+      :func:`parse_retry_after() <backoff_utils._retry_after.parse_retry_after>`),
+      or :class:`None <python:None>` if it gave no hint. The strategy's delay is
+      lengthened to at least the hint (or replaced by it, per
+      ``retry_after_overrides``). If waiting as long as the hint asks would
+      overshoot ``max_delay``, the call gives up instead. If
+      :class:`None <python:None>`, the strategy's delays are applied.
+
+      Defaults to :class:`None <python:None>`.
+    :type retry_after: callable / :class:`None <python:None>`
+
+    :param retry_after_overrides: If ``True``, the delay returned by
+      ``retry_after`` replaces the strategy's delay, even if it is shorter. If
+      ``False``, it only ever lengthens the strategy's delay. Defaults to
+      ``False``.
+    :type retry_after_overrides: :class:`bool <python:bool>`
+
+    :param hedge: The :class:`Hedge <backoff_utils._hedge.Hedge>` (or the name of
+      a shared hedge) to apply to the first attempt of each call. If the first
+      attempt is slower than the hedge's threshold, a second attempt is made in
+      parallel (per ``retry_execute``), and the first to succeed is returned.
+
+      If :class:`None <python:None>`, calls are not hedged.
+
+      Defaults to :class:`None <python:None>`.
+    :type hedge: :class:`Hedge <backoff_utils._hedge.Hedge>` /
+      :class:`str <python:str>` / :class:`None <python:None>`
+
+    :param attempt_timeout: The number of seconds each attempt may take before it
+      is abandoned and retried. Either a fixed number of seconds, or a
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` whose
+      delays are applied as the timeouts of successive attempts (so that timeouts
+      can grow from one attempt to the next). No attempt runs past ``max_delay``.
+
+      If :class:`None <python:None>`, attempts may take as long as they take.
+
+      Defaults to :class:`None <python:None>`.
+    :type attempt_timeout: :class:`float <python:float>` /
+      :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` /
+      :class:`None <python:None>`
+
+    :param single_flight: The
+      :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` (or the name
+      of a shared single-flight) that coalesces concurrent calls. A call made while
+      an identical call (of the same function, with the same key) is in flight
+      waits for it, and shares its outcome rather than running its own retry loop.
+      If ``True``, applies a new single-flight which keys calls to the decorated
+      function on their arguments.
+
+      If :class:`None <python:None>`, calls are not coalesced.
+
+      Defaults to :class:`None <python:None>`.
+    :type single_flight: :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` /
+      :class:`str <python:str>` / :class:`bool <python:bool>` /
+      :class:`None <python:None>`
+
+    .. note::
+
+      The configuration passed to the decorator is validated once, when the
+      decorator is applied, and compiled into a
+      :class:`RetryPolicy <backoff_utils._policy.RetryPolicy>` that is re-used
+      for every call to the decorated function. As a result, an invalid
+      configuration will raise an exception when the function is decorated
+      rather than when it is called. The policy is exposed as the decorated
+      function's ``retry_policy`` attribute.
+
+    :raises TypeError: if ``strategy``, ``on_failure``, ``on_success``,
+      ``clock``, ``sleeper``, ``retry_budget``, ``circuit_breaker``,
+      ``listeners``, ``catch_exceptions``, ``giveup``, ``retry_on_result``,
+      ``retry_after``, ``hedge``, ``attempt_timeout``, or ``single_flight`` are
+      of the wrong type
+    :raises ValueError: if ``attempt_timeout`` is a number that is not positive
+
     Example:
 
     .. code:: python
 
-      @apply_backoff(strategy = strategies.ExponentialBackoff,
+      @apply_backoff(strategy = strategies.Exponential,
                      max_tries = 5,
                      max_delay = 30)
       def some_function(arg1, arg2, kwarg1 = None):
@@ -106,20 +280,52 @@ def apply_backoff(strategy = None,
 
       result = some_function('value1', 'value2', kwarg1 = 'value3')
 
+    .. tip::
+
+      If the decorated function is a coroutine function (i.e. defined using
+      ``async def``), the decorated function will also be a coroutine function
+      which applies the backoff strategy using
+      :func:`async_backoff() <backoff_utils._async_backoff.async_backoff>`, and
+      will therefore not block the event loop while waiting between attempts.
+
+      .. code:: python
+
+        @apply_backoff(strategy = strategies.Exponential,
+                       max_tries = 5,
+                       max_delay = 30)
+        async def some_coroutine(arg1, arg2, kwarg1 = None):
+            pass
+
+        result = await some_coroutine('value1', 'value2', kwarg1 = 'value3')
 
     """
+    policy = RetryPolicy(strategy = strategy,
+                         max_tries = max_tries,
+                         max_delay = max_delay,
+                         catch_exceptions = catch_exceptions,
+                         on_failure = on_failure,
+                         on_success = on_success,
+                         clock = clock,
+                         skip_late_attempt = skip_late_attempt,
+                         sleeper = sleeper,
+                         retry_budget = retry_budget,
+                         circuit_breaker = circuit_breaker,
+                         listeners = listeners,
+                         giveup = giveup,
+                         retry_on_result = retry_on_result,
+                         retry_after = retry_after,
+                         retry_after_overrides = retry_after_overrides,
+                         hedge = hedge,
+                         attempt_timeout = attempt_timeout,
+                         single_flight = single_flight)
+
     def real_decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            return backoff(to_execute = func,
-                           args = args,
-                           kwargs = kwargs,
-                           strategy = strategy,
-                           max_tries = max_tries,
-                           max_delay = max_delay,
-                           catch_exceptions = catch_exceptions,
-                           on_failure = on_failure,
-                           on_success = on_success)
+        if supports_async and iscoroutinefunction(func):
+            return _apply_async_backoff(func, policy)
+
+        wrapper = wraps(func)(policy.wrap(func))
+        wrapper.retry_policy = policy
+
         return wrapper
 
     return real_decorator
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._events
+#########################
+
+Implements the :class:`RetryListener` interface, which receives an event as
+each attempt starts and ends, before each retry, and when giving up.
+
+"""
+
+#: The names of the hooks a :class:`RetryListener` can implement.
+HOOKS = ('on_attempt_start', 'on_attempt_end', 'on_retry', 'on_giveup')
+
+
+def _function_name(function):
+    """Return the name ``function`` is reported under by listeners."""
+    name = getattr(function, '__qualname__', None) or \
+           getattr(function, '__name__', None) or \
+           type(function).__name__
+    module = getattr(function, '__module__', None)
+    if module:
+        return '{}.{}'.format(module, name)
+
+    return name
+
+
+class RetryEvent(object):
+    """Describes something that happened while applying a backoff strategy to a
+    function call, and is passed to each :class:`RetryListener` hook.
+
+    .. attribute:: function
+
+      The function being attempted.
+
+    .. attribute:: strategy
+
+      The :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>`
+      applied to the call.
+
+    .. attribute:: attempt
+
+      The number of the attempt the event relates to, starting from ``1`` for
+      the first attempt.
+
+    .. attribute:: elapsed
+
+      The number of seconds (per the policy's
+      :class:`Clock <backoff_utils._clock.Clock>`) since the call started.
+
+    .. attribute:: duration
+
+      The number of seconds the attempt took. Only set for ``on_attempt_end``.
+
+    .. attribute:: delay
+
+      The number of seconds that will be waited before the next attempt. Only set
+      for ``on_retry``.
+
+    .. attribute:: error
+
+      The exception raised by the attempt, if any.
+
+    .. attribute:: value
+
+      The value returned by the attempt, if it returned rather than raising.
+
+    .. attribute:: failed
+
+      Whether the attempt failed, either by raising an
+      :attr:`error <RetryEvent.error>` or by returning a
+      :attr:`value <RetryEvent.value>` rejected by ``retry_on_result``.
+
+    .. attribute:: state
+
+      A :class:`dict <python:dict>` shared by every event of the same call, which
+      listeners can use to keep track of the call between events (e.g. keyed by
+      the listener itself).
+
+    """
+
+    __slots__ = ('function',
+                 'strategy',
+                 'attempt',
+                 'elapsed',
+                 'duration',
+                 'delay',
+                 'error',
+                 'value',
+                 'failed',
+                 'state')
+
+    def __init__(self,
+                 function,
+                 attempt,
+                 elapsed,
+                 duration = None,
+                 delay = None,
+                 error = None,
+                 value = None,
+                 strategy = None,
+                 state = None,
+                 failed = None):
+        self.function = function
+        self.strategy = strategy
+        self.attempt = attempt
+        self.elapsed = elapsed
+        self.duration = duration
+        self.delay = delay
+        self.error = error
+        self.value = value
+        self.failed = error is not None if failed is None else failed
+        self.state = state
+
+    def __repr__(self):
+        return '<{}(attempt = {}, elapsed = {}, delay = {}, error = {!r})>'.format(
+            self.__class__.__name__,
+            self.attempt,
+            self.elapsed,
+            self.delay,
+            self.error
+        )
+
+
+class RetryListener(object):
+    """Receives a :class:`RetryEvent` at each step of applying a backoff strategy
+    to a function call.
+
+    Either subclass :class:`RetryListener` and override the hooks you need, or
+    pass the functions to call as keyword arguments:
+
+    .. code-block:: python
+
+      from backoff_utils import backoff, RetryListener
+
+      def log_retry(event):
+          logger.warning('Attempt %s failed with %r, retrying in %ss',
+                         event.attempt, event.error, event.delay)
+
+      result = backoff(some_function,
+                       max_tries = 5,
+                       listeners = RetryListener(on_retry = log_retry))
+
+    Hooks that are not implemented cost nothing, and when no listeners are
+    supplied the events are never created.
+    """
+
+    def __init__(self,
+                 on_attempt_start = None,
+                 on_attempt_end = None,
+                 on_retry = None,
+                 on_giveup = None):
+        """
+        :param on_attempt_start: The function to call before each attempt.
+        :type on_attempt_start: callable / :class:`None <python:None>`
+
+        :param on_attempt_end: The function to call after each attempt, whether it
+          succeeded or failed.
+        :type on_attempt_end: callable / :class:`None <python:None>`
+
+        :param on_retry: The function to call after an attempt has failed, before
+          waiting to retry.
+        :type on_retry: callable / :class:`None <python:None>`
+
+        :param on_giveup: The function to call after an attempt has failed, when
+          it will not be retried.
+        :type on_giveup: callable / :class:`None <python:None>`
+
+        :raises TypeError: if any of the hooks supplied are not callable
+        """
+        hooks = {
+            'on_attempt_start': on_attempt_start,
+            'on_attempt_end': on_attempt_end,
+            'on_retry': on_retry,
+            'on_giveup': on_giveup
+        }
+        for name, hook in hooks.items():
+            if hook is None:
+                continue
+            if not callable(hook):
+                raise TypeError('{} must be None or a callable'.format(name))
+            setattr(self, name, hook)
+
+    def on_attempt_start(self, event):
+        """Called before each attempt.
+
+        :param event: The event, whose :attr:`attempt <RetryEvent.attempt>` is the
+          attempt about to be made.
+        :type event: :class:`RetryEvent`
+        """
+        pass
+
+    def on_attempt_end(self, event):
+        """Called after each attempt, with either the
+        :attr:`error <RetryEvent.error>` it raised or the
+        :attr:`value <RetryEvent.value>` it returned.
+
+        :type event: :class:`RetryEvent`
+        """
+        pass
+
+    def on_retry(self, event):
+        """Called after an attempt has failed, before waiting
+        :attr:`delay <RetryEvent.delay>` seconds to retry.
+
+        :type event: :class:`RetryEvent`
+        """
+        pass
+
+    def on_giveup(self, event):
+        """Called after an attempt has failed with an
+        :attr:`error <RetryEvent.error>` that will not be retried (e.g. because
+        ``max_tries`` has been reached), before the failure is handled.
+
+        :type event: :class:`RetryEvent`
+        """
+        pass
+
+    def _implements(self, name):
+        """Indicate whether the listener implements the hook ``name``."""
+        return name in getattr(self, '__dict__', {}) or \
+               getattr(self.__class__, name) is not getattr(RetryListener, name)
+
+
+def _get_listeners(value):
+    """Return ``value`` as a :class:`tuple <python:tuple>` of listeners.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, a
+      :class:`RetryListener`, or an iterable of them
+    """
+    if value is None:
+        return ()
+    if isinstance(value, RetryListener):
+        return (value, )
+
+    try:
+        listeners = tuple(value)
+    except TypeError:
+        listeners = None
+
+    if listeners is None or \
+       not all(isinstance(listener, RetryListener) for listener in listeners):
+        raise TypeError('listeners must be None, a RetryListener, or an iterable'
+                        ' of RetryListeners')
+
+    return listeners
+
+
+class _Hooks(object):
+    """The hooks implemented by a set of listeners, grouped by event.
+
+    Each attribute is a :class:`tuple <python:tuple>` of the functions to call
+    for the corresponding event, so checking whether an event has any hooks (and
+    so whether the event needs to be created at all) is a single truth test.
+    """
+
+    __slots__ = HOOKS
+
+    def __init__(self, listeners):
+        for name in HOOKS:
+            setattr(self, name, tuple(getattr(listener, name)
+                                      for listener in listeners
+                                      if listener._implements(name)))           # pylint: disable=protected-access
+
+    def __bool__(self):
+        return any(getattr(self, name) for name in HOOKS)
+
+    __nonzero__ = __bool__
+
+
+class _RejectedResult(object):
+    """Stands in for the error of an attempt whose return value was rejected by
+    the policy's ``retry_on_result``, so that it can be retried (and reported)
+    like an attempt that raised, without raising an exception."""
+
+    __slots__ = ('value', )
+
+    def __init__(self, value):
+        self.value = value
+
+
+class _Observer(object):
+    """Dispatches the events of a single call to the hooks of its policy's
+    listeners, keeping track of when the call and the current attempt started.
+
+    Only created when the policy has listeners.
+    """
+
+    __slots__ = ('hooks',
+                 'clock',
+                 'function',
+                 'strategy',
+                 'state',
+                 'started_at',
+                 'attempt_started_at')
+
+    def __init__(self, hooks, clock, function, strategy = None):
+        self.hooks = hooks
+        self.clock = clock
+        self.function = function
+        self.strategy = strategy
+        self.state = {}
+        self.started_at = clock.now()
+        self.attempt_started_at = self.started_at
+
+    def _event(self, attempt, now, error = None, value = None, **kwargs):
+        """Return the event for ``attempt`` at ``now``, reporting a
+        :class:`_RejectedResult` as the value it stands in for."""
+        failed = None
+        if isinstance(error, _RejectedResult):
+            value = error.value
+            error = None
+            failed = True
+
+        return RetryEvent(self.function,
+                          attempt,
+                          now - self.started_at,
+                          error = error,
+                          value = value,
+                          failed = failed,
+                          strategy = self.strategy,
+                          state = self.state,
+                          **kwargs)
+
+    def attempt_start(self, attempt):
+        """Dispatch ``on_attempt_start`` for ``attempt``."""
+        now = self.clock.now()
+        self.attempt_started_at = now
+        hooks = self.hooks.on_attempt_start
+        if hooks:
+            event = self._event(attempt, now)
+            for hook in hooks:
+                hook(event)
+
+    def attempt_end(self, attempt, error = None, value = None):
+        """Dispatch ``on_attempt_end`` for ``attempt``."""
+        hooks = self.hooks.on_attempt_end
+        if hooks:
+            now = self.clock.now()
+            event = self._event(attempt,
+                                now,
+                                error = error,
+                                value = value,
+                                duration = now - self.attempt_started_at)
+            for hook in hooks:
+                hook(event)
+
+    def retry(self, attempt, error, delay):
+        """Dispatch ``on_retry`` after ``attempt`` failed with ``error``."""
+        hooks = self.hooks.on_retry
+        if hooks:
+            event = self._event(attempt,
+                                self.clock.now(),
+                                error = error,
+                                delay = delay)
+            for hook in hooks:
+                hook(event)
+
+    def giveup(self, attempt, error):
+        """Dispatch ``on_giveup`` after ``attempt`` failed with ``error``."""
+        hooks = self.hooks.on_giveup
+        if hooks:
+            event = self._event(attempt, self.clock.now(), error = error)
+            for hook in hooks:
+                hook(event)
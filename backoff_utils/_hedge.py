@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._hedge
+#########################
+
+Implements the :class:`Hedge` class, which makes a second, speculative attempt
+of a backoff call when its first attempt is slow, and returns whichever attempt
+completes first.
+
+"""
+import threading
+from collections import deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+
+from validator_collection import validators, checkers
+
+from backoff_utils._budget import RetryBudget
+from backoff_utils._clock import DEFAULT_CLOCK
+from backoff_utils._shared import _Shared
+
+#: The number of first-attempt latencies a :class:`Hedge` must observe before it
+#: hedges at a ``percentile``.
+_MIN_SAMPLES = 20
+
+#: The number of latencies observed between recalculations of a percentile.
+_REFRESH_INTERVAL = 16
+
+
+class Hedge(_Shared):
+    """A thread-safe hedging configuration that can be shared by any number of
+    backoff calls.
+
+    Backoff strategies only react to attempts that fail, but a call's tail
+    latency is often caused by attempts that are merely slow. When a call is
+    hedged, its first attempt is made on a thread of its own. If it has not
+    completed within the hedge's :attr:`threshold`, a second attempt is made in
+    parallel (using ``retry_execute``, ``retry_args`` and ``retry_kwargs``, just
+    like a retry), and the value of whichever attempt succeeds first is
+    returned. The other attempt is left to finish with its outcome ignored. If
+    both attempts fail, the first error raised is retried (or not) per the
+    backoff call's configuration.
+
+    The threshold is either a fixed ``delay``, or a ``percentile`` of the
+    latencies of the first attempts the hedge has observed (in which case
+    ``delay``, if any, applies until enough latencies have been observed). To cap
+    the extra load hedging puts on the dependency, at most ``max_ratio`` of calls
+    are hedged.
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, Hedge
+
+      @apply_backoff(max_tries = 3,
+                     hedge = Hedge.named('inventory-service',
+                                         percentile = 95,
+                                         max_ratio = 0.05))
+      def get_inventory(item_id):
+          pass
+
+    Passing the name itself (``hedge = 'inventory-service'``) uses a hedge
+    previously registered under that name.
+
+    .. caution::
+
+      Only hedge operations that are safe to perform twice (e.g. reads, or
+      idempotent writes).
+    """
+
+    _REGISTRY = {}
+    _PICKLED = ('delay', 'percentile', 'max_ratio', 'window')
+
+    def __init__(self,
+                 delay = None,
+                 percentile = None,
+                 max_ratio = 0.1,
+                 window = 1000):
+        """
+        :param delay: The number of seconds to wait for the first attempt before
+          hedging it. If a ``percentile`` is also supplied, only applies until
+          enough latencies have been observed to calculate it. Defaults to
+          :class:`None <python:None>`.
+        :type delay: :class:`float <python:float>` / :class:`None <python:None>`
+
+        :param percentile: If supplied, hedges first attempts which have taken
+          longer than this percentile (e.g. ``95``) of the latencies of the first
+          attempts observed. Defaults to :class:`None <python:None>`.
+        :type percentile: :class:`float <python:float>` / :class:`None <python:None>`
+
+        :param max_ratio: The largest fraction of calls that may be hedged.
+          Defaults to ``0.1``.
+        :type max_ratio: :class:`float <python:float>`
+
+        :param window: The number of the most recent latencies the ``percentile``
+          is calculated from. Defaults to ``1000``.
+        :type window: :class:`int <python:int>`
+
+        :raises ValueError: if neither ``delay`` nor ``percentile`` is supplied, if
+          ``delay`` is negative, if ``percentile`` is not between ``0`` and
+          ``100`` (exclusive), if ``max_ratio`` is not between ``0`` and ``1``, or
+          if ``window`` is less than ``1``
+        """
+        if delay is None and percentile is None:
+            raise ValueError('supply a delay, a percentile, or both')
+
+        self.delay = validators.float(delay, minimum = 0, allow_empty = True)
+        self.percentile = validators.float(percentile,
+                                           minimum = 0,
+                                           maximum = 100,
+                                           allow_empty = True)
+        if self.percentile in (0, 100):
+            raise ValueError('percentile must be between 0 and 100 (exclusive)')
+        self.max_ratio = validators.float(max_ratio, minimum = 0, maximum = 1)
+        self.window = validators.integer(window, minimum = 1)
+
+        self._setup()
+
+    def _setup(self):
+        """Create the (empty) record of the calls observed."""
+        self._lock = threading.Lock()
+        self._budget = RetryBudget(ratio = self.max_ratio,
+                                   min_per_second = 0,
+                                   capacity = 1)
+        self._samples = deque(maxlen = self.window)
+        self._stale = 0
+        self._percentile_value = None
+        self._calls = 0
+        self._hedges = 0
+
+    def __repr__(self):
+        return '<{}(delay = {}, percentile = {}, max_ratio = {})>'.format(
+            self.__class__.__name__,
+            self.delay,
+            self.percentile,
+            self.max_ratio
+        )
+
+    @property
+    def calls(self):
+        """The number of calls the hedge has been applied to.
+
+        :rtype: :class:`int <python:int>`
+        """
+        return self._calls
+
+    @property
+    def hedges(self):
+        """The number of calls whose first attempt has been hedged.
+
+        :rtype: :class:`int <python:int>`
+        """
+        return self._hedges
+
+    @property
+    def threshold(self):
+        """The number of seconds to wait for a first attempt before hedging it,
+        or :class:`None <python:None>` if calls are not hedged yet (because too
+        few latencies have been observed to calculate the ``percentile``, and
+        there is no ``delay``).
+
+        :rtype: :class:`float <python:float>` / :class:`None <python:None>`
+        """
+        if self.percentile is None:
+            return self.delay
+
+        with self._lock:
+            if len(self._samples) < _MIN_SAMPLES:
+                return self.delay
+            if self._percentile_value is None or \
+               self._stale >= _REFRESH_INTERVAL:
+                samples = sorted(self._samples)
+                rank = int(len(samples) * self.percentile / 100.0)
+                self._percentile_value = samples[min(rank, len(samples) - 1)]
+                self._stale = 0
+
+            return self._percentile_value
+
+    def _start(self):
+        """Record the start of a call, returning the number of seconds to wait
+        for its first attempt before hedging it, or :class:`None <python:None>`
+        if it will not be hedged.
+
+        :rtype: :class:`float <python:float>` / :class:`None <python:None>`
+        """
+        with self._lock:
+            self._calls += 1
+        self._budget.deposit()
+        if self._budget.tokens < 1:
+            return None
+
+        return self.threshold
+
+    def _try_hedge(self):
+        """Claim permission (per ``max_ratio``) to hedge a call.
+
+        :rtype: :class:`bool <python:bool>`
+        """
+        if not self._budget.try_withdraw():
+            return False
+
+        with self._lock:
+            self._hedges += 1
+
+        return True
+
+    def _record(self, latency):
+        """Record the ``latency`` (in seconds) of a first attempt."""
+        if self.percentile is None:
+            return
+
+        with self._lock:
+            self._samples.append(latency)
+            self._stale += 1
+
+    def _call(self,
+              to_execute,
+              args,
+              kwargs,
+              hedge_execute,
+              hedge_args,
+              hedge_kwargs):
+        """Make the first attempt of a call, hedging it with ``hedge_execute`` if
+        it takes longer than the :attr:`threshold`.
+
+        :returns: The value returned by the first attempt to succeed.
+
+        :raises Exception: the first error raised, if every attempt fails
+        """
+        threshold = self._start()
+        if threshold is None:
+            started_at = DEFAULT_CLOCK.now()
+            try:
+                return to_execute(*args, **kwargs)
+            finally:
+                self._record(DEFAULT_CLOCK.now() - started_at)
+
+        primary = _run_in_thread(to_execute, args, kwargs, self._record)
+
+        done, _ = wait([primary], timeout = threshold)
+        if done or not self._try_hedge():
+            return primary.result()
+
+        secondary = _run_in_thread(hedge_execute, hedge_args, hedge_kwargs)
+
+        return _first_result([primary, secondary])
+
+
+def _run_in_thread(to_execute, args, kwargs, record = None):
+    """Call ``to_execute`` with ``args`` and ``kwargs`` on a daemon thread of its
+    own, so that no attempt is ever queued behind the attempts of other calls.
+
+    :param record: If supplied, called with the latency (in seconds) of the
+      attempt, measured from when it started running.
+    :type record: callable / :class:`None <python:None>`
+
+    :returns: A future which completes with the outcome of the attempt. By the
+      time it is returned, the attempt has started running.
+    :rtype: :class:`Future <python:concurrent.futures.Future>`
+    """
+    future = Future()
+    future.set_running_or_notify_cancel()
+
+    def run():
+        started_at = DEFAULT_CLOCK.now()
+        return_value, error = None, None
+        try:
+            return_value = to_execute(*args, **kwargs)
+        except Exception as attempt_error:                                      # pylint: disable=broad-except
+            error = attempt_error
+        if record is not None:
+            record(DEFAULT_CLOCK.now() - started_at)
+
+        if error is None:
+            future.set_result(return_value)
+        else:
+            future.set_exception(error)
+
+    thread = threading.Thread(target = run)
+    thread.daemon = True
+    thread.start()
+
+    return future
+
+
+def _first_result(futures):
+    """Return the result of the first of ``futures`` to succeed.
+
+    :raises Exception: the first error raised, if every future fails
+    """
+    pending = set(futures)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when = FIRST_COMPLETED)
+        for future in futures:
+            if future not in done:
+                continue
+            future_error = future.exception()
+            if future_error is None:
+                return future.result()
+            if error is None:
+                error = future_error
+
+    raise error
+
+
+def _get_hedge(value):
+    """Return ``value`` as a :class:`Hedge`, looking it up by name if it is a
+    string.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, a
+      :class:`Hedge`, or a name
+    :raises ValueError: if ``value`` is a name under which no hedge is
+      registered
+    """
+    if value is None or isinstance(value, Hedge):
+        return value
+
+    if checkers.is_string(value):
+        hedge = Hedge._REGISTRY.get(value)                                      # pylint: disable=protected-access
+        if hedge is None:
+            raise ValueError('no hedge is registered under the name '
+                             '{!r}'.format(value))
+
+        return hedge
+
+    raise TypeError('hedge must be None, a Hedge, or a name')
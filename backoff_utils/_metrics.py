@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._metrics
+#########################
+
+Implements the :class:`RetryMetrics` listener, which aggregates the attempts,
+retries, give-ups, and attempt durations of backoff calls per function, and
+renders them in the Prometheus text exposition format.
+
+"""
+import bisect
+import threading
+
+from validator_collection import validators
+
+from backoff_utils._events import RetryListener, _function_name
+from backoff_utils._shared import _Shared
+
+#: The upper bounds (in seconds) of the attempt duration histogram's buckets, if
+#: none are supplied.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    """Return ``value`` formatted as a Prometheus sample value."""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+
+    return repr(value)
+
+
+def _escape(value):
+    """Return ``value`` escaped for use as a Prometheus label value."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _Stats(object):
+    """The metrics recorded for a single function by a single shard."""
+
+    __slots__ = ('attempts',
+                 'retries',
+                 'giveups',
+                 'sleep_seconds',
+                 'duration_sum',
+                 'duration_buckets')
+
+    def __init__(self, bucket_count):
+        self.attempts = 0
+        self.retries = 0
+        self.giveups = 0
+        self.sleep_seconds = 0.0
+        self.duration_sum = 0.0
+        self.duration_buckets = [0] * (bucket_count + 1)
+
+    def merge(self, other):
+        """Add the metrics recorded in ``other`` to these ones."""
+        self.attempts += other.attempts
+        self.retries += other.retries
+        self.giveups += other.giveups
+        self.sleep_seconds += other.sleep_seconds
+        self.duration_sum += other.duration_sum
+        for index, count in enumerate(other.duration_buckets):
+            self.duration_buckets[index] += count
+
+
+class _Shard(object):
+    """The metrics recorded by a single thread, keyed by function name."""
+
+    __slots__ = ('thread', 'stats')
+
+    def __init__(self, thread):
+        self.thread = thread
+        self.stats = {}
+
+
+class RetryMetrics(RetryListener, _Shared):
+    """A :class:`RetryListener <backoff_utils._events.RetryListener>` that
+    aggregates, per function:
+
+    * the number of attempts made,
+    * the number of retries scheduled,
+    * the number of calls that gave up,
+    * the total number of seconds waited between attempts, and
+    * a histogram of how long each attempt took.
+
+    Supply it as one of the ``listeners`` of any number of backoff calls, and call
+    :func:`render() <RetryMetrics.render>` to obtain the metrics in the
+    `Prometheus text exposition format <https://prometheus.io/docs/instrumenting/exposition_formats/>`_
+    (e.g. to serve them from your application's ``/metrics`` endpoint):
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, RetryMetrics
+
+      metrics = RetryMetrics.named('default')
+
+      @apply_backoff(max_tries = 5, listeners = metrics)
+      def get_inventory(item_id):
+          pass
+
+      print(metrics.render())
+
+    Each thread records its metrics in its own shard without taking a lock, so
+    collecting metrics does not become a point of contention between threads.
+    The shards are only combined when the metrics are read.
+    """
+
+    _REGISTRY = {}
+    _PICKLED = ('prefix', 'buckets')
+
+    def __init__(self,
+                 prefix = 'backoff',
+                 buckets = None):
+        """
+        :param prefix: The prefix applied to the name of each metric. Defaults to
+          ``'backoff'``.
+        :type prefix: :class:`str <python:str>`
+
+        :param buckets: The upper bounds (in seconds) of the attempt duration
+          histogram's buckets. A final bucket with no upper bound is always added.
+          If :class:`None <python:None>`, applies :data:`DEFAULT_BUCKETS`.
+          Defaults to :class:`None <python:None>`.
+        :type buckets: iterable of :class:`float <python:float>` /
+          :class:`None <python:None>`
+
+        :raises ValueError: if ``prefix`` is not a valid metric name, or
+          ``buckets`` contains a negative value
+        """
+        super(RetryMetrics, self).__init__()
+        self.prefix = validators.variable_name(prefix)
+
+        if buckets is None:
+            buckets = DEFAULT_BUCKETS
+        self.buckets = tuple(sorted(set(validators.float(bucket, minimum = 0)
+                                        for bucket in buckets)))
+
+        self._setup()
+
+    def _setup(self):
+        """Create the (empty) shards."""
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+
+    def __repr__(self):
+        return '<{}(prefix = {}, buckets = {})>'.format(
+            self.__class__.__name__,
+            self.prefix,
+            self.buckets
+        )
+
+    def _stats(self, function):
+        """Return the current thread's :class:`_Stats` for ``function``."""
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+
+        name = _function_name(function)
+        stats = shard.stats.get(name)
+        if stats is None:
+            stats = shard.stats[name] = _Stats(len(self.buckets))
+
+        return stats
+
+    def on_attempt_end(self, event):
+        stats = self._stats(event.function)
+        stats.attempts += 1
+        stats.duration_sum += event.duration
+        stats.duration_buckets[bisect.bisect_left(self.buckets,
+                                                  event.duration)] += 1
+
+    def on_retry(self, event):
+        stats = self._stats(event.function)
+        stats.retries += 1
+        stats.sleep_seconds += event.delay
+
+    def on_giveup(self, event):
+        self._stats(event.function).giveups += 1
+
+    def _collect(self):
+        """Return the metrics recorded by every shard, combined per function.
+
+        The shards of threads that have finished are folded into a single
+        retired shard, so that the number of shards stays bounded by the number
+        of live threads.
+
+        :rtype: :class:`dict <python:dict>` of :class:`_Stats`
+        """
+        bucket_count = len(self.buckets)
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                if shard.thread.is_alive():
+                    live.append(shard)
+                    continue
+                for name, stats in shard.stats.items():
+                    self._retired.setdefault(name, _Stats(bucket_count)).merge(stats)
+            self._shards = live
+
+            combined = {}
+            for name, stats in self._retired.items():
+                combined.setdefault(name, _Stats(bucket_count)).merge(stats)
+            for shard in live:
+                for name, stats in list(shard.stats.items()):
+                    combined.setdefault(name, _Stats(bucket_count)).merge(stats)
+
+        return combined
+
+    def snapshot(self):
+        """Return the metrics recorded so far.
+
+        :returns: A :class:`dict <python:dict>` whose keys are function names, and
+          whose values are :class:`dict <python:dict>` with the keys ``attempts``,
+          ``retries``, ``giveups``, ``sleep_seconds``, ``duration_sum``, and
+          ``duration_buckets`` (a :class:`list <python:list>` of
+          ``(upper_bound, count)`` tuples, where each count is cumulative, as in
+          Prometheus).
+        :rtype: :class:`dict <python:dict>`
+        """
+        snapshot = {}
+        upper_bounds = self.buckets + (float('inf'), )
+        for name, stats in self._collect().items():
+            cumulative = 0
+            buckets = []
+            for upper_bound, count in zip(upper_bounds, stats.duration_buckets):
+                cumulative += count
+                buckets.append((upper_bound, cumulative))
+
+            snapshot[name] = {
+                'attempts': stats.attempts,
+                'retries': stats.retries,
+                'giveups': stats.giveups,
+                'sleep_seconds': stats.sleep_seconds,
+                'duration_sum': stats.duration_sum,
+                'duration_buckets': buckets
+            }
+
+        return snapshot
+
+    def render(self):
+        """Return the metrics recorded so far in the Prometheus text exposition
+        format.
+
+        :rtype: :class:`str <python:str>`
+        """
+        snapshot = self.snapshot()
+        names = sorted(snapshot)
+        lines = []
+
+        counters = (
+            ('attempts_total', 'attempts', 'The number of attempts made.'),
+            ('retries_total', 'retries', 'The number of retries scheduled.'),
+            ('giveups_total', 'giveups', 'The number of calls that gave up.'),
+            ('sleep_seconds_total', 'sleep_seconds',
+             'The number of seconds waited between attempts.'),
+        )
+        for suffix, key, description in counters:
+            metric = '{}_{}'.format(self.prefix, suffix)
+            lines.append('# HELP {} {}'.format(metric, description))
+            lines.append('# TYPE {} counter'.format(metric))
+            for name in names:
+                lines.append('{}{{function="{}"}} {}'.format(
+                    metric,
+                    _escape(name),
+                    _format_value(snapshot[name][key])
+                ))
+
+        metric = '{}_attempt_duration_seconds'.format(self.prefix)
+        lines.append('# HELP {} The number of seconds each attempt took.'.format(metric))
+        lines.append('# TYPE {} histogram'.format(metric))
+        for name in names:
+            label = _escape(name)
+            buckets = snapshot[name]['duration_buckets']
+            for upper_bound, count in buckets:
+                lines.append('{}_bucket{{function="{}",le="{}"}} {}'.format(
+                    metric,
+                    label,
+                    _format_value(float(upper_bound)),
+                    count
+                ))
+            lines.append('{}_sum{{function="{}"}} {}'.format(
+                metric,
+                label,
+                _format_value(snapshot[name]['duration_sum'])
+            ))
+            lines.append('{}_count{{function="{}"}} {}'.format(
+                metric,
+                label,
+                buckets[-1][1]
+            ))
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Discard the metrics recorded so far."""
+        with self._lock:
+            self._local = threading.local()
+            self._shards = []
+            self._retired = {}
@@ -0,0 +1,1128 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._policy
+#########################
+
+Implements the :class:`RetryPolicy` class, which validates a backoff
+configuration once and can then apply it to any number of function/method
+calls.
+
+"""
+import inspect
+import itertools
+import os
+import sys
+import threading
+import time
+
+from validator_collection import validators, checkers
+
+import backoff_utils.strategies as strategies
+from backoff_utils._clock import DEFAULT_CLOCK
+from backoff_utils._budget import _get_retry_budget
+from backoff_utils._circuit_breaker import CircuitOpenError, _get_circuit_breaker
+from backoff_utils._events import _get_listeners, _Hooks, _Observer, _RejectedResult
+from backoff_utils._hedge import _get_hedge
+from backoff_utils._single_flight import _get_single_flight
+
+_ver = sys.version_info
+
+#: Python 2.x?
+is_py2 = (_ver[0] == 2)
+
+#: Python 3.5+ (i.e. supports ``async`` / ``await``)?
+supports_async = (_ver >= (3, 5))
+
+
+DEFAULT_MAX_TRIES = os.environ.get('BACKOFF_DEFAULT_TRIES', 3)
+DEFAULT_MAX_DELAY = os.environ.get('BACKOFF_DEFAULT_DELAY', None)
+
+_CATCH_ALL = (Exception, )
+
+#: The maximum number of exception types whose classification a policy caches.
+_MAX_CACHED_DECISIONS = 256
+
+
+def _get_catch_exceptions(value):
+    """Return ``value`` as a :class:`tuple <python:tuple>` of exception classes.
+
+    Exception instances are replaced by their class.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, an
+      exception class, or an iterable of exception classes
+    """
+    if value is None:
+        return _CATCH_ALL
+    if isinstance(value, type) or isinstance(value, BaseException):
+        value = (value, )
+    elif not checkers.is_iterable(value) or checkers.is_string(value):
+        raise TypeError('catch_exceptions must be None, an exception class, or '
+                        'an iterable of exception classes')
+
+    catch_exceptions = []
+    for item in value:
+        if isinstance(item, BaseException):
+            item = type(item)
+        if not isinstance(item, type) or not issubclass(item, BaseException):
+            raise TypeError('catch_exceptions must be None, an exception class, '
+                            'or an iterable of exception classes')
+        catch_exceptions.append(item)
+
+    return tuple(catch_exceptions)
+
+
+class BackoffTimeoutError(Exception):
+    """Error that is raised if a backoff strategy timed out without raising
+    a different exception."""
+    pass
+
+
+class AttemptTimeoutError(BackoffTimeoutError):
+    """Error that is raised if a single attempt did not complete within its
+    ``attempt_timeout``. It is always retried, regardless of
+    ``catch_exceptions``."""
+    pass
+
+
+def _is_strategy(value):
+    """Indicate whether ``value`` is a :class:`BackoffStrategy` that can be
+    applied, i.e. an instance of one or a class that is not abstract."""
+    if isinstance(value, type):
+        return issubclass(value, strategies.BackoffStrategy) and \
+               not inspect.isabstract(value)
+
+    return isinstance(value, strategies.BackoffStrategy)
+
+
+def _get_attempt_timeout(value):
+    """Return ``value`` validated as an ``attempt_timeout``: a number of
+    seconds (as a :class:`float <python:float>`), or a :class:`BackoffStrategy`.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, a number,
+      or a :class:`BackoffStrategy`
+    :raises ValueError: if ``value`` is a number that is not positive
+    """
+    if value is None or _is_strategy(value):
+        return value
+
+    if isinstance(value, bool) or not checkers.is_numeric(value):
+        raise TypeError('attempt_timeout must be None, a number, or a '
+                        'BackoffStrategy')
+
+    value = validators.float(value, minimum = 0)
+    if not value:
+        raise ValueError('attempt_timeout must be greater than 0')
+
+    return value
+
+
+class _Attempt(object):
+    """A single attempt made on a worker thread, so that the thread waiting for
+    it can stop waiting once it has timed out."""
+
+    __slots__ = ('to_execute', 'args', 'kwargs', 'done', 'value', 'error')
+
+    def __init__(self, to_execute, args, kwargs):
+        self.to_execute = to_execute
+        self.args = args
+        self.kwargs = kwargs
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def run(self):
+        """Make the attempt, recording its outcome."""
+        try:
+            self.value = self.to_execute(*self.args, **self.kwargs)
+        except Exception as error:                                              # pylint: disable=broad-except
+            self.error = error
+        finally:
+            self.done.set()
+
+
+def _call_with_timeout(to_execute, args, kwargs, timeout):
+    """Call ``to_execute`` with ``args`` and ``kwargs`` on a worker thread,
+    waiting no more than ``timeout`` seconds for it to return.
+
+    The worker thread is a daemon, so an attempt that never returns is abandoned
+    rather than blocking the interpreter from exiting.
+
+    :raises AttemptTimeoutError: if ``to_execute`` does not return in time
+    """
+    attempt = _Attempt(to_execute, args, kwargs)
+    thread = threading.Thread(target = attempt.run)
+    thread.daemon = True
+    thread.start()
+
+    if not attempt.done.wait(timeout):
+        raise AttemptTimeoutError('attempt did not complete within '
+                                  '{} seconds'.format(timeout))
+    if attempt.error is not None:
+        raise attempt.error
+
+    return attempt.value
+
+
+def _handle_failure(on_failure = None,
+                    error = None):
+    """Handle the failure of a function called by :ref:`backoff`.
+
+    :param on_failure: The :class:`Exception <python:Exception>` or function to call
+      when all retry attempts have failed. If :class:`None <python:None>`, will raise the last-caught
+      :class:`Exception <python:Exception>`. If an :class:`Exception <python:Exception>`,
+      will raise the exception with the same message as the last-caught exception.
+      If a function, will call the function and pass the last-raised exception, its
+      message, and stacktrace to the function. Defaults to :class:`None <python:None>`.
+    :type on_failure: :class:`Exception <python:Exception>` / function / :class:`None <python:None>`
+
+    :param error: The :class:`Exception <python:Exception>` that was raised. Defaults
+      to :class:`Exception <python:Exception>`.
+    :type error: :class:`Exception <python:Exception>`
+    """
+    if error is None:
+        error = Exception
+
+    if on_failure is None:
+        raise error
+
+    is_on_failure_an_exception = False
+    if is_py2:
+        if isinstance(on_failure, Exception):
+            is_on_failure_an_exception = True
+        elif checkers.is_type(on_failure, 'type'):
+            is_on_failure_an_exception = isinstance(on_failure(), Exception)
+        else:
+            is_on_failure_an_exception = False
+    else:
+        is_on_failure_an_exception = isinstance(on_failure, (type, Exception)) and \
+                                     hasattr(on_failure, '__cause__')
+
+    message = error.args[0] if error.args else None
+
+    # The error is handled outside of the except block which caught it, so on
+    # Python 3 its traceback is taken from the error itself.
+    if is_py2:
+        stacktrace = sys.exc_info()[2]
+    else:
+        stacktrace = getattr(error, '__traceback__', None)
+
+    if is_on_failure_an_exception:
+        failure = on_failure(message)
+        if not is_py2:
+            failure.__cause__ = error
+        raise failure
+    else:
+        try:
+            on_failure(error, message, stacktrace)
+        except Exception as nested_error:
+            raise nested_error
+
+
+class RetryPolicy(object):
+    """A pre-validated backoff configuration that can be applied to function calls.
+
+    All of the configuration supplied is validated when the policy is
+    instantiated, so that applying the policy to a function call using
+    :func:`call() <RetryPolicy.call>` or :func:`execute() <RetryPolicy.execute>`
+    does not re-validate it. This is what
+    :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>` uses under
+    the hood, and it can be re-used across as many calls (and threads) as needed.
+
+    Example:
+
+    .. code-block:: python
+
+      from backoff_utils import RetryPolicy, strategies
+
+      policy = RetryPolicy(strategy = strategies.Exponential,
+                           max_tries = 5,
+                           max_delay = 30,
+                           catch_exceptions = TimeoutError)
+
+      result = policy.call(some_function, 'value1', 'value2', kwarg1 = 'value3')
+
+    """
+
+    def __init__(self,
+                 strategy = None,
+                 max_tries = None,
+                 max_delay = None,
+                 catch_exceptions = None,
+                 on_failure = None,
+                 on_success = None,
+                 clock = None,
+                 skip_late_attempt = False,
+                 sleeper = None,
+                 retry_budget = None,
+                 circuit_breaker = None,
+                 listeners = None,
+                 giveup = None,
+                 retry_on_result = None,
+                 retry_after = None,
+                 retry_after_overrides = False,
+                 hedge = None,
+                 attempt_timeout = None,
+                 single_flight = None):
+        """
+        :param strategy: The :class:`BackoffStrategy` to use when determining the
+          delay between retry attempts.
+
+          If :class:`None <python:None>`, defaults to :class:`Exponential`.
+        :type strategy: :class:`BackoffStrategy`
+
+        :param max_tries: The maximum number of times to attempt the call.
+
+          If :class:`None <python:None>`, will apply an environment variable
+          ``BACKOFF_DEFAULT_TRIES``. If that environment variable is not set, will
+          apply a default of ``3``.
+        :type max_tries: :class:`int <python:int>` / :class:`None <python:None>`
+
+        :param max_delay: The maximum number of seconds to wait befor giving up
+          once and for all. If :class:`None <python:None>`, will apply an
+          environment variable ``BACKOFF_DEFAULT_DELAY`` if that environment
+          variable is set. If it is not set, will not apply a max delay at all.
+
+          The delay before each retry attempt is shortened if necessary so that it
+          does not overshoot ``max_delay``.
+        :type max_delay: :class:`None <python:None>` / :class:`int <python:int>`
+
+        :param catch_exceptions: The exception class (or classes) to catch and retry.
+          As with an ``except`` clause, subclasses of these classes are caught too. If
+          :class:`None <python:None>`, will catch all exceptions.
+
+          Defaults to :class:`None <python:None>`.
+
+          .. note::
+
+            The older ``type(ValueError())`` form is still supported, and is equivalent
+            to ``ValueError``. Exception instances are also accepted, and match their
+            class.
+
+        :type catch_exceptions: :class:`Exception <python:Exception>` class /
+          iterable of :class:`Exception <python:Exception>` classes /
+          :class:`None <python:None>`
+
+        :param on_failure: The :class:`exception <python:Exception>` or function
+          to call when all retry attempts have failed.
+
+          Defaults to :class:`None <python:None>`.
+        :type on_failure: :class:`Exception <python:Exception>` / function /
+          :class:`None <python:None>`
+
+        :param on_success: The function to call when the operation was
+          successful.
+
+          Defaults to :class:`None <python:None>`.
+        :type on_success: callable / :class:`None <python:None>`
+
+        :param clock: The :class:`Clock <backoff_utils._clock.Clock>` used to
+          measure elapsed time against ``max_delay``.
+
+          If :class:`None <python:None>`, applies a
+          :class:`MonotonicClock <backoff_utils._clock.MonotonicClock>`.
+
+          Defaults to :class:`None <python:None>`.
+        :type clock: :class:`Clock <backoff_utils._clock.Clock>` /
+          :class:`None <python:None>`
+
+        :param skip_late_attempt: If ``True``, gives up as soon as the delay
+          before the next attempt would reach ``max_delay``. If ``False``, the
+          delay is shortened so that the next (and final) attempt is made just as
+          ``max_delay`` elapses. Defaults to ``False``.
+        :type skip_late_attempt: :class:`bool <python:bool>`
+
+        :param sleeper: The function to call to wait between retry attempts,
+          which receives the number of seconds to wait.
+
+          If :class:`None <python:None>`, applies the ``clock``'s ``sleep()``
+          method if it has one (e.g. a
+          :class:`VirtualClock <backoff_utils._clock.VirtualClock>`), and
+          otherwise :func:`time.sleep() <python:time.sleep>` (or
+          :func:`asyncio.sleep() <python:asyncio.sleep>` when applied to a
+          coroutine).
+
+          Defaults to :class:`None <python:None>`.
+        :type sleeper: callable / :class:`None <python:None>`
+
+        :param retry_budget: The :class:`RetryBudget <backoff_utils._budget.RetryBudget>`
+          (or the name of the budget) to withdraw a token from before each retry
+          attempt, and to deposit in after each successful call. If the budget is
+          exhausted, gives up rather than retrying.
+
+          If :class:`None <python:None>`, retries are not limited by a budget.
+
+          Defaults to :class:`None <python:None>`.
+        :type retry_budget: :class:`RetryBudget <backoff_utils._budget.RetryBudget>` /
+          :class:`str <python:str>` / :class:`None <python:None>`
+
+        :param circuit_breaker: The
+          :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>`
+          (or the name of the circuit breaker) that records the outcome of each
+          attempt. While it is open, calls raise
+          :class:`CircuitOpenError <backoff_utils._circuit_breaker.CircuitOpenError>`
+          instead of making their first attempt, and give up rather than
+          retrying.
+
+          If :class:`None <python:None>`, no circuit breaker is applied.
+
+          Defaults to :class:`None <python:None>`.
+        :type circuit_breaker: :class:`CircuitBreaker <backoff_utils._circuit_breaker.CircuitBreaker>` /
+          :class:`str <python:str>` / :class:`None <python:None>`
+
+        :param listeners: The :class:`RetryListener <backoff_utils._events.RetryListener>`
+          (or listeners) to notify as each attempt starts and ends, before each
+          retry, and when giving up. The
+          :class:`AdaptiveController <backoff_utils._adaptive.AdaptiveController>`
+          of an :class:`Adaptive <backoff_utils.strategies.Adaptive>` strategy is
+          always notified, whether or not it is supplied here.
+
+          If :class:`None <python:None>`, no events are created.
+
+          Defaults to :class:`None <python:None>`.
+        :type listeners: :class:`RetryListener <backoff_utils._events.RetryListener>` /
+          iterable of :class:`RetryListener <backoff_utils._events.RetryListener>` /
+          :class:`None <python:None>`
+
+        :param giveup: A function that receives each exception caught per
+          ``catch_exceptions``, and returns ``True`` if the call should give up rather
+          than retry it (e.g. because an HTTP error's status code shows that retrying
+          will not help). If :class:`None <python:None>`, every exception caught is
+          retried.
+
+          Defaults to :class:`None <python:None>`.
+        :type giveup: callable / :class:`None <python:None>`
+
+        :param retry_on_result: A function that receives the value returned by each
+          attempt, and returns ``True`` if the attempt should be retried as if it had
+          failed (e.g. because it returned :class:`None <python:None>` or an HTTP 503
+          response). If the call gives up while the value is still rejected (e.g.
+          because ``max_tries`` has been reached), the last value is returned and
+          ``on_success`` is not called. If :class:`None <python:None>`, every value
+          returned is accepted.
+
+          Defaults to :class:`None <python:None>`.
+        :type retry_on_result: callable / :class:`None <python:None>`
+
+        :param retry_after: A function that receives each exception caught per
+          ``catch_exceptions`` (or each value rejected by ``retry_on_result``), and
+          returns the number of seconds the server asked to wait before retrying
+          (e.g. read from an HTTP ``Retry-After`` header using
+          :func:`parse_retry_after() <backoff_utils._retry_after.parse_retry_after>`),
+          or :class:`None <python:None>` if it gave no hint. The strategy's delay is
+          lengthened to at least the hint (or replaced by it, per
+          ``retry_after_overrides``). If waiting as long as the hint asks would
+          overshoot ``max_delay``, the call gives up instead. If
+          :class:`None <python:None>`, the strategy's delays are applied.
+
+          Defaults to :class:`None <python:None>`.
+        :type retry_after: callable / :class:`None <python:None>`
+
+        :param retry_after_overrides: If ``True``, the delay returned by
+          ``retry_after`` replaces the strategy's delay, even if it is shorter. If
+          ``False``, it only ever lengthens the strategy's delay. Defaults to
+          ``False``.
+        :type retry_after_overrides: :class:`bool <python:bool>`
+
+        :param hedge: The :class:`Hedge <backoff_utils._hedge.Hedge>` (or the name
+          of a shared hedge) to apply to the first attempt of each call. If the
+          first attempt is slower than the hedge's threshold, a second attempt is
+          made in parallel (per ``retry_execute``), and the first to succeed is
+          returned.
+
+          If :class:`None <python:None>`, calls are not hedged.
+
+          Defaults to :class:`None <python:None>`.
+        :type hedge: :class:`Hedge <backoff_utils._hedge.Hedge>` /
+          :class:`str <python:str>` / :class:`None <python:None>`
+
+        :param attempt_timeout: The number of seconds each attempt may take before
+          it is abandoned and fails with an
+          :class:`AttemptTimeoutError <backoff_utils._policy.AttemptTimeoutError>`,
+          which is always retried. Either a fixed number of seconds, or a
+          :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>`
+          whose :func:`schedule() <backoff_utils.strategies.BackoffStrategy.schedule>`
+          gives the timeout of each successive attempt (so that timeouts can grow
+          from one attempt to the next). Timeouts are shortened so that no attempt
+          runs past ``max_delay``, and no late attempt is made once ``max_delay``
+          has elapsed (as if ``skip_late_attempt`` were ``True``).
+
+          Attempts are made on a worker thread so that they can be abandoned. An
+          abandoned attempt cannot be stopped, and is left to finish in the
+          background.
+
+          If :class:`None <python:None>`, attempts may take as long as they take.
+
+          Defaults to :class:`None <python:None>`.
+        :type attempt_timeout: :class:`float <python:float>` /
+          :class:`BackoffStrategy <backoff_utils.strategies.BackoffStrategy>` /
+          :class:`None <python:None>`
+
+        :param single_flight: The
+          :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` (or
+          the name of a shared single-flight) that coalesces concurrent calls. A
+          call made while an identical call (of the same function, with the same
+          key) is in flight waits for it, and shares its outcome rather than
+          running its own retry loop. If ``True``, applies a new single-flight
+          which keys calls on their arguments.
+
+          If :class:`None <python:None>`, calls are not coalesced.
+
+          Defaults to :class:`None <python:None>`.
+        :type single_flight: :class:`SingleFlight <backoff_utils._single_flight.SingleFlight>` /
+          :class:`str <python:str>` / :class:`bool <python:bool>` /
+          :class:`None <python:None>`
+
+        :raises TypeError: if ``strategy``, ``on_failure``, ``on_success``,
+          ``clock``, ``sleeper``, ``retry_budget``, ``circuit_breaker``,
+          ``listeners``, ``catch_exceptions``, ``giveup``, ``retry_on_result``,
+          ``retry_after``, ``hedge``, ``attempt_timeout``, or ``single_flight``
+          are of the wrong type
+        :raises ValueError: if ``attempt_timeout`` is a number that is not
+          positive, or ``hedge`` is a name under which no hedge is registered
+        """
+        if strategy is None:
+            strategy = strategies.Exponential
+
+        if not _is_strategy(strategy):
+            raise TypeError('strategy must be a BackoffStrategy or descendent')
+
+        self.strategy = strategy
+
+        if max_tries is None:
+            max_tries = DEFAULT_MAX_TRIES
+        if not isinstance(max_tries, int) or isinstance(max_tries, bool):
+            max_tries = validators.integer(max_tries)
+        self.max_tries = max_tries
+
+        if max_delay is None:
+            max_delay = DEFAULT_MAX_DELAY
+        if max_delay is not None and not isinstance(max_delay, (int, float)):
+            max_delay = validators.numeric(max_delay)
+        self.max_delay = max_delay
+
+        self.catch_exceptions = _get_catch_exceptions(catch_exceptions)
+        self._decisions = {}
+
+        if giveup is not None and not callable(giveup):
+            raise TypeError('giveup must be None or a callable')
+        self.giveup = giveup
+
+        if retry_on_result is not None and not callable(retry_on_result):
+            raise TypeError('retry_on_result must be None or a callable')
+        self.retry_on_result = retry_on_result
+
+        if retry_after is not None and not callable(retry_after):
+            raise TypeError('retry_after must be None or a callable')
+        self.retry_after = retry_after
+        self.retry_after_overrides = bool(retry_after_overrides)
+
+        if on_failure is not None and not callable(on_failure):
+            raise TypeError('on_failure must be None or a callable')
+        self.on_failure = on_failure
+
+        if on_success is not None and not callable(on_success):
+            raise TypeError('on_success must be None or a callable')
+        self.on_success = on_success
+
+        if clock is None:
+            clock = DEFAULT_CLOCK
+        elif not callable(getattr(clock, 'now', None)):
+            raise TypeError('clock must be None or a Clock')
+        self.clock = clock
+
+        self.skip_late_attempt = bool(skip_late_attempt)
+
+        if sleeper is None and callable(getattr(clock, 'sleep', None)):
+            sleeper = clock.sleep
+        elif sleeper is not None and not callable(sleeper):
+            raise TypeError('sleeper must be None or a callable')
+        self.sleeper = sleeper
+
+        self.retry_budget = _get_retry_budget(retry_budget)
+        self.circuit_breaker = _get_circuit_breaker(circuit_breaker)
+        self.hedge = _get_hedge(hedge)
+        self.attempt_timeout = _get_attempt_timeout(attempt_timeout)
+        self.single_flight = _get_single_flight(single_flight)
+
+        self.listeners = _get_listeners(listeners)
+        notified = self.listeners
+        controller = strategies._controller(strategy)                           # pylint: disable=protected-access
+        if controller is not None and controller not in notified:
+            notified = notified + (controller, )
+
+        self._hooks = None
+        if notified:
+            hooks = _Hooks(notified)
+            self._hooks = hooks if hooks else None
+
+        self._needs_bookkeeping = self.max_delay is not None or \
+                                  self.on_success is not None or \
+                                  self.retry_budget is not None or \
+                                  self.circuit_breaker is not None or \
+                                  self._hooks is not None or \
+                                  self.retry_on_result is not None or \
+                                  self.hedge is not None or \
+                                  self.attempt_timeout is not None or \
+                                  self.single_flight is not None
+
+    def __repr__(self):
+        return '<{}(strategy = {}, max_tries = {}, max_delay = {})>'.format(
+            self.__class__.__name__,
+            self.strategy,
+            self.max_tries,
+            self.max_delay
+        )
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_decisions'] = {}
+
+        return state
+
+    def call(self, to_execute, *args, **kwargs):
+        """Call ``to_execute`` with ``args`` and ``kwargs``, applying the policy.
+
+        This is the fast path used by
+        :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>`: the
+        same callable and arguments are used on every attempt, and neither they
+        nor the policy's configuration are validated.
+
+        :param to_execute: The function call that is to be attempted.
+        :type to_execute: callable
+
+        :returns: The result of the attempted function.
+        """
+        if self._needs_bookkeeping:
+            return self.execute(to_execute, args, kwargs)
+
+        try:
+            return to_execute(*args, **kwargs)
+        except Exception as attempt_error:                                      # pylint: disable=broad-except
+            error = attempt_error
+
+        # Retried outside of the except block, so that the errors raised by
+        # later attempts are not chained to this one.
+        return self._retry(error, None, to_execute, args, kwargs)
+
+    def wrap(self, to_execute):
+        """Return a function which calls ``to_execute`` under this policy.
+
+        The function returned accepts the same arguments as ``to_execute``. When
+        the policy has nothing to track around the first attempt, a successful
+        first attempt costs little more than calling ``to_execute`` directly.
+        That is the case unless the policy applies a ``max_delay``, an
+        ``on_success`` handler, a ``retry_budget``, a ``circuit_breaker``,
+        ``listeners`` (including the controller of an
+        :class:`Adaptive <backoff_utils.strategies.Adaptive>` strategy),
+        ``retry_on_result``, a ``hedge``, an ``attempt_timeout``, or a
+        ``single_flight``.
+
+        :param to_execute: The function call that is to be attempted.
+        :type to_execute: callable
+
+        :rtype: callable
+        """
+        if self._needs_bookkeeping:
+            execute = self.execute
+
+            def wrapper(*args, **kwargs):
+                return execute(to_execute, args, kwargs)
+        else:
+            retry = self._retry
+
+            def wrapper(*args, **kwargs):
+                try:
+                    return to_execute(*args, **kwargs)
+                except Exception as attempt_error:                              # pylint: disable=broad-except
+                    error = attempt_error
+
+                return retry(error, None, to_execute, args, kwargs)
+
+        return wrapper
+
+    def execute(self,
+                to_execute,
+                args = None,
+                kwargs = None,
+                retry_execute = None,
+                retry_args = None,
+                retry_kwargs = None):
+        """Execute ``to_execute``, applying the policy and falling back to
+        ``retry_execute`` on retry attempts.
+
+        :param to_execute: The function call that is to be attempted.
+        :type to_execute: callable
+
+        :param args: The positional arguments to pass to the function on the
+          first attempt.
+
+          If ``retry_args`` is :class:`None <python:None>`, will re-use these
+          arguments on retry attempts as well.
+        :type args: iterable / :class:`None <python:None>`.
+
+        :param kwargs: The keyword arguments to pass to the function on the first
+          attempt.
+
+          If ``retry_kwargs`` is :class:`None <python:None>`, will re-use these
+          keyword arguments on retry attempts as well.
+        :type kwargs: :class:`dict <python:dict>` / :class:`None <python:None>`
+
+        :param retry_execute: The function to call on retry attempts.
+
+          If :class:`None <python:None>`, will retry ``to_execute``.
+        :type retry_execute: callable / :class:`None <python:None>`
+
+        :param retry_args: The positional arguments to pass to the function on
+          retry attempts.
+
+          If :class:`None <python:None>`, will re-use ``args``.
+        :type retry_args: iterable / :class:`None <python:None>`
+
+        :param retry_kwargs: The keyword arguments to pass to the function on
+          retry attempts.
+
+          If :class:`None <python:None>`, will re-use ``kwargs``.
+        :type retry_kwargs: :class:`dict <python:dict>` / :class:`None <python:None>`
+
+        :returns: The result of the attempted function.
+
+        :raises CircuitOpenError: if the policy's ``circuit_breaker`` is open
+        """
+        args = args or ()
+        kwargs = kwargs or {}
+        if retry_execute is None:
+            retry_execute = to_execute
+        if not retry_args:
+            retry_args = args
+        if not retry_kwargs:
+            retry_kwargs = kwargs
+
+        if self.single_flight is not None:
+            return self.single_flight._call(self._execute,                      # pylint: disable=protected-access
+                                            to_execute,
+                                            args,
+                                            kwargs,
+                                            retry_execute,
+                                            retry_args,
+                                            retry_kwargs)
+
+        return self._execute(to_execute,
+                             args,
+                             kwargs,
+                             retry_execute,
+                             retry_args,
+                             retry_kwargs)
+
+    def _execute(self,
+                 to_execute,
+                 args,
+                 kwargs,
+                 retry_execute,
+                 retry_args,
+                 retry_kwargs):
+        """Execute ``to_execute``, applying the policy (other than its
+        ``single_flight``) to arguments already normalized by
+        :func:`execute() <RetryPolicy.execute>`.
+
+        :returns: The result of the attempted function.
+        """
+        deadline = None
+        if self.max_delay is not None:
+            deadline = self.clock.now() + self.max_delay
+            self._check_timeout(deadline)
+
+        self._check_circuit()
+
+        timeouts = self._timeouts()
+        attempt, attempt_args, attempt_kwargs = to_execute, args, kwargs
+        if self.hedge is not None:
+            attempt = self.hedge._call                                          # pylint: disable=protected-access
+            attempt_args = (to_execute,
+                            args,
+                            kwargs,
+                            retry_execute,
+                            retry_args,
+                            retry_kwargs)
+            attempt_kwargs = {}
+
+        observer = self._observe(to_execute)
+        if observer is not None:
+            observer.attempt_start(1)
+
+        try:
+            if timeouts is None:
+                return_value = attempt(*attempt_args, **attempt_kwargs)
+            else:
+                return_value = _call_with_timeout(attempt,
+                                                  attempt_args,
+                                                  attempt_kwargs,
+                                                  self._next_timeout(timeouts,
+                                                                     deadline))
+        except Exception as attempt_error:                                      # pylint: disable=broad-except
+            error = attempt_error
+        else:
+            if self.retry_on_result is None or \
+               not self.retry_on_result(return_value):
+                if observer is not None:
+                    observer.attempt_end(1, value = return_value)
+
+                self._handle_success(return_value)
+
+                return return_value
+
+            error = _RejectedResult(return_value)
+
+        if observer is not None:
+            observer.attempt_end(1, error = error)
+
+        # Retried outside of the except block, so that the errors raised by
+        # later attempts are not chained to this one.
+        return self._retry(error,
+                           deadline,
+                           retry_execute,
+                           retry_args,
+                           retry_kwargs,
+                           observer,
+                           timeouts)
+
+    def call_async(self, to_execute, *args, **kwargs):
+        """Return a coroutine which awaits ``to_execute`` with ``args`` and
+        ``kwargs``, applying the policy.
+
+        This is the asynchronous equivalent of :func:`call() <RetryPolicy.call>`,
+        and waits between attempts using
+        :func:`asyncio.sleep() <python:asyncio.sleep>`.
+
+        .. note::
+
+          Only available on Python 3.5 or higher.
+
+        :param to_execute: The function or coroutine function that is to be
+          attempted.
+        :type to_execute: callable / coroutine function
+
+        :returns: A coroutine which returns the result of the attempted function.
+        """
+        from backoff_utils._async_backoff import _execute_async                 # pylint: disable=cyclic-import
+
+        return _execute_async(self, to_execute, args, kwargs)
+
+    def is_retryable(self, error):
+        """Indicate whether ``error`` should be retried under this policy.
+
+        ``error`` is retryable if it is an instance of one of the
+        ``catch_exceptions`` (or of a subclass), and ``giveup`` (if supplied) does
+        not return ``True`` for it. Whether each type of exception matches the
+        ``catch_exceptions`` is cached, so classifying an error takes constant
+        time however many ``catch_exceptions`` there are.
+
+        :param error: The exception that was raised.
+        :type error: :class:`Exception <python:Exception>`
+
+        :rtype: :class:`bool <python:bool>`
+        """
+        error_type = type(error)
+        caught = self._decisions.get(error_type)
+        if caught is None:
+            caught = issubclass(error_type, self.catch_exceptions)
+            if len(self._decisions) < _MAX_CACHED_DECISIONS:
+                self._decisions[error_type] = caught
+
+        if caught and self.giveup is not None:
+            return not self.giveup(error)
+
+        return caught
+
+    def _check_timeout(self, deadline):
+        """Raise a timeout if the :attr:`clock` has already reached ``deadline``.
+
+        :param deadline: The time (per the :attr:`clock`) at which ``max_delay``
+          elapses.
+        :type deadline: :class:`float <python:float>`
+
+        :raises BackoffTimeoutError: if ``deadline`` has been reached
+        """
+        now = self.clock.now()
+        if now >= deadline:
+            raise BackoffTimeoutError('backoff timed out after:'
+                                      ' {}s'.format(now - deadline + self.max_delay))
+
+    def _observe(self, to_execute):
+        """Return the observer that dispatches the events of a call to
+        ``to_execute`` to the policy's listeners, or :class:`None <python:None>`
+        if the policy has no listeners.
+
+        :rtype: :class:`_Observer <backoff_utils._events._Observer>` /
+          :class:`None <python:None>`
+        """
+        if self._hooks is None:
+            return None
+
+        return _Observer(self._hooks, self.clock, to_execute, self.strategy)
+
+    def _check_circuit(self):
+        """Raise an error if the policy's ``circuit_breaker`` does not allow an
+        attempt to be made.
+
+        :raises CircuitOpenError: if the ``circuit_breaker`` is open
+        """
+        if self.circuit_breaker is not None and \
+           not self.circuit_breaker.allow_request():
+            raise CircuitOpenError('circuit breaker is open')
+
+    def _record_error(self, retryable):
+        """Record a failed attempt with the policy's ``circuit_breaker`` (if
+        any).
+
+        Only errors that the policy would retry (and rejected results) are
+        recorded as failures. Any other error shows that the dependency
+        responded, and so is recorded as a success.
+
+        :param retryable: Whether the attempt's error would be retried.
+        :type retryable: :class:`bool <python:bool>`
+        """
+        if self.circuit_breaker is None:
+            return
+
+        if retryable:
+            self.circuit_breaker.record_failure()
+        else:
+            self.circuit_breaker.record_success()
+
+    def _may_retry(self):
+        """Indicate whether the policy's ``circuit_breaker`` and
+        ``retry_budget`` (if any) allow a retry attempt to be made, withdrawing a
+        token from the ``retry_budget`` if so.
+
+        Must only be called once the attempt is otherwise certain to be made: a
+        half-open ``circuit_breaker`` reserves its trial attempt for it, which is
+        released again if the ``retry_budget`` refuses it.
+
+        :rtype: :class:`bool <python:bool>`
+        """
+        if self.circuit_breaker is not None and \
+           not self.circuit_breaker.allow_request():
+            return False
+
+        if self.retry_budget is not None and \
+           not self.retry_budget.try_withdraw():
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.release_request()
+            return False
+
+        return True
+
+    def _handle_success(self, return_value):
+        """Record a successful attempt with the policy's ``circuit_breaker`` and
+        ``retry_budget`` (if any), and call ``on_success``.
+
+        :param return_value: The value returned by the attempt.
+        """
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+        if self.retry_budget is not None:
+            self.retry_budget.deposit()
+        if self.on_success is not None:
+            self.on_success(return_value)
+
+    def _give_up(self, error):
+        """Give up after the last attempt failed with ``error``.
+
+        :returns: The value returned by the last attempt if it was rejected by
+          ``retry_on_result``, or else :class:`None <python:None>` if the
+          failure was handled by ``on_failure`` without raising.
+        """
+        if isinstance(error, _RejectedResult):
+            return error.value
+
+        _handle_failure(on_failure = self.on_failure,
+                        error = error)
+
+        return None
+
+    def _retry_after_hint(self, error):
+        """Return the number of seconds that ``retry_after`` asks to wait before
+        retrying after ``error``, or :class:`None <python:None>` if it gives no
+        hint.
+
+        :raises TypeError: if ``retry_after`` returns something other than a
+          number or :class:`None <python:None>`
+        """
+        if isinstance(error, _RejectedResult):
+            hint = self.retry_after(error.value)
+        else:
+            hint = self.retry_after(error)
+
+        if hint is None:
+            return None
+        if isinstance(hint, bool) or not isinstance(hint, (int, float)):
+            raise TypeError('retry_after must return None or a number, not '
+                            '{!r}'.format(hint))
+
+        return max(0.0, float(hint))
+
+    def _next_delay(self, delays, deadline, error = None):
+        """Return the number of seconds to wait before the next retry attempt.
+
+        The delay is taken from ``delays``, adjusted per the hint ``retry_after``
+        returns for ``error`` (if any) and, if there is a ``deadline``, shortened
+        so that it does not overshoot ``max_delay``. A hinted delay is never
+        shortened: if it would overshoot ``max_delay``, the policy times out.
+
+        :param delays: The schedule of delays being applied.
+        :type delays: generator of :class:`float <python:float>`
+
+        :param deadline: The time (per the :attr:`clock`) at which ``max_delay``
+          elapses, or :class:`None <python:None>` if there is no ``max_delay``.
+        :type deadline: :class:`float <python:float>` / :class:`None <python:None>`
+
+        :param error: The exception raised by the last attempt, or the
+          :class:`_RejectedResult <backoff_utils._events._RejectedResult>` it
+          returned.
+        :type error: :class:`Exception <python:Exception>` /
+          :class:`_RejectedResult <backoff_utils._events._RejectedResult>`
+
+        :returns: The number of seconds to wait, or :class:`None <python:None>` if
+          the policy has timed out.
+        :rtype: :class:`float <python:float>` / :class:`None <python:None>`
+        """
+        delay = next(delays)
+        hinted = False
+        if self.retry_after is not None:
+            hint = self._retry_after_hint(error)
+            if hint is not None and (self.retry_after_overrides or hint > delay):
+                delay = hint
+                hinted = True
+
+        if deadline is None:
+            return delay
+
+        remaining = deadline - self.clock.now()
+        if delay < remaining:
+            return delay
+        elif remaining > 0 and not self.skip_late_attempt and not hinted and \
+             self.attempt_timeout is None:
+            # An attempt made at the deadline would have no time left to run
+            # under an attempt_timeout, so it is only made without one.
+            return remaining
+
+        return None
+
+    def _plan_retry(self, error, failover_counter, delays, deadline):
+        """Return the number of seconds to wait before retrying after an attempt
+        raised ``error``, or :class:`None <python:None>` if it should not be
+        retried.
+
+        :param error: The exception raised by the last attempt, or the
+          :class:`_RejectedResult <backoff_utils._events._RejectedResult>` it
+          returned.
+        :type error: :class:`Exception <python:Exception>` /
+          :class:`_RejectedResult <backoff_utils._events._RejectedResult>`
+
+        :param failover_counter: The number of retry attempts made so far.
+        :type failover_counter: :class:`int <python:int>`
+
+        :param delays: The schedule of delays being applied.
+        :type delays: generator of :class:`float <python:float>`
+
+        :param deadline: The time (per the :attr:`clock`) at which ``max_delay``
+          elapses, or :class:`None <python:None>` if there is no ``max_delay``.
+        :type deadline: :class:`float <python:float>` / :class:`None <python:None>`
+
+        :rtype: :class:`float <python:float>` / :class:`None <python:None>`
+        """
+        retryable = isinstance(error, (_RejectedResult, AttemptTimeoutError)) or \
+                    self.is_retryable(error)
+        self._record_error(retryable)
+        if not retryable or failover_counter >= self.max_tries:
+            return None
+
+        delay = self._next_delay(delays, deadline, error)
+        if delay is None or not self._may_retry():
+            return None
+
+        return delay
+
+    def _timeouts(self):
+        """Return a generator of the timeout of each successive attempt of a
+        call, or :class:`None <python:None>` if attempts are not timed out."""
+        if self.attempt_timeout is None:
+            return None
+        if isinstance(self.attempt_timeout, float):
+            return itertools.repeat(self.attempt_timeout)
+
+        return self.attempt_timeout.schedule()
+
+    def _next_timeout(self, timeouts, deadline):
+        """Return the number of seconds the next attempt may take, taken from
+        ``timeouts`` and shortened so that the attempt does not run past the
+        ``deadline`` (if any).
+
+        :rtype: :class:`float <python:float>`
+        """
+        timeout = next(timeouts)
+        if deadline is not None:
+            timeout = min(timeout, max(0.0, deadline - self.clock.now()))
+
+        return timeout
+
+    def _retry(self,
+               error,
+               deadline,
+               retry_execute,
+               retry_args,
+               retry_kwargs,
+               observer = None,
+               timeouts = None):
+        """Retry ``retry_execute`` after the first attempt raised ``error`` (or
+        returned a result rejected by ``retry_on_result``).
+
+        :returns: The result of the attempted function, or
+          :class:`None <python:None>` if the failure was handled by
+          ``on_failure`` without raising.
+        """
+        sleep = self.sleeper if self.sleeper is not None else time.sleep
+        delays = self.strategy.schedule()
+        failover_counter = 0
+        while True:
+            delay = self._plan_retry(error, failover_counter, delays, deadline)
+            if delay is None:
+                if observer is not None:
+                    observer.giveup(failover_counter + 1, error)
+                return self._give_up(error)
+
+            if observer is not None:
+                observer.retry(failover_counter + 1, error, delay)
+            sleep(delay)
+            failover_counter += 1
+
+            if observer is not None:
+                observer.attempt_start(failover_counter + 1)
+            try:
+                if timeouts is None:
+                    return_value = retry_execute(*retry_args, **retry_kwargs)
+                else:
+                    return_value = _call_with_timeout(retry_execute,
+                                                      retry_args,
+                                                      retry_kwargs,
+                                                      self._next_timeout(timeouts,
+                                                                         deadline))
+            except Exception as retry_error:                                    # pylint: disable=broad-except
+                error = retry_error
+                if observer is not None:
+                    observer.attempt_end(failover_counter + 1, error = error)
+                continue
+
+            if self.retry_on_result is not None and self.retry_on_result(return_value):
+                error = _RejectedResult(return_value)
+                if observer is not None:
+                    observer.attempt_end(failover_counter + 1, error = error)
+                continue
+
+            if observer is not None:
+                observer.attempt_end(failover_counter + 1, value = return_value)
+
+            self._handle_success(return_value)
+
+            return return_value
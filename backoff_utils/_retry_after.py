@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._retry_after
+#########################
+
+Implements :func:`parse_retry_after`, which converts the delay hints returned by
+servers (e.g. HTTP ``Retry-After`` headers) into a number of seconds to wait,
+for use by a policy's ``retry_after`` function.
+
+"""
+import email.utils
+import math
+import time
+
+
+def parse_retry_after(value, timestamp = False):
+    """Return the number of seconds to wait before retrying, per a delay hint
+    returned by a server.
+
+    Accepts either form of the HTTP ``Retry-After`` header: a number of seconds
+    (e.g. ``'120'``) or an HTTP-date (e.g. ``'Wed, 21 Oct 2015 07:28:00 GMT'``).
+    Numbers are accepted as well as strings.
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, parse_retry_after
+
+      def server_hint(error):
+          return parse_retry_after(error.response.headers.get('Retry-After'))
+
+      @apply_backoff(max_tries = 5, retry_after = server_hint)
+      def get_inventory(item_id):
+          pass
+
+    :param value: The delay hint, or :class:`None <python:None>` if the server
+      gave none.
+    :type value: :class:`str <python:str>` / number / :class:`None <python:None>`
+
+    :param timestamp: If ``True``, a numeric ``value`` is the Unix time at which to
+      retry (as in the ``X-RateLimit-Reset`` header returned by many APIs), rather
+      than a number of seconds. Defaults to ``False``.
+    :type timestamp: :class:`bool <python:bool>`
+
+    :returns: The number of seconds to wait (never negative), or
+      :class:`None <python:None>` if ``value`` is :class:`None <python:None>` or
+      cannot be parsed.
+    :rtype: :class:`float <python:float>` / :class:`None <python:None>`
+    """
+    if value is None or isinstance(value, bool):
+        return None
+
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = None
+
+    if seconds is None:
+        try:
+            parsed = email.utils.parsedate_tz(value.strip())
+        except (AttributeError, TypeError, ValueError):
+            parsed = None
+        if parsed is None:
+            return None
+
+        seconds = email.utils.mktime_tz(parsed) - time.time()
+    elif timestamp:
+        seconds = seconds - time.time()
+
+    if math.isnan(seconds) or math.isinf(seconds):
+        return None
+
+    return max(0.0, seconds)
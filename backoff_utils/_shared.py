@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._shared
+######################
+
+Implements the :class:`_Shared` mix-in, which lets the thread-safe objects that
+backoff calls share (e.g. retry budgets and circuit breakers) be registered by
+name, and be pickled without their locks.
+
+"""
+import threading
+
+_REGISTRY_LOCK = threading.Lock()
+
+
+class _Shared(object):
+    """A mix-in for thread-safe objects which can be shared (by name) between any
+    number of backoff calls.
+
+    Subclasses declare their own ``_REGISTRY`` (the :class:`dict <python:dict>` of
+    instances registered by name), and create their lock (along with any other
+    state which cannot be pickled) in :meth:`_setup`. When pickled, they keep
+    every other attribute, or only those listed in ``_PICKLED`` if it is not
+    :class:`None <python:None>`, and are set up afresh when unpickled.
+    """
+
+    _REGISTRY = None
+    _PICKLED = None
+
+    def _setup(self):
+        """Create the lock (and any other state which is not pickled)."""
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        if self._PICKLED is not None:
+            return dict((name, getattr(self, name)) for name in self._PICKLED)
+
+        state = self.__dict__.copy()
+        del state['_lock']
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    @classmethod
+    def named(cls, name, **kwargs):
+        """Return the instance registered under ``name``, creating (and
+        registering) it if it does not exist yet.
+
+        :param name: The name of the instance.
+        :type name: :class:`str <python:str>`
+
+        :param kwargs: The configuration to apply if the instance is created.
+          Ignored if an instance is already registered under ``name``.
+        """
+        with _REGISTRY_LOCK:
+            instance = cls._REGISTRY.get(name)
+            if instance is None:
+                instance = cls(**kwargs)
+                cls._REGISTRY[name] = instance
+
+        return instance
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._single_flight
+#############################
+
+Implements the :class:`SingleFlight` class, which coalesces concurrent backoff
+calls of the same function with the same arguments, so that only one of them
+runs the retry loop and the others share its outcome.
+
+"""
+import threading
+
+from validator_collection import checkers
+
+from backoff_utils._shared import _Shared
+
+
+class _Flight(object):
+    """A call in flight, which any number of concurrent calls are waiting on."""
+
+    __slots__ = ('done', 'completed', 'value', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.completed = False
+        self.value = None
+        self.error = None
+
+
+class SingleFlight(_Shared):
+    """A thread-safe record of the backoff calls in flight, which can be shared by
+    any number of callers to coalesce their identical calls.
+
+    When many threads make the same call at once (e.g. after a cache entry
+    expires), and the dependency behind it is failing, each of them would
+    otherwise run its own retry loop against it. Under a single-flight, only the
+    first call (the *leader*) runs. Calls of the same function with the same
+    ``key`` that are made while the leader is in flight (the *followers*) wait for
+    it instead, and return the value it returns (or raise the error it raises).
+    Once the leader completes, the next call starts a new flight.
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, SingleFlight
+
+      @apply_backoff(max_tries = 5,
+                     single_flight = SingleFlight(key = lambda item_id: item_id))
+      def load_inventory(item_id):
+          pass
+
+    By default, calls are keyed on their positional and keyword arguments, which
+    must then be hashable. Passing ``single_flight = True`` to
+    :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>` applies a new
+    single-flight with the default key.
+
+    .. caution::
+
+      Followers receive the very object the leader returns (or raises), so it
+      should not be mutated by the caller.
+    """
+
+    _REGISTRY = {}
+    _PICKLED = ('key', )
+
+    def __init__(self, key = None):
+        """
+        :param key: A function which receives the positional and keyword
+          arguments of a call, and returns a hashable value identifying the calls
+          that may share its outcome. If :class:`None <python:None>`, calls are
+          keyed on their arguments. Defaults to :class:`None <python:None>`.
+        :type key: callable / :class:`None <python:None>`
+
+        :raises TypeError: if ``key`` is not callable
+        """
+        if key is not None and not checkers.is_callable(key):
+            raise TypeError('key must be None or a callable')
+
+        self.key = key
+
+        self._setup()
+
+    def _setup(self):
+        """Create the (empty) record of the calls in flight."""
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._calls = 0
+        self._shared = 0
+
+    def __repr__(self):
+        return '<{}(key = {})>'.format(self.__class__.__name__, self.key)
+
+    @property
+    def calls(self):
+        """The number of calls made under the single-flight.
+
+        :rtype: :class:`int <python:int>`
+        """
+        return self._calls
+
+    @property
+    def shared(self):
+        """The number of calls which shared the outcome of a call already in
+        flight, rather than running their own.
+
+        :rtype: :class:`int <python:int>`
+        """
+        return self._shared
+
+    @property
+    def in_flight(self):
+        """The number of calls currently in flight.
+
+        :rtype: :class:`int <python:int>`
+        """
+        return len(self._flights)
+
+    def _key(self, to_execute, args, kwargs):
+        """Return the key identifying the calls of ``to_execute`` with ``args``
+        and ``kwargs`` that may share an outcome.
+
+        :raises TypeError: if the key is not hashable
+        """
+        if self.key is None:
+            key = to_execute, tuple(args), tuple(sorted(kwargs.items()))
+        else:
+            key = to_execute, self.key(*args, **kwargs)
+
+        try:
+            hash(key)
+        except TypeError:
+            if self.key is None:
+                raise TypeError('calls are keyed on their arguments by default, '
+                                'which must then be hashable: supply a key to '
+                                'the SingleFlight to key calls with unhashable '
+                                'arguments')
+            raise TypeError('the key of a SingleFlight must return a hashable '
+                            'value')
+
+        return key
+
+    def _join(self, key, new_flight):
+        """Join the flight of the call identified by ``key``, starting it (as
+        returned by ``new_flight()``) if none is in flight.
+
+        :returns: The flight, and whether the caller leads it.
+        :rtype: :class:`tuple <python:tuple>`
+        """
+        with self._lock:
+            self._calls += 1
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._shared += 1
+                return flight, False
+
+            flight = self._flights[key] = new_flight()
+
+        return flight, True
+
+    def _land(self, key):
+        """Remove the flight of the call identified by ``key``, so that the next
+        call starts a new one."""
+        with self._lock:
+            del self._flights[key]
+
+    def _call(self, execute, to_execute, args, kwargs, *execute_args):
+        """Call ``execute`` with ``to_execute``, ``args``, ``kwargs`` and
+        ``execute_args``, unless an identical call is already in flight, in which
+        case wait for it instead.
+
+        If the call in flight is interrupted (e.g. by a
+        :class:`KeyboardInterrupt <python:KeyboardInterrupt>`) without an outcome,
+        its followers make their own calls instead.
+
+        :returns: The value returned by the call in flight.
+
+        :raises Exception: the error raised by the call in flight
+        """
+        key = self._key(to_execute, args, kwargs)
+        flight, leader = self._join(key, _Flight)
+        if not leader:
+            flight.done.wait()
+            if not flight.completed:
+                return execute(to_execute, args, kwargs, *execute_args)
+            if flight.error is not None:
+                raise flight.error
+
+            return flight.value
+
+        try:
+            flight.value = execute(to_execute, args, kwargs, *execute_args)
+            flight.completed = True
+        except Exception as error:                                              # pylint: disable=broad-except
+            flight.error = error
+            flight.completed = True
+            raise
+        finally:
+            self._land(key)
+            flight.done.set()
+
+        return flight.value
+
+
+def _get_single_flight(value):
+    """Return ``value`` as a :class:`SingleFlight`, looking it up by name if it is
+    a string, or creating a new one if it is ``True``.
+
+    :raises TypeError: if ``value`` is not :class:`None <python:None>`, a
+      :class:`bool <python:bool>`, a :class:`SingleFlight`, or a name
+    """
+    if value is None or value is False:
+        return None
+    if value is True:
+        return SingleFlight()
+    if isinstance(value, SingleFlight):
+        return value
+
+    if checkers.is_string(value):
+        return SingleFlight.named(value)
+
+    raise TypeError('single_flight must be None, a bool, a SingleFlight, or a name')
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+backoff_utils._tracing
+#########################
+
+Implements the :class:`TracingListener`, which records each backoff call as an
+`OpenTelemetry <https://opentelemetry.io/>`_ span, with a child span for each
+attempt and for each wait between attempts.
+
+"""
+try:
+    from opentelemetry import context as otel_context
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_context = None
+    otel_trace = None
+
+from backoff_utils._events import RetryListener, _function_name
+
+#: Indicates whether the ``opentelemetry-api`` package is installed.
+supports_tracing = otel_trace is not None
+
+
+def _strategy_name(strategy):
+    """Return the name of ``strategy``, which may be a class or an instance."""
+    if isinstance(strategy, type):
+        return strategy.__name__
+
+    return type(strategy).__name__
+
+
+class _Spans(object):
+    """The open spans of a single call."""
+
+    __slots__ = ('call', 'attempt', 'sleep', 'token')
+
+    def __init__(self, call):
+        self.call = call
+        self.attempt = None
+        self.sleep = None
+        self.token = None
+
+
+class TracingListener(RetryListener):
+    """A :class:`RetryListener <backoff_utils._events.RetryListener>` that records
+    each backoff call as an `OpenTelemetry <https://opentelemetry.io/>`_ span.
+
+    The call's span (``backoff <function>``) is a child of whichever span is
+    current when the call is made, and has a child span for each attempt
+    (``backoff.attempt``) and for each wait between attempts (``backoff.sleep``),
+    so the time spent retrying is visible in your traces. While an attempt is
+    being made, its span is the current span, so any spans started by the
+    function being attempted are nested within it.
+
+    Spans carry the following attributes:
+
+    * ``backoff.function`` and ``backoff.strategy`` (call spans)
+    * ``backoff.attempts``: the number of attempts made (call spans)
+    * ``backoff.attempt``: the number of the attempt (attempt and sleep spans)
+    * ``backoff.delay``: the number of seconds waited (sleep spans)
+
+    The status of the spans of failed attempts (and of calls that gave up) is set
+    to ``ERROR``, and the errors they raised are recorded on them.
+
+    .. code-block:: python
+
+      from backoff_utils import apply_backoff, TracingListener
+
+      @apply_backoff(max_tries = 5, listeners = TracingListener())
+      def get_inventory(item_id):
+          pass
+
+    .. note::
+
+      Requires the ``opentelemetry-api`` package, which can be installed using
+      ``pip install backoff-utils[tracing]``.
+    """
+
+    def __init__(self, tracer = None):
+        """
+        :param tracer: The OpenTelemetry ``Tracer`` used to start spans. If
+          :class:`None <python:None>`, obtains the tracer named
+          ``'backoff_utils'`` from the global tracer provider. Defaults to
+          :class:`None <python:None>`.
+        :type tracer: ``opentelemetry.trace.Tracer`` / :class:`None <python:None>`
+
+        :raises ImportError: if the ``opentelemetry-api`` package is not installed
+        :raises TypeError: if ``tracer`` is not a ``Tracer``
+        """
+        if not supports_tracing:
+            raise ImportError('TracingListener requires the opentelemetry-api '
+                              'package, which can be installed using: '
+                              'pip install backoff-utils[tracing]')
+
+        super(TracingListener, self).__init__()
+
+        if tracer is None:
+            tracer = otel_trace.get_tracer('backoff_utils')
+        elif not callable(getattr(tracer, 'start_span', None)):
+            raise TypeError('tracer must be None or a Tracer')
+        self.tracer = tracer
+
+    def __repr__(self):
+        return '<{}(tracer = {})>'.format(self.__class__.__name__, self.tracer)
+
+    def _start_span(self, name, parent, attributes):
+        """Start a span named ``name`` as a child of the span ``parent``."""
+        return self.tracer.start_span(name,
+                                      context = otel_trace.set_span_in_context(parent),
+                                      attributes = attributes)
+
+    @staticmethod
+    def _fail(span, event):
+        """Record the failure reported by ``event`` on ``span`` and set its
+        status to ``ERROR``."""
+        error = event.error
+        if error is None:
+            description = 'result rejected: {!r}'.format(event.value)
+        else:
+            span.record_exception(error)
+            description = '{}: {}'.format(type(error).__name__, error)
+
+        span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR,
+                                          description))
+
+    def on_attempt_start(self, event):
+        spans = event.state.get(self)
+        if spans is None:
+            name = _function_name(event.function)
+            spans = event.state[self] = _Spans(self.tracer.start_span(
+                'backoff {}'.format(name),
+                attributes = {
+                    'backoff.function': name,
+                    'backoff.strategy': _strategy_name(event.strategy)
+                }
+            ))
+        elif spans.sleep is not None:
+            spans.sleep.end()
+            spans.sleep = None
+
+        spans.attempt = self._start_span('backoff.attempt',
+                                         spans.call,
+                                         {'backoff.attempt': event.attempt})
+        spans.token = otel_context.attach(otel_trace.set_span_in_context(spans.attempt))
+
+    def on_attempt_end(self, event):
+        spans = event.state[self]
+        otel_context.detach(spans.token)
+        spans.token = None
+
+        if event.failed:
+            self._fail(spans.attempt, event)
+        spans.attempt.end()
+        spans.attempt = None
+
+        if not event.failed:
+            self._end_call(event)
+
+    def on_retry(self, event):
+        spans = event.state[self]
+        spans.sleep = self._start_span('backoff.sleep',
+                                       spans.call,
+                                       {
+                                           'backoff.attempt': event.attempt,
+                                           'backoff.delay': event.delay
+                                       })
+
+    def on_giveup(self, event):
+        self._end_call(event)
+
+    def _end_call(self, event):
+        """End the span of the call that ``event`` belongs to."""
+        spans = event.state.pop(self)
+        spans.call.set_attribute('backoff.attempts', event.attempt)
+        if event.failed:
+            self._fail(spans.call, event)
+        spans.call.end()
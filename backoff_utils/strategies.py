@@ -9,11 +9,203 @@ library.
 
 """
 import abc
+import functools
+import inspect
+import itertools
+import os
 import time
 import random
+import threading
+import types
 
 import validator_collection as validators
 
+from backoff_utils._adaptive import AdaptiveController, _get_adaptive_controller
+
+
+#: The Fibonacci numbers used by :class:`Fibonacci`, indexed by attempt. Only
+#: ever appended to (while holding ``_FIBONACCI_LOCK``).
+_FIBONACCI_SEQUENCE = [1, 2]
+_FIBONACCI_LOCK = threading.Lock()
+
+#: The longest base delay (in seconds) a strategy calculates. Longer base delays
+#: (e.g. exponential delays after more than a thousand attempts) are saturated
+#: to it, so that they can still be handled as floats and capped by
+#: ``max_single_delay``.
+_MAX_BASE_DELAY = float(2 ** 1023)
+
+#: The highest attempt number whose :class:`Fibonacci` number is calculated.
+#: Its Fibonacci number already exceeds ``_MAX_BASE_DELAY``, so later attempts
+#: share it.
+_MAX_FIBONACCI_ATTEMPT = 1500
+
+#: Holds the random number generator of each thread (see ``_thread_rng()``).
+_THREAD_STATE = threading.local()
+
+
+def _saturate(value):
+    """Return ``value`` as a :class:`float <python:float>`, saturated to
+    ``_MAX_BASE_DELAY``."""
+    if value > _MAX_BASE_DELAY:
+        return _MAX_BASE_DELAY
+
+    return float(value)
+
+
+def _exponential(attempt):
+    """Return ``2 ** attempt`` as a :class:`float <python:float>`, saturated to
+    ``_MAX_BASE_DELAY``."""
+    if attempt < 1024:
+        return float(2**attempt)
+
+    return _MAX_BASE_DELAY
+
+
+def _integer(value):
+    """Return ``value`` validated as an :class:`int <python:int>`, skipping the
+    (comparatively expensive) validator when it already is one."""
+    if type(value) is int:                                                      # pylint: disable=unidiomatic-typecheck
+        return value
+
+    return validators.integer(value)
+
+
+def _float(value):
+    """Return ``value`` validated as a :class:`float <python:float>`, skipping the
+    (comparatively expensive) validator when it already is one."""
+    if type(value) is float:                                                    # pylint: disable=unidiomatic-typecheck
+        return value
+    elif type(value) is int:                                                    # pylint: disable=unidiomatic-typecheck
+        return float(value)
+
+    return validators.float(value)
+
+
+#: The default instance of each strategy class, shared by every call made on
+#: the class itself (see ``_default_strategy()``).
+_DEFAULT_STRATEGIES = {}
+
+
+def _default_strategy(strategy_class):
+    """Return the (shared) instance of ``strategy_class`` with its default
+    configuration, or :class:`None <python:None>` if it cannot be instantiated
+    without arguments.
+
+    Strategies are immutable, so a single default instance can safely be shared
+    by every thread.
+    """
+    try:
+        return _DEFAULT_STRATEGIES[strategy_class]
+    except KeyError:
+        pass
+
+    if inspect.isabstract(strategy_class):
+        return None
+
+    try:
+        strategy = strategy_class()
+    except TypeError:
+        return None
+
+    return _DEFAULT_STRATEGIES.setdefault(strategy_class, strategy)
+
+
+class _hybridmethod(object):
+    """Method decorator that binds the method to the instance when accessed on an
+    instance, and to the default instance of the class when accessed on the class.
+
+    This allows methods like :func:`schedule() <BackoffStrategy.schedule>` to be
+    called on either a strategy class (applying its defaults) or a configured
+    strategy instance (applying its configuration).
+    """
+
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            instance = _default_strategy(owner)
+        if instance is not None:
+            return types.MethodType(self.func, instance)
+
+        func = self.func
+
+        @functools.wraps(func)
+        def method(*args, **kwargs):
+            return func(owner(), *args, **kwargs)
+
+        return method
+
+
+def _thread_rng():
+    """Return the random number generator of the current thread, creating it
+    the first time it is needed.
+
+    Giving each thread its own generator means that threads applying jitter at
+    the same time never share (and contend on) the state of a single generator.
+
+    :rtype: :class:`random.Random <python:random.Random>`
+    """
+    try:
+        return _THREAD_STATE.rng
+    except AttributeError:
+        rng = _THREAD_STATE.rng = random.Random()
+
+        return rng
+
+
+def _reset_thread_rngs():
+    """Discard every thread's random number generator, so that a forked child
+    process does not repeat the jitter of its parent."""
+    global _THREAD_STATE                                                        # pylint: disable=global-statement,invalid-name
+    _THREAD_STATE = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child = _reset_thread_rngs)
+
+
+def _rng(rng, seed):
+    """Return the random number generator to apply given ``rng`` and ``seed``.
+
+    :raises TypeError: if ``rng`` is not a random number generator
+    :raises ValueError: if both ``rng`` and ``seed`` are supplied
+    """
+    if rng is not None:
+        if seed is not None:
+            raise ValueError('supply either an rng or a seed, not both')
+        if not callable(getattr(rng, 'random', None)) or \
+           not callable(getattr(rng, 'uniform', None)):
+            raise TypeError('rng must be None or a random.Random')
+
+        return rng
+
+    if seed is not None:
+        return random.Random(seed)
+
+    return None
+
+
+def _max_single_delay(value):
+    """Return ``value`` validated as a ``max_single_delay``."""
+    if value is None:
+        return None
+
+    value = _float(value)
+    if value < 0:
+        raise ValueError('max_single_delay cannot be negative')
+
+    return value
+
+
+class _instantiated(object):
+    """Descriptor that is ``False`` when read from a strategy class, and
+    ``True`` when read from an instance of one."""
+
+    def __get__(self, instance, owner):
+        return instance is not None
+
 
 def _add_metaclass(metaclass):
     """Class decorator for creating a class with a metaclass."""
@@ -33,21 +225,69 @@ def _add_metaclass(metaclass):
     return wrapper
 
 
-@_add_metaclass(abc.ABCMeta)
+class _StrategyMeta(abc.ABCMeta):
+    """Metaclass of the backoff strategies, which freezes each strategy once it
+    has been instantiated."""
+
+    def __call__(cls, *args, **kwargs):
+        strategy = super(_StrategyMeta, cls).__call__(*args, **kwargs)
+        object.__setattr__(strategy, '_frozen', True)
+
+        return strategy
+
+
+@_add_metaclass(_StrategyMeta)
 class BackoffStrategy(object):
     """Abstract Base Class that defines the standard interface exposed by all
-    backoff strategies supported by the library."""
+    backoff strategies supported by the library.
+
+    Strategies are immutable: their configuration is set when they are
+    instantiated and cannot be changed afterwards, and calculating a delay never
+    modifies the strategy. A single strategy instance can therefore be shared
+    by any number of threads and retry loops.
+    """
+
+    __slots__ = ('attempt',
+                 'minimum',
+                 'jitter',
+                 'scale_factor',
+                 'max_single_delay',
+                 'rng',
+                 'seed',
+                 '_frozen')
 
-    IS_INSTANTIATED = False
+    IS_INSTANTIATED = _instantiated()
 
     def __repr__(self):
         return '<{}>'.format(self.__class__.__name__)
 
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError('{} is immutable'.format(self.__class__.__name__))
+
+        object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        state = dict(getattr(self, '__dict__', {}))
+        for cls in self.__class__.__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if hasattr(self, name):
+                    state[name] = getattr(self, name)
+
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
     def __init__(self,
                  attempt = None,
                  minimum = 0.0,
                  jitter = True,
                  scale_factor = 1.0,
+                 max_single_delay = None,
+                 rng = None,
+                 seed = None,
                  **kwargs):
         """
         :param attempt: The number of the attempt that was last-attempted. This
@@ -67,14 +307,37 @@ class BackoffStrategy(object):
           adjust its scale. Defaults to ``1.0``.
         :type scale_factor: :class:`float <python:float>`
 
+        :param max_single_delay: The maximum delay to apply before any one retry
+          attempt, regardless of the attempt number. If
+          :class:`None <python:None>`, delays are not capped. Defaults to
+          :class:`None <python:None>`.
+        :type max_single_delay: number / :class:`None <python:None>`
+
+        :param rng: The random number generator used to randomize delays. If
+          :class:`None <python:None>`, each thread uses a generator of its own.
+          Defaults to :class:`None <python:None>`.
+        :type rng: :class:`random.Random <python:random.Random>` /
+          :class:`None <python:None>`
+
+        :param seed: The seed of the random number generator used to randomize
+          delays. If supplied, every :func:`schedule() <BackoffStrategy.schedule>`
+          of the strategy starts from this seed, and so yields the same delays.
+          Defaults to :class:`None <python:None>`.
+        :type seed: :class:`int <python:int>` / :class:`None <python:None>`
+
+        :raises ValueError: if ``max_single_delay`` is negative, or if both
+          ``rng`` and ``seed`` are supplied
+        :raises TypeError: if ``rng`` is not a random number generator
         """
         self.attempt = None
         if attempt is not None:
-            self.attempt = validators.integer(attempt)
+            self.attempt = _integer(attempt)
         self.minimum = minimum
         self.jitter = bool(jitter)
-        self.scale_factor = validators.float(scale_factor)
-        self.IS_INSTANTIATED = True
+        self.scale_factor = _float(scale_factor)
+        self.max_single_delay = _max_single_delay(max_single_delay)
+        self.rng = _rng(rng, seed)
+        self.seed = seed
 
         for kwarg in kwargs:
             if hasattr(self, kwarg):
@@ -92,12 +355,268 @@ class BackoffStrategy(object):
         """
         pass
 
-    @classmethod
-    def delay(cls,
+    def _base_delay(self, attempt):
+        """Return the base number of seconds to delay before retrying
+        ``attempt``, i.e. the :func:`time_to_sleep <BackoffStrategy.time_to_sleep>`
+        of the strategy for that attempt.
+
+        The built-in strategies calculate this directly. For other strategies,
+        :func:`time_to_sleep <BackoffStrategy.time_to_sleep>` is read from a copy
+        of the strategy configured with ``attempt``.
+
+        :rtype: :class:`float <python:float>`
+        """
+        if attempt == self.attempt:
+            return self.time_to_sleep
+
+        return self._replace(attempt = attempt).time_to_sleep
+
+    def _replace(self, **changes):
+        """Return a copy of the strategy with ``changes`` applied to its
+        (already-validated) configuration.
+
+        :rtype: :class:`BackoffStrategy`
+        """
+        state = self.__getstate__()
+        state.update(changes)
+
+        strategy = self.__class__.__new__(self.__class__)
+        strategy.__setstate__(state)
+
+        return strategy
+
+    def _configure(self,
+                   minimum = None,
+                   jitter = None,
+                   scale_factor = None,
+                   max_single_delay = None):
+        """Return the strategy with any of the supplied configuration applied,
+        which is the strategy itself if nothing was supplied.
+
+        :rtype: :class:`BackoffStrategy`
+        """
+        changes = {}
+        if minimum is not None:
+            changes['minimum'] = _float(minimum)
+        if jitter is not None:
+            changes['jitter'] = bool(jitter)
+        if scale_factor is not None:
+            changes['scale_factor'] = _float(scale_factor)
+        if max_single_delay is not None:
+            changes['max_single_delay'] = _max_single_delay(max_single_delay)
+
+        if not changes:
+            return self
+
+        return self._replace(**changes)
+
+    @_hybridmethod
+    def compute(self,
+                attempt,
+                minimum = None,
+                jitter = None,
+                scale_factor = None):
+        """Return the number of seconds to delay based on the ``attempt``, without
+        actually delaying.
+
+        This is the calculation applied by :func:`delay() <BackoffStrategy.delay>`,
+        and can be used by code that needs to sleep in some other way (e.g. using
+        :func:`asyncio.sleep() <python:asyncio.sleep>`). It does not modify the
+        strategy, and can be called either on a strategy class (applying its
+        defaults) or on a strategy instance (applying its configuration).
+
+        :param attempt: The number of the attempt that was last-attempted. This
+          value is used by the strategy to determine the amount of time to delay
+          before continuing.
+        :type attempt: :class:`int <python:int>`
+
+        :param minimum: The minimum number of seconds to delay.
+
+          If :class:`None <python:None>`, will apply either the strategy's
+          default or the instance's configured property.
+        :type minimum: number
+
+        :param jitter: If ``True``, will add a random float to the delay.
+
+          If ``False``, will not.
+
+          If :class:`None <python:None>`, will apply either the strategy's
+          default or the instance's configured property.
+        :type jitter: :class:`bool <python: bool>`
+
+        :param scale_factor: A factor by which the
+          :func:`time_to_sleep <BackoffStrategy.time_to_sleep>` is multiplied to
+          adjust its scale.
+
+          If :class:`None <python:None>`, will apply either the strategy's default
+          or the instance's configured property.
+        :type scale_factor: :class:`float <python:float>`
+
+        :returns: The number of seconds to delay before the next attempt.
+        :rtype: :class:`float <python:float>`
+
+        """
+        strategy = self._configure(minimum = minimum,
+                                   jitter = jitter,
+                                   scale_factor = scale_factor)
+        attempt = _integer(attempt)
+
+        return strategy._adjust(strategy._base_delay(attempt), strategy.rng)
+
+    def _adjust(self, time_to_sleep, rng = None):
+        """Apply the configured jitter, scale factor, minimum, and maximum to the
+        base ``time_to_sleep``.
+
+        :param rng: The random number generator to apply. If
+          :class:`None <python:None>`, applies the generator of the current
+          thread.
+        :type rng: :class:`random.Random <python:random.Random>` /
+          :class:`None <python:None>`
+
+        :rtype: :class:`float <python:float>`
+        """
+        if self.jitter:
+            if rng is None:
+                rng = _thread_rng()
+            time_to_sleep = time_to_sleep + rng.random()
+
+        time_to_sleep = time_to_sleep * self.scale_factor
+        if self.minimum and time_to_sleep < self.minimum:
+            time_to_sleep = float(self.minimum)
+
+        if self.max_single_delay is not None and \
+           time_to_sleep > self.max_single_delay:
+            return self.max_single_delay
+
+        return time_to_sleep
+
+    @_hybridmethod
+    def schedule(self,
+                 start = 0,
+                 minimum = None,
+                 jitter = None,
+                 scale_factor = None,
+                 max_single_delay = None):
+        """Return a generator that lazily yields the number of seconds to delay
+        before each successive retry attempt, without actually delaying.
+
+        The generator is infinite: the first value yielded is the delay for
+        attempt ``start``, the second for attempt ``start + 1``, and so on.
+        Advancing it does not change the strategy itself, so any number of
+        schedules can be consumed at once.
+
+        If the strategy was given a ``seed``, every schedule randomizes its delays
+        with a new generator seeded with it, so schedules with the same
+        arguments yield exactly the same delays.
+
+        Can be called either on a strategy class (applying the strategy's
+        defaults) or on a strategy instance (applying its configuration):
+
+        .. code-block:: python
+
+          from backoff_utils import strategies
+
+          schedule = strategies.Exponential(jitter = False).schedule()
+          next(schedule)        # 1.0
+          next(schedule)        # 2.0
+
+        :param start: The number of the first attempt to yield a delay for.
+          Defaults to ``0``.
+        :type start: :class:`int <python:int>`
+
+        :param minimum: The minimum number of seconds to delay.
+
+          If :class:`None <python:None>`, will apply either the strategy's
+          default or the instance's configured property.
+        :type minimum: number
+
+        :param jitter: If ``True``, will add a random float to each delay.
+
+          If ``False``, will not.
+
+          If :class:`None <python:None>`, will apply either the strategy's
+          default or the instance's configured property.
+        :type jitter: :class:`bool <python: bool>`
+
+        :param scale_factor: A factor by which the
+          :func:`time_to_sleep <BackoffStrategy.time_to_sleep>` is multiplied to
+          adjust its scale.
+
+          If :class:`None <python:None>`, will apply either the strategy's default
+          or the instance's configured property.
+        :type scale_factor: :class:`float <python:float>`
+
+        :param max_single_delay: The maximum number of seconds to delay before any
+          one retry attempt.
+
+          If :class:`None <python:None>`, will apply either the strategy's default
+          or the instance's configured property.
+        :type max_single_delay: number
+
+        :returns: A generator of delays (in seconds).
+        :rtype: generator of :class:`float <python:float>`
+
+        """
+        strategy = self._configure(minimum = minimum,
+                                   jitter = jitter,
+                                   scale_factor = scale_factor,
+                                   max_single_delay = max_single_delay)
+        rng = strategy.rng
+        if strategy.seed is not None:
+            rng = random.Random(strategy.seed)
+
+        return strategy._generate(_integer(start), rng)
+
+    def _generate(self, attempt, rng):
+        """Yield the delay for ``attempt`` and every attempt that follows it,
+        randomizing delays with ``rng``."""
+        base_delay = self._base_delay
+        adjust = self._adjust
+        while True:
+            yield adjust(base_delay(attempt), rng)
+            attempt += 1
+
+    @_hybridmethod
+    def delays(self,
+               count,
+               start = 0,
+               minimum = None,
+               jitter = None,
+               scale_factor = None,
+               max_single_delay = None):
+        """Return the number of seconds to delay before each of the next ``count``
+        retry attempts, without actually delaying.
+
+        Accepts the same arguments as :func:`schedule() <BackoffStrategy.schedule>`.
+
+        :param count: The number of delays to return.
+        :type count: :class:`int <python:int>`
+
+        :returns: The first ``count`` delays (in seconds) of the
+          :func:`schedule() <BackoffStrategy.schedule>`.
+        :rtype: :class:`list <python:list>` of :class:`float <python:float>`
+
+        :raises ValueError: if ``count`` is negative
+        """
+        count = _integer(count)
+        if count < 0:
+            raise ValueError('count cannot be negative')
+
+        schedule = self.schedule(start = start,
+                                 minimum = minimum,
+                                 jitter = jitter,
+                                 scale_factor = scale_factor,
+                                 max_single_delay = max_single_delay)
+
+        return list(itertools.islice(schedule, count))
+
+    @_hybridmethod
+    def delay(self,
               attempt,
               minimum = None,
               jitter = None,
-              scale_factor = 1.0):
+              scale_factor = None,
+              sleeper = None):
         """Delay for a set period of time based on the ``attempt``.
 
         :param attempt: The number of the attempt that was last-attempted. This
@@ -127,35 +646,19 @@ class BackoffStrategy(object):
           or the instance's configured property.
         :type scale_factor: :class:`float <python:float>`
 
-        """
-        attempt = validators.integer(attempt)
-        scale_factor = validators.float(scale_factor)
-        if cls.IS_INSTANTIATED:
-            cls.attempt = attempt
-            if jitter is not None:
-                cls.jitter = bool(jitter)
-            if scale_factor is not None:
-                cls.scale_factor = scale_factor
-            if minimum is not None:
-                cls.minimum = minimum
-        elif minimum is not None:
-            cls = cls(attempt,
-                      minimum = minimum,
-                      jitter = jitter,
-                      scale_factor = scale_factor)
-        else:
-            cls = cls(attempt,
-                      jitter = jitter,
-                      scale_factor = scale_factor)
-
-        if cls.jitter:
-            time_to_sleep = cls.time_to_sleep + random.random()
-        else:
-            time_to_sleep = cls.time_to_sleep
+        :param sleeper: The function to call to delay, which receives the number
+          of seconds to delay. If :class:`None <python:None>`, applies
+          :func:`time.sleep() <python:time.sleep>`.
+        :type sleeper: callable / :class:`None <python:None>`
 
-        time_to_sleep = time_to_sleep * cls.scale_factor
+        """
+        if sleeper is None:
+            sleeper = time.sleep
 
-        time.sleep(time_to_sleep)
+        sleeper(self.compute(attempt,
+                             minimum = minimum,
+                             jitter = jitter,
+                             scale_factor = scale_factor))
 
 
 class Exponential(BackoffStrategy):
@@ -170,9 +673,14 @@ class Exponential(BackoffStrategy):
     where :math:`a` is the number of the current attempt being made.
     """
 
+    __slots__ = ()
+
     @property
     def time_to_sleep(self):
-        return float(2**self.attempt)
+        return self._base_delay(self.attempt)
+
+    def _base_delay(self, attempt):
+        return _exponential(attempt)
 
 
 class Fibonacci(BackoffStrategy):
@@ -183,23 +691,38 @@ class Fibonacci(BackoffStrategy):
 
     """
 
+    __slots__ = ()
+
     @classmethod
     def _get_sub_value(cls, input):
         """Return the Fibonacci number given the ``input``.
 
+        Values are read from a table that is shared by all instances and grown
+        (iteratively) the first time a larger ``input`` is requested, so each
+        value is only ever calculated once.
+
         :param input: The input whose Fibonacci number should be returned.
         :type input: :class:`int <python:int>`
         """
-        input = validators.integer(input)
+        input = _integer(input)
         if input < 1:
             return 1
 
-        return cls._get_sub_value(input - 1) + cls._get_sub_value(input - 2)
+        sequence = _FIBONACCI_SEQUENCE
+        if input >= len(sequence):
+            with _FIBONACCI_LOCK:
+                while len(sequence) <= input:
+                    sequence.append(sequence[-1] + sequence[-2])
+
+        return sequence[input]
 
     @property
     def time_to_sleep(self):
         return self._get_sub_value(self.attempt)
 
+    def _base_delay(self, attempt):
+        return _saturate(self._get_sub_value(min(attempt, _MAX_FIBONACCI_ATTEMPT)))
+
 
 class Fixed(BackoffStrategy):
     """Implements the :term:`fixed backoff` strategy.
@@ -207,12 +730,16 @@ class Fixed(BackoffStrategy):
     The base delay time is calculated as a fixed value determined by the attempt
     number.
     """
+
+    __slots__ = ('sequence', )
+
     def __init__(self,
                  attempt = None,
                  sequence = None,
                  minimum = 0,
                  jitter = True,
                  scale_factor = 1.0,
+                 max_single_delay = None,
                  **kwargs):
         """
         :param attempt: The number of the attempt that was last-attempted. This
@@ -238,33 +765,37 @@ class Fixed(BackoffStrategy):
           Defaults to ``1.0``.
         :type scale_factor: :class:`float <python:float>`
 
+        :param max_single_delay: The maximum delay to apply before any one retry
+          attempt. Defaults to :class:`None <python:None>`.
+        :type max_single_delay: number / :class:`None <python:None>`
+
         """
         if sequence is None:
             self.sequence = None
         else:
             sequence = validators.iterable(sequence)
-            self.sequence = [validators.integer(x) for x in sequence]
+            self.sequence = tuple(validators.integer(x) for x in sequence)
 
         super(Fixed, self).__init__(attempt = attempt,
                                     minimum = minimum,
                                     jitter = jitter,
                                     scale_factor = scale_factor,
+                                    max_single_delay = max_single_delay,
                                     **kwargs)
 
     @property
     def time_to_sleep(self):
-        if not self.sequence:
+        return self._base_delay(self.attempt)
+
+    def _base_delay(self, attempt):
+        sequence = self.sequence
+        if not sequence:
             return 1
 
-        if len(self.sequence) <= self.attempt:
-            needs = self.attempt - len(self.sequence)
-            sequence = [x for x in self.sequence]
-            last_value = sequence[:-1]
-            sequence.extend(last_value for x in range(0, needs))
-        else:
-            sequence = self.sequence
+        if len(sequence) <= attempt:
+            return sequence[-1]
 
-        return sequence[self.attempt]
+        return sequence[attempt]
 
 
 class Linear(BackoffStrategy):
@@ -272,10 +803,16 @@ class Linear(BackoffStrategy):
 
     The base delay time is equal to the attempt count.
     """
+
+    __slots__ = ()
+
     @property
     def time_to_sleep(self):
         return self.attempt
 
+    def _base_delay(self, attempt):
+        return attempt
+
 
 class Polynomial(BackoffStrategy):
     """Implements the :term:`polynomial backoff` strategy.
@@ -291,12 +828,15 @@ class Polynomial(BackoffStrategy):
       * :math:`e` is the :func:`exponent <exponent>` property
     """
 
+    __slots__ = ('exponent', )
+
     def __init__(self,
                  attempt = None,
                  exponent = 1,
                  minimum = 0,
                  jitter = True,
                  scale_factor = 1.0,
+                 max_single_delay = None,
                  **kwargs):
         """
         :param attempt: The number of the attempt that was last-attempted. This
@@ -320,15 +860,392 @@ class Polynomial(BackoffStrategy):
           adjust its scale. Defaults to ``1.0``.
         :type scale_factor: :class:`float <python:float>`
 
+        :param max_single_delay: The maximum delay to apply before any one retry
+          attempt. Defaults to :class:`None <python:None>`.
+        :type max_single_delay: number / :class:`None <python:None>`
+
         """
-        self.exponent = validators.float(exponent)
+        self.exponent = _float(exponent)
 
         super(Polynomial, self).__init__(attempt = attempt,
                                          minimum = minimum,
                                          jitter = jitter,
                                          scale_factor = scale_factor,
+                                         max_single_delay = max_single_delay,
                                          **kwargs)
 
     @property
     def time_to_sleep(self):
-        return float(self.attempt**self.exponent)
+        return self._base_delay(self.attempt)
+
+    def _base_delay(self, attempt):
+        try:
+            return _saturate(attempt**self.exponent)
+        except OverflowError:
+            return _MAX_BASE_DELAY
+
+
+class FullJitter(BackoffStrategy):
+    """Implements the :term:`full jitter backoff` strategy.
+
+    The delay is chosen at random from between zero and the
+    :class:`Exponential` delay:
+
+    .. math::
+
+        random(0, min(c, s \\times 2^a))
+
+    where:
+
+      * :math:`a` is the number of the current attempt being made
+      * :math:`s` is the :func:`scale_factor <BackoffStrategy.scale_factor>`
+      * :math:`c` is the :func:`max_single_delay <BackoffStrategy.max_single_delay>`
+        (if any)
+
+    Because the randomness grows with the delay, clients that started retrying
+    at the same moment are spread out across the whole delay, rather than
+    retrying within a second of each other.
+    """
+
+    __slots__ = ()
+
+    def __init__(self,
+                 attempt = None,
+                 minimum = 0,
+                 jitter = False,
+                 scale_factor = 1.0,
+                 max_single_delay = None,
+                 **kwargs):
+        """
+        :param attempt: The number of the attempt that was last-attempted. This
+          value is used by the strategy to determine the amount of time to delay
+          before continuing.
+        :type attempt: :class:`int <python:int>`
+
+        :param minimum: The minimum delay to apply. Defaults to ``0``.
+        :type minimum: number
+
+        :param jitter: If ``True``, will also add a random float to the delay
+          before it is randomized. Defaults to ``False``.
+        :type jitter: :class:`bool <python: bool>`
+
+        :param scale_factor: A factor by which the
+          :class:`time_to_sleep <BackoffStrategy.time_to_sleep>` is multiplied to
+          adjust its scale. Defaults to ``1.0``.
+        :type scale_factor: :class:`float <python:float>`
+
+        :param max_single_delay: The maximum delay to apply before any one retry
+          attempt. The delay is randomized *within* this cap. Defaults to
+          :class:`None <python:None>`.
+        :type max_single_delay: number / :class:`None <python:None>`
+
+        """
+        super(FullJitter, self).__init__(attempt = attempt,
+                                         minimum = minimum,
+                                         jitter = jitter,
+                                         scale_factor = scale_factor,
+                                         max_single_delay = max_single_delay,
+                                         **kwargs)
+
+    @property
+    def time_to_sleep(self):
+        return self._base_delay(self.attempt)
+
+    def _base_delay(self, attempt):
+        return _exponential(attempt)
+
+    @staticmethod
+    def _randomize(rng, ceiling):
+        """Return a random delay of at most ``ceiling`` seconds."""
+        return rng.uniform(0, ceiling)
+
+    def _adjust(self, time_to_sleep, rng = None):
+        if rng is None:
+            rng = _thread_rng()
+        if self.jitter:
+            time_to_sleep = time_to_sleep + rng.random()
+
+        ceiling = time_to_sleep * self.scale_factor
+        if self.max_single_delay is not None and ceiling > self.max_single_delay:
+            ceiling = self.max_single_delay
+
+        time_to_sleep = self._randomize(rng, ceiling)
+        if self.minimum and time_to_sleep < self.minimum:
+            time_to_sleep = float(self.minimum)
+
+        if self.max_single_delay is not None and \
+           time_to_sleep > self.max_single_delay:
+            return self.max_single_delay
+
+        return time_to_sleep
+
+
+class EqualJitter(FullJitter):
+    """Implements the :term:`equal jitter backoff` strategy.
+
+    Half of the :class:`Exponential` delay is always applied, and the other half
+    is chosen at random:
+
+    .. math::
+
+        \\frac{d}{2} + random(0, \\frac{d}{2})
+
+    where :math:`d = min(c, s \\times 2^a)`, and:
+
+      * :math:`a` is the number of the current attempt being made
+      * :math:`s` is the :func:`scale_factor <BackoffStrategy.scale_factor>`
+      * :math:`c` is the :func:`max_single_delay <BackoffStrategy.max_single_delay>`
+        (if any)
+
+    This spreads out clients' retries less than :class:`FullJitter`, but
+    guarantees that they never retry too quickly.
+    """
+
+    __slots__ = ()
+
+    @staticmethod
+    def _randomize(rng, ceiling):
+        half = ceiling / 2.0
+
+        return half + rng.uniform(0, half)
+
+
+class DecorrelatedJitter(BackoffStrategy):
+    """Implements the :term:`decorrelated jitter backoff` strategy.
+
+    Each delay is chosen at random from between the base delay and three times
+    the *previous* delay:
+
+    .. math::
+
+        min(c, random(s, 3p))
+
+    where:
+
+      * :math:`s` is the :func:`scale_factor <BackoffStrategy.scale_factor>`
+        (i.e. the base delay of one second, scaled)
+      * :math:`p` is the previous delay applied (or :math:`s` before the first
+        retry attempt)
+      * :math:`c` is the :func:`max_single_delay <BackoffStrategy.max_single_delay>`
+        (if any)
+
+    Delays therefore grow roughly exponentially, but each client's delays follow
+    their own random path.
+
+    .. note::
+
+      Because each delay depends on the previous one, this strategy only
+      produces its full sequence of delays through
+      :func:`schedule() <BackoffStrategy.schedule>` (which is what
+      :func:`backoff() <backoff_utils._backoff.backoff>` and
+      :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>` use).
+      Each new schedule starts from the base delay, and
+      :func:`compute() <BackoffStrategy.compute>` always returns a first delay.
+    """
+
+    __slots__ = ()
+
+    def __init__(self,
+                 attempt = None,
+                 minimum = 0,
+                 jitter = False,
+                 scale_factor = 1.0,
+                 max_single_delay = None,
+                 **kwargs):
+        """
+        :param attempt: The number of the attempt that was last-attempted.
+          Not used to calculate the delay.
+        :type attempt: :class:`int <python:int>`
+
+        :param minimum: The minimum delay to apply. Defaults to ``0``.
+        :type minimum: number
+
+        :param jitter: If ``True``, will also add a random float to the base
+          delay. Defaults to ``False``.
+        :type jitter: :class:`bool <python: bool>`
+
+        :param scale_factor: A factor by which the
+          :class:`time_to_sleep <BackoffStrategy.time_to_sleep>` is multiplied to
+          give the base delay. Defaults to ``1.0``.
+        :type scale_factor: :class:`float <python:float>`
+
+        :param max_single_delay: The maximum delay to apply before any one retry
+          attempt. Defaults to :class:`None <python:None>`.
+        :type max_single_delay: number / :class:`None <python:None>`
+
+        """
+        super(DecorrelatedJitter, self).__init__(attempt = attempt,
+                                                 minimum = minimum,
+                                                 jitter = jitter,
+                                                 scale_factor = scale_factor,
+                                                 max_single_delay = max_single_delay,
+                                                 **kwargs)
+
+    @property
+    def time_to_sleep(self):
+        return 1.0
+
+    def _base_delay(self, attempt):
+        return 1.0
+
+    def _generate(self, attempt, rng):
+        previous = None
+        while True:
+            previous = self._decorrelate(self._base_delay(attempt), previous, rng)
+            yield previous
+            attempt += 1
+
+    def _adjust(self, time_to_sleep, rng = None):
+        return self._decorrelate(time_to_sleep, None, rng)
+
+    def _decorrelate(self, time_to_sleep, previous, rng):
+        """Return the delay that follows the ``previous`` delay (or the first
+        delay, if ``previous`` is :class:`None <python:None>`).
+
+        :rtype: :class:`float <python:float>`
+        """
+        if rng is None:
+            rng = _thread_rng()
+        if self.jitter:
+            time_to_sleep = time_to_sleep + rng.random()
+
+        base = time_to_sleep * self.scale_factor
+        if previous is None:
+            previous = base
+
+        time_to_sleep = rng.uniform(base, previous * 3)
+        if self.minimum and time_to_sleep < self.minimum:
+            time_to_sleep = float(self.minimum)
+
+        if self.max_single_delay is not None and \
+           time_to_sleep > self.max_single_delay:
+            time_to_sleep = self.max_single_delay
+
+        return time_to_sleep
+
+
+class Adaptive(BackoffStrategy):
+    """Implements an :term:`adaptive backoff` strategy, whose delay is learned
+    from the outcomes of the backoff calls that apply it rather than calculated
+    from the attempt number.
+
+    The delay is held by an
+    :class:`AdaptiveController <backoff_utils._adaptive.AdaptiveController>`,
+    which grows it by a factor after each failed attempt and shrinks it by a
+    fixed number of seconds after each successful attempt (up to and down to
+    the controller's ``max_delay`` and ``min_delay``). The delay before the first
+    retry of a call is also capped at the controller's
+    :attr:`recovery_time <backoff_utils._adaptive.AdaptiveController.recovery_time>`.
+
+    As a result, retries follow quickly while the dependency is healthy (and
+    failures are transient), and back off further and further while it is down,
+    so that the load they place on it drops. Because the controller is shared,
+    what one call learns is applied by every other call:
+
+    .. code-block:: python
+
+      from backoff_utils import backoff, strategies
+
+      result = backoff(get_inventory,
+                       args = [item_id],
+                       strategy = strategies.Adaptive(controller = 'inventory-service'),
+                       max_tries = 5)
+
+    .. note::
+
+      The controller only learns from backoff calls (i.e. calls to
+      :func:`backoff() <backoff_utils._backoff.backoff>`,
+      :func:`@apply_backoff() <backoff_utils._decorator.apply_backoff>`, or a
+      :class:`RetryPolicy <backoff_utils._policy.RetryPolicy>`), which notify it
+      automatically. Calling :func:`compute() <BackoffStrategy.compute>` or
+      :func:`delay() <BackoffStrategy.delay>` directly returns the current delay
+      without any feedback. Applying the class itself (rather than an instance)
+      shares a single default controller across the process.
+    """
+
+    __slots__ = ('controller', )
+
+    def __init__(self,
+                 attempt = None,
+                 controller = None,
+                 minimum = 0,
+                 jitter = False,
+                 scale_factor = 1.0,
+                 max_single_delay = None,
+                 **kwargs):
+        """
+        :param attempt: The number of the attempt that was last-attempted. Only
+          used to identify the first retry of a call (attempt ``0``).
+        :type attempt: :class:`int <python:int>`
+
+        :param controller: The
+          :class:`AdaptiveController <backoff_utils._adaptive.AdaptiveController>`
+          that learns the delay, or the name of a shared controller (see
+          :func:`AdaptiveController.named() <backoff_utils._adaptive.AdaptiveController.named>`).
+          If :class:`None <python:None>`, the strategy creates a controller of its
+          own. Defaults to :class:`None <python:None>`.
+        :type controller: :class:`AdaptiveController <backoff_utils._adaptive.AdaptiveController>`
+          / :class:`str <python:str>` / :class:`None <python:None>`
+
+        :param minimum: The minimum delay to apply. Defaults to ``0``.
+        :type minimum: number
+
+        :param jitter: If ``True``, will add a random float to the delay. Defaults
+          to ``False``, since a random second would outweigh the short delays
+          learned while the dependency is healthy.
+        :type jitter: :class:`bool <python: bool>`
+
+        :param scale_factor: A factor by which the
+          :class:`time_to_sleep <BackoffStrategy.time_to_sleep>` is multiplied to
+          adjust its scale. Defaults to ``1.0``.
+        :type scale_factor: :class:`float <python:float>`
+
+        :param max_single_delay: The maximum delay to apply before any one retry
+          attempt. Defaults to :class:`None <python:None>`.
+        :type max_single_delay: number / :class:`None <python:None>`
+
+        :raises TypeError: if ``controller`` is not an
+          :class:`AdaptiveController <backoff_utils._adaptive.AdaptiveController>`,
+          a name, or :class:`None <python:None>`
+        """
+        self.controller = _get_adaptive_controller(controller)
+
+        super(Adaptive, self).__init__(attempt = attempt,
+                                       minimum = minimum,
+                                       jitter = jitter,
+                                       scale_factor = scale_factor,
+                                       max_single_delay = max_single_delay,
+                                       **kwargs)
+
+    def __repr__(self):
+        return '<{}(controller = {})>'.format(self.__class__.__name__,
+                                              self.controller)
+
+    @property
+    def time_to_sleep(self):
+        return self._base_delay(self.attempt)
+
+    def _base_delay(self, attempt):
+        controller = self.controller
+        delay = controller.delay
+        if not attempt:
+            recovery_time = controller.recovery_time
+            if recovery_time is not None and recovery_time < delay:
+                delay = max(recovery_time, controller.min_delay)
+
+        return delay
+
+
+def _controller(strategy):
+    """Return the
+    :class:`AdaptiveController <backoff_utils._adaptive.AdaptiveController>`
+    that ``strategy`` (a strategy class or instance) learns from, or
+    :class:`None <python:None>` if it does not learn from outcomes."""
+    if isinstance(strategy, type):
+        strategy = _default_strategy(strategy)
+
+    controller = getattr(strategy, 'controller', None)
+    if isinstance(controller, AdaptiveController):
+        return controller
+
+    return None
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for backoff_utils._backoff, backoff_utils._decorator and
+backoff_utils._policy"""
+import backoff_utils.strategies as strategies
+
+from backoff_utils import backoff, apply_backoff, RetryPolicy
+
+from conftest import FailNTimes, always_fail, assert_within_budget, \
+    ignore_failure
+
+RETRIES = 3
+
+
+def plain_function(value):
+    """Return ``value``."""
+    return value
+
+
+def bench_plain_call(benchmark):
+    """Baseline: call the function without applying a backoff strategy."""
+    assert benchmark(plain_function, 1) == 1
+    assert_within_budget(benchmark, 'plain_call')
+
+
+def bench_apply_backoff_success(benchmark):
+    """Decorated function which succeeds on the first attempt."""
+    decorated = apply_backoff(strategy = strategies.Exponential,
+                              max_tries = RETRIES)(plain_function)
+
+    assert benchmark(decorated, 1) == 1
+    assert_within_budget(benchmark, 'apply_backoff_success')
+
+
+def bench_policy_call_success(benchmark):
+    """:func:`RetryPolicy.call` which succeeds on the first attempt."""
+    policy = RetryPolicy(strategy = strategies.Exponential, max_tries = RETRIES)
+
+    assert benchmark(policy.call, plain_function, 1) == 1
+    assert_within_budget(benchmark, 'policy_call_success')
+
+
+def bench_backoff_success(benchmark):
+    """:func:`backoff` which succeeds on the first attempt."""
+    def run():
+        return backoff(plain_function,
+                       args = [1],
+                       strategy = strategies.Exponential,
+                       max_tries = RETRIES)
+
+    assert benchmark(run) == 1
+    assert_within_budget(benchmark, 'backoff_success')
+
+
+def bench_apply_backoff_retries(benchmark, no_sleep):
+    """Decorated function which succeeds after ``RETRIES`` failed attempts."""
+    decorated = apply_backoff(strategy = strategies.Exponential,
+                              max_tries = RETRIES,
+                              catch_exceptions = ZeroDivisionError)(FailNTimes(RETRIES))
+
+    assert benchmark(decorated, 1) == 1
+    assert_within_budget(benchmark, 'apply_backoff_retries')
+
+
+def bench_backoff_retries(benchmark, no_sleep):
+    """:func:`backoff` which succeeds after ``RETRIES`` failed attempts."""
+    flaky = FailNTimes(RETRIES)
+
+    def run():
+        return backoff(flaky,
+                       args = [1],
+                       strategy = strategies.Exponential,
+                       max_tries = RETRIES,
+                       catch_exceptions = ZeroDivisionError)
+
+    assert benchmark(run) == 1
+    assert_within_budget(benchmark, 'backoff_retries')
+
+
+def bench_apply_backoff_exhausted(benchmark, no_sleep):
+    """Decorated function which never succeeds."""
+    decorated = apply_backoff(strategy = strategies.Exponential,
+                              max_tries = RETRIES,
+                              catch_exceptions = ZeroDivisionError,
+                              on_failure = ignore_failure)(always_fail)
+
+    assert benchmark(decorated, 1) is None
+    assert_within_budget(benchmark, 'apply_backoff_exhausted')
+
+
+def bench_backoff_exhausted(benchmark, no_sleep):
+    """:func:`backoff` which never succeeds."""
+    def run():
+        return backoff(always_fail,
+                       args = [1],
+                       strategy = strategies.Exponential,
+                       max_tries = RETRIES,
+                       catch_exceptions = ZeroDivisionError,
+                       on_failure = ignore_failure)
+
+    assert benchmark(run) is None
+    assert_within_budget(benchmark, 'backoff_exhausted')
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmarks for backoff_utils.strategies"""
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from conftest import assert_within_budget
+
+ATTEMPT = 10
+
+STRATEGIES = [
+    strategies.Adaptive,
+    strategies.DecorrelatedJitter,
+    strategies.EqualJitter,
+    strategies.Exponential,
+    strategies.Fibonacci,
+    strategies.Fixed,
+    strategies.FullJitter,
+    strategies.Linear,
+    strategies.Polynomial,
+]
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def bench_strategy_compute(benchmark, strategy):
+    """Compute the delay for attempt ``ATTEMPT``."""
+    result = benchmark(strategy.compute, ATTEMPT)
+
+    assert result >= 0
+    assert_within_budget(benchmark, 'strategy_compute')
+
+
+@pytest.mark.parametrize("strategy", STRATEGIES)
+def bench_strategy_schedule(benchmark, strategy):
+    """Advance a :func:`schedule() <BackoffStrategy.schedule>` by one delay."""
+    def setup():
+        return (strategy.schedule(start = ATTEMPT), ), {}
+
+    result = benchmark.pedantic(next, setup = setup, rounds = 10000)
+
+    assert result >= 0
+    assert_within_budget(benchmark, 'strategy_schedule')
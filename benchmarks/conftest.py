@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+"""
+*******************
+benchmarks.conftest
+*******************
+
+Fixtures and helpers used by the **Backoff-Utils** benchmark suite, including
+the per-call overhead budgets that the library is tuned to meet.
+
+"""
+import functools
+import timeit
+
+import pytest
+
+import backoff_utils.strategies as strategies
+import backoff_utils._policy as _policy
+
+#: Per-call overhead budgets, expressed as the maximum median time a benchmark
+#: may take as a multiple of the median time of a plain function call measured
+#: in the same session, so that they hold on faster and slower machines alike.
+#: Each leaves about three times the headroom the library needs, so that normal
+#: machine noise (in either measurement) does not fail a run. Retry benchmarks
+#: run with sleeping disabled, so their budgets cover only the library's own
+#: bookkeeping.
+BUDGETS = {
+    'plain_call': 5,
+    'apply_backoff_success': 10,
+    'policy_call_success': 10,
+    'backoff_success': 180,
+    'apply_backoff_retries': 300,
+    'backoff_retries': 450,
+    'apply_backoff_exhausted': 300,
+    'backoff_exhausted': 500,
+    'strategy_compute': 60,
+    'strategy_schedule': 60,
+}
+
+_baseline = {}
+
+
+class _NoSleep(object):
+    """Stand-in for the :mod:`time <python:time>` module which does not sleep."""
+
+    @staticmethod
+    def sleep(seconds):
+        """Return immediately."""
+        pass
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    """Disable sleeping between retry attempts."""
+    monkeypatch.setattr(strategies, 'time', _NoSleep)
+    monkeypatch.setattr(_policy, 'time', _NoSleep)
+
+
+def _identity(value):
+    """Return ``value``."""
+    return value
+
+
+def plain_call_time():
+    """Return the median number of seconds a plain function call takes, measured
+    once per session."""
+    if 'median' not in _baseline:
+        number = 100000
+        timer = timeit.Timer(functools.partial(_identity, 1))
+        timings = sorted(timer.repeat(repeat = 15, number = number))
+        _baseline['median'] = timings[len(timings) // 2] / number
+
+    return _baseline['median']
+
+
+def assert_within_budget(benchmark, budget_name):
+    """Fail if the median of ``benchmark`` exceeds the budget ``budget_name``,
+    relative to the median of a plain function call.
+
+    Does nothing when benchmarking is disabled (e.g. ``--benchmark-disable``).
+    """
+    metadata = getattr(benchmark, 'stats', None)
+    if metadata is None:
+        return
+
+    median = metadata.stats.median
+    baseline = plain_call_time()
+    budget = BUDGETS[budget_name]
+    assert median <= budget * baseline, \
+        '{}: median of {:.3f}us ({:.1f}x a plain call of {:.3f}us) exceeds ' \
+        'budget of {}x'.format(budget_name,
+                               median * 1e6,
+                               median / baseline,
+                               baseline * 1e6,
+                               budget)
+
+
+class FailNTimes(object):
+    """Callable which raises :class:`ZeroDivisionError <python:ZeroDivisionError>`
+    ``failures`` times, then succeeds once, and then starts over."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, value):
+        if self.calls < self.failures:
+            self.calls += 1
+            raise ZeroDivisionError()
+
+        self.calls = 0
+        return value
+
+
+def always_fail(value):
+    """Raise :class:`ZeroDivisionError <python:ZeroDivisionError>`."""
+    raise ZeroDivisionError()
+
+
+def ignore_failure(error, message = None, stacktrace = None):
+    """``on_failure`` handler which swallows the error."""
+    pass
@@ -141,7 +141,8 @@ setup(
     # For an analysis of "install_requires" vs pip's requirements files see:
     # https://packaging.python.org/en/latest/requirements.html
     install_requires=[
-        'validator-collection'
+        'validator-collection',
+        'futures; python_version < "3.0"'
     ],  # Optional
 
     # List additional groups of dependencies here (e.g. development
@@ -155,6 +156,7 @@ setup(
     extras_require={  # Optional
         'dev': ['check-manifest','sphinx','sphinx-rtd-theme','sphinx-tabs'],
         'test': ['coverage', 'pytest','pytest-benchmark','pytest-cov','tox','codecov'],
+        'tracing': ['opentelemetry-api'],
     },
 
     python_requires='>=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*, <4',
@@ -10,8 +10,19 @@ Utility functions that are used to configure Py.Test context.
 """
 
 import os
+import sys
+
 import pytest
 
+import backoff_utils.strategies as strategies
+
+from backoff_utils._clock import VirtualClock
+from backoff_utils._policy import RetryPolicy
+
+collect_ignore = []
+if sys.version_info < (3, 5):
+    collect_ignore.append('test_async_backoff.py')
+
 
 def pytest_addoption(parser):
     """Define options that the parser looks for in the command-line.
@@ -61,3 +72,44 @@ def state(request):
         setup = lambda: State(),
         scope = "session"
     )
+
+
+class SlowFlaky(object):
+    """Callable that takes ``duration`` seconds per call on ``clock``, raising
+    ``error`` for its first ``failures`` calls."""
+
+    def __init__(self,
+                 clock,
+                 failures,
+                 duration = 0.25,
+                 error = ZeroDivisionError):
+        self.clock = clock
+        self.failures = failures
+        self.duration = duration
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.clock.advance(self.duration)
+        if self.calls <= self.failures:
+            raise self.error()
+
+        return 'value'
+
+
+def make_policy(max_tries = 5, clock = None, **kwargs):
+    """Return a policy that retries a ZeroDivisionError up to ``max_tries``
+    times on ``clock`` (a new :class:`VirtualClock` if
+    :class:`None <python:None>`), waiting one and then two seconds between
+    attempts unless another ``strategy`` is supplied, and applying any other
+    ``kwargs``."""
+    if clock is None:
+        clock = VirtualClock()
+    if 'strategy' not in kwargs:
+        kwargs['strategy'] = strategies.Fixed(sequence = [1, 2], jitter = False)
+
+    return RetryPolicy(max_tries = max_tries,
+                       catch_exceptions = ZeroDivisionError,
+                       clock = clock,
+                       **kwargs)
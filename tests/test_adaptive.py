@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._adaptive"""
+import pickle
+
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from backoff_utils._adaptive import AdaptiveController, _get_adaptive_controller
+from backoff_utils._clock import VirtualClock
+from backoff_utils._events import RetryListener
+
+from tests.conftest import SlowFlaky, make_policy
+
+
+@pytest.mark.parametrize("kwargs, expected_delay, error", [
+    ({}, 1.0, None),
+    ({'initial_delay': 0}, 0.05, None),
+    ({'initial_delay': 100, 'max_delay': 10}, 10.0, None),
+
+    ({'min_delay': 0}, None, ValueError),
+    ({'min_delay': 2, 'max_delay': 1}, None, ValueError),
+    ({'increase': 0.5}, None, ValueError),
+    ({'decrease': -1}, None, ValueError),
+    ({'smoothing': 0}, None, ValueError),
+    ({'smoothing': 1.5}, None, ValueError),
+])
+def test_adaptive_controller_init(kwargs, expected_delay, error):
+    """Test the :ref:`backoff_utils._adaptive.AdaptiveController` constructor."""
+    if not error:
+        controller = AdaptiveController(**kwargs)
+        assert controller.delay == expected_delay
+        assert controller.success_rate is None
+        assert controller.recovery_time is None
+    else:
+        with pytest.raises(error):
+            AdaptiveController(**kwargs)
+
+
+def test_adaptive_controller_aimd():
+    """Test that :ref:`backoff_utils._adaptive.AdaptiveController` grows its delay
+    multiplicatively on failure and shrinks it additively on success, within its
+    bounds."""
+    controller = AdaptiveController(initial_delay = 1,
+                                    min_delay = 0.25,
+                                    max_delay = 4,
+                                    decrease = 0.5,
+                                    smoothing = 0.5)
+
+    controller.record_failure()
+    assert controller.delay == 2
+    controller.record_failure()
+    controller.record_failure()
+    assert controller.delay == 4
+    assert controller.success_rate == 0
+
+    controller.record_success()
+    assert controller.delay == 3.5
+    assert controller.success_rate == 0.5
+    for _ in range(10):
+        controller.record_success(recovery_time = 1)
+    assert controller.delay == 0.25
+    assert controller.recovery_time == 1
+
+    controller.reset()
+    assert controller.delay == 1
+    assert controller.success_rate is None
+
+
+@pytest.mark.parametrize("value, error", [
+    (None, None),
+    (AdaptiveController(), None),
+    ('test_get_adaptive_controller', None),
+
+    (123, TypeError),
+    (RetryListener(), TypeError),
+])
+def test_get_adaptive_controller(value, error):
+    """Test :ref:`backoff_utils._adaptive._get_adaptive_controller`."""
+    if not error:
+        controller = _get_adaptive_controller(value)
+        assert isinstance(controller, AdaptiveController)
+        if isinstance(value, AdaptiveController):
+            assert controller is value
+        elif value is not None:
+            assert AdaptiveController.named(value) is controller
+    else:
+        with pytest.raises(error):
+            _get_adaptive_controller(value)
+
+
+def test_adaptive_strategy_learns_from_calls():
+    """Test that a policy applying :ref:`backoff_utils.strategies.Adaptive`
+    notifies its controller, which shortens delays while calls succeed and
+    lengthens them while they fail."""
+    clock = VirtualClock()
+    controller = AdaptiveController(initial_delay = 1,
+                                    decrease = 0.25,
+                                    smoothing = 1)
+    strategy = strategies.Adaptive(controller = controller)
+    policy = make_policy(clock = clock, strategy = strategy)
+    assert policy._needs_bookkeeping is True
+    assert policy.listeners == ()
+
+    function = SlowFlaky(clock, failures = 2)
+    started_at = clock.now()
+    assert policy.call(function) == 'value'
+
+    # Delays of 2 and 4 seconds (after each failure), then a success.
+    assert clock.now() - started_at == 6 + 0.75
+    assert controller.delay == 3.75
+    assert controller.success_rate == 1
+    assert controller.recovery_time == 6 + 0.25
+
+    for _ in range(20):
+        policy.call(SlowFlaky(clock, failures = 0))
+    assert controller.delay == 0.05
+
+    # The first retry never waits longer than it has taken calls to recover.
+    strategy = policy.strategy
+    assert strategy.compute(0) == 0.05
+    controller.record_failure()
+    controller.record_failure()
+    controller.record_failure()
+    assert strategy.compute(1) == 0.4
+    assert strategy.compute(0) == 0.4
+
+
+def test_adaptive_recovery_time_caps_first_retry():
+    """Test that :ref:`backoff_utils.strategies.Adaptive` caps the first retry of
+    a call at the controller's recovery time."""
+    controller = AdaptiveController(initial_delay = 8, smoothing = 1)
+    controller.record_success(recovery_time = 0.5)
+    strategy = strategies.Adaptive(controller = controller)
+
+    assert strategy.delays(3) == [0.5, 7.9, 7.9]
+
+
+def test_adaptive_controller_shared_by_name():
+    """Test that strategies sharing a controller by name learn from each other's
+    calls, and that the policy does not notify a controller twice."""
+    clock = VirtualClock()
+    controller = AdaptiveController.named('test_adaptive_shared',
+                                          initial_delay = 1,
+                                          smoothing = 1)
+    shared = strategies.Adaptive(controller = 'test_adaptive_shared')
+    first = make_policy(clock = clock, strategy = shared)
+    strategy = strategies.Adaptive(controller = controller)
+    second = make_policy(max_tries = 1,
+                         clock = clock,
+                         strategy = strategy,
+                         listeners = controller)
+
+    with pytest.raises(ZeroDivisionError):
+        second.call(SlowFlaky(clock, failures = 10))
+    assert controller.delay == 4
+
+    assert first.strategy.controller is controller
+    assert first.strategy.compute(1) == 4
+
+
+def test_adaptive_controller_pickle():
+    """Test that pickled controllers keep what they have learned."""
+    controller = AdaptiveController(smoothing = 1)
+    controller.record_failure()
+
+    copied = pickle.loads(pickle.dumps(controller))
+    assert copied.delay == controller.delay == 2
+    assert copied.success_rate == 0
+    copied.record_success()
+    assert controller.delay == 2
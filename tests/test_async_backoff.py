@@ -0,0 +1,469 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._async_backoff"""
+import asyncio
+from datetime import datetime
+
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from backoff_utils._async_backoff import async_backoff
+from backoff_utils._decorator import apply_backoff
+from backoff_utils._clock import VirtualClock
+from backoff_utils._circuit_breaker import CircuitBreaker, CircuitOpenError
+from backoff_utils._events import RetryListener
+from backoff_utils._hedge import Hedge
+from backoff_utils._policy import AttemptTimeoutError
+from backoff_utils._single_flight import SingleFlight
+
+_attempts = 0
+_was_successful = False
+
+
+def run(coroutine):
+    """Run ``coroutine`` to completion on a fresh event loop."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def divide_by_zero_coroutine(trying_again):
+    """Raise a ZeroDivisionError counting attempts."""
+    global _attempts                                                            # pylint: disable=W0603,C0103
+    await asyncio.sleep(0)
+    if trying_again is True:
+        _attempts += 1
+        raise ZeroDivisionError('Failed on Subsequent Attempt')
+    else:
+        _attempts = 0
+        raise ZeroDivisionError()
+
+
+def when_successful(value):
+    """Update the global ``_was_successful`` value to True."""
+    global _was_successful                                                      # pylint: disable=W0603,C0103
+    _was_successful = True
+
+
+class FlakyCoroutine(object):
+    """Coroutine callable that fails ``failures`` times before succeeding."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    async def __call__(self, value):
+        self.calls += 1
+        await asyncio.sleep(0)
+        if self.calls <= self.failures:
+            raise ZeroDivisionError()
+
+        return value
+
+
+@pytest.mark.parametrize("failure, strategy, max_tries, max_delay, retry_execute", [
+    (None, strategies.Linear, 1, None, None),
+    (None, strategies.Linear, 2, None, None),
+    (None, strategies.Linear, 2, 3, None),
+    (None, strategies.Linear, 1, None, divide_by_zero_coroutine),
+    (None, strategies.Polynomial, 2, None, None),
+
+    (TypeError, 'invalid-value', 1, None, None),
+    (TypeError, strategies.Linear, 1, None, 'not-a-callable'),
+])
+def test_async_backoff_basic(failure, strategy, max_tries, max_delay, retry_execute):
+    """Test the :ref:`backoff_utils._async_backoff.async_backoff` function."""
+    global _attempts                                                            # pylint: disable=W0603,C0103
+    coroutine = async_backoff(to_execute = divide_by_zero_coroutine,
+                              args = [False],
+                              strategy = strategy,
+                              retry_execute = retry_execute,
+                              retry_args = [True],
+                              max_tries = max_tries,
+                              max_delay = max_delay,
+                              catch_exceptions = [type(ZeroDivisionError())])
+    if not failure:
+        with pytest.raises(ZeroDivisionError) as excinfo:
+            run(coroutine)
+        if max_delay is not None:
+            assert _attempts <= max_tries
+        else:
+            assert _attempts == max_tries
+        assert 'Subsequent Attempt' in str(excinfo.value)
+    else:
+        with pytest.raises(failure):
+            run(coroutine)
+
+    _attempts = 0
+
+
+@pytest.mark.parametrize("failures, max_tries", [
+    (0, 1),
+    (1, 1),
+    (2, 2),
+])
+def test_async_backoff_on_success(failures, max_tries):
+    """Test the :ref:`backoff_utils._async_backoff.async_backoff` function."""
+    global _was_successful                                                      # pylint: disable=W0603,C0103
+    flaky = FlakyCoroutine(failures)
+
+    result = run(async_backoff(flaky,
+                               args = ['value'],
+                               strategy = strategies.Linear,
+                               max_tries = max_tries,
+                               catch_exceptions = [type(ZeroDivisionError())],
+                               on_success = when_successful))
+
+    assert result == 'value'
+    assert flaky.calls == failures + 1
+    assert _was_successful is True
+    _was_successful = False
+
+
+def test_async_backoff_does_not_block_event_loop():
+    """Test that concurrent :ref:`backoff_utils._async_backoff.async_backoff`
+    calls sleep concurrently rather than serially."""
+    count = 20
+
+    async def gather():
+        return await asyncio.gather(*[async_backoff(FlakyCoroutine(1),
+                                                    args = [x],
+                                                    strategy = strategies.Exponential,
+                                                    max_tries = 1,
+                                                    catch_exceptions = ZeroDivisionError)
+                                      for x in range(count)])
+
+    start_time = datetime.utcnow()
+    results = run(gather())
+    elapsed_time = (datetime.utcnow() - start_time).total_seconds()
+
+    assert results == list(range(count))
+    assert elapsed_time < 5
+
+
+def test_async_backoff_cancelled():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` propagates a
+    cancellation rather than catching and retrying it, even when catching every
+    exception."""
+    calls = []
+
+    async def cancelled():
+        calls.append(None)
+        await asyncio.sleep(0)
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        run(async_backoff(cancelled,
+                          strategy = strategies.Fixed(sequence = [0]),
+                          max_tries = 3))
+
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("failures, max_tries, expects_error", [
+    (0, 1, False),
+    (1, 1, False),
+    (2, 1, True),
+])
+def test_apply_backoff_to_coroutine_function(failures, max_tries, expects_error):
+    """Test the :ref:`backoff_utils._decorator.apply_backoff` decorator when
+    applied to a coroutine function."""
+    flaky = FlakyCoroutine(failures)
+
+    @apply_backoff(strategy = strategies.Linear,
+                   max_tries = max_tries,
+                   catch_exceptions = [type(ZeroDivisionError())])
+    async def decorated(value):
+        """A decorated coroutine function."""
+        return await flaky(value)
+
+    assert asyncio.iscoroutinefunction(decorated)
+    assert decorated.__name__ == 'decorated'
+
+    if expects_error:
+        with pytest.raises(ZeroDivisionError):
+            run(decorated('value'))
+    else:
+        assert run(decorated('value')) == 'value'
+
+    assert flaky.calls == min(failures, max_tries) + 1
+
+
+@pytest.mark.parametrize("skip_late_attempt, expected_calls", [
+    (False, 2),
+    (True, 1),
+])
+def test_async_backoff_clamps_delay_to_max_delay(skip_late_attempt, expected_calls):
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` never waits
+    past ``max_delay``."""
+    flaky = FlakyCoroutine(10)
+    start_time = datetime.utcnow()
+
+    with pytest.raises(ZeroDivisionError):
+        run(async_backoff(flaky,
+                          args = ['value'],
+                          strategy = strategies.Fixed(sequence = [64]),
+                          max_tries = 3,
+                          max_delay = 0.2,
+                          catch_exceptions = [ZeroDivisionError],
+                          skip_late_attempt = skip_late_attempt))
+
+    assert flaky.calls == expected_calls
+    assert (datetime.utcnow() - start_time).total_seconds() < 2
+
+
+def test_async_backoff_sleeper():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` waits using a
+    virtual clock, or a ``sleeper`` which may be a coroutine function."""
+    clock = VirtualClock()
+    flaky = FlakyCoroutine(3)
+
+    result = run(async_backoff(flaky,
+                               args = ['value'],
+                               strategy = strategies.Exponential(jitter = False),
+                               max_tries = 3,
+                               catch_exceptions = [ZeroDivisionError],
+                               clock = clock))
+
+    assert result == 'value'
+    assert clock.sleeps == [1.0, 2.0, 4.0]
+
+    sleeps = []
+
+    async def sleeper(seconds):
+        """Record ``seconds`` without waiting."""
+        sleeps.append(seconds)
+        await asyncio.sleep(0)
+
+    flaky = FlakyCoroutine(2)
+    result = run(async_backoff(flaky,
+                               args = ['value'],
+                               strategy = strategies.Exponential(jitter = False),
+                               max_tries = 3,
+                               catch_exceptions = [ZeroDivisionError],
+                               sleeper = sleeper))
+
+    assert result == 'value'
+    assert sleeps == [1.0, 2.0]
+
+
+def test_async_backoff_circuit_breaker():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` fails fast while
+    its circuit breaker is open."""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(failure_threshold = 2, clock = clock)
+    flaky = FlakyCoroutine(10)
+
+    with pytest.raises(ZeroDivisionError):
+        run(async_backoff(flaky,
+                          args = ['value'],
+                          max_tries = 5,
+                          catch_exceptions = [ZeroDivisionError],
+                          clock = clock,
+                          circuit_breaker = breaker))
+    assert flaky.calls == 2
+
+    with pytest.raises(CircuitOpenError):
+        run(async_backoff(flaky,
+                          args = ['value'],
+                          max_tries = 5,
+                          catch_exceptions = [ZeroDivisionError],
+                          clock = clock,
+                          circuit_breaker = breaker))
+    assert flaky.calls == 2
+
+
+def test_async_backoff_listeners():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` sends the same
+    events as the synchronous engine."""
+    clock = VirtualClock()
+    events = []
+    listener = RetryListener(
+        on_attempt_start = lambda event: events.append(('start', event.attempt)),
+        on_attempt_end = lambda event: events.append(('end', event.attempt)),
+        on_retry = lambda event: events.append(('retry', event.delay)),
+        on_giveup = lambda event: events.append(('giveup', event.attempt))
+    )
+
+    result = run(async_backoff(FlakyCoroutine(1),
+                               args = ['value'],
+                               strategy = strategies.Fixed(sequence = [1],
+                                                           jitter = False),
+                               max_tries = 3,
+                               catch_exceptions = [ZeroDivisionError],
+                               clock = clock,
+                               sleeper = clock.sleep,
+                               listeners = listener))
+
+    assert result == 'value'
+    assert events == [('start', 1), ('end', 1), ('retry', 1), ('start', 2), ('end', 2)]
+
+    events[:] = []
+    with pytest.raises(ZeroDivisionError):
+        run(async_backoff(FlakyCoroutine(10),
+                          args = ['value'],
+                          strategy = strategies.Fixed(sequence = [1],
+                                                      jitter = False),
+                          max_tries = 1,
+                          catch_exceptions = [ZeroDivisionError],
+                          clock = clock,
+                          sleeper = clock.sleep,
+                          listeners = listener))
+    assert events[-1] == ('giveup', 2)
+
+
+def test_async_backoff_retry_on_result():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` retries
+    coroutines whose result is rejected by ``retry_on_result``."""
+    clock = VirtualClock()
+    results = iter([None, None, 'page'])
+
+    async def fetch_page():
+        await asyncio.sleep(0)
+        return next(results)
+
+    result = run(async_backoff(fetch_page,
+                               strategy = strategies.Fixed(sequence = [1],
+                                                           jitter = False),
+                               max_tries = 3,
+                               clock = clock,
+                               sleeper = clock.sleep,
+                               retry_on_result = lambda value: value is None))
+
+    assert result == 'page'
+    assert clock.sleeps == [1, 1]
+
+
+def test_async_backoff_retry_after():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` waits as long
+    as the hint returned by ``retry_after`` asks."""
+    clock = VirtualClock()
+    results = iter([(429, 5), (429, None), (200, None)])
+
+    async def fetch_page():
+        await asyncio.sleep(0)
+        return next(results)
+
+    result = run(async_backoff(fetch_page,
+                               strategy = strategies.Fixed(sequence = [1],
+                                                           jitter = False),
+                               max_tries = 3,
+                               clock = clock,
+                               sleeper = clock.sleep,
+                               retry_on_result = lambda value: value[0] == 429,
+                               retry_after = lambda value: value[1]))
+
+    assert result == (200, None)
+    assert clock.sleeps == [5, 1]
+
+
+def test_async_backoff_hedge():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` hedges a slow
+    first attempt with ``retry_execute``, and cancels the attempt that loses."""
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return 'slow'
+
+    async def fast():
+        await asyncio.sleep(0)
+        return 'fast'
+
+    hedge = Hedge(delay = 0.01, max_ratio = 1)
+    result = run(async_backoff(slow,
+                               retry_execute = fast,
+                               max_tries = 1,
+                               hedge = hedge))
+
+    assert result == 'fast'
+    assert cancelled == [True]
+    assert hedge.hedges == 1
+
+    result = run(async_backoff(fast, retry_execute = slow, hedge = hedge))
+    assert result == 'fast'
+    assert hedge.hedges == 1
+
+
+def test_async_backoff_attempt_timeout():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` cancels
+    attempts that exceed the ``attempt_timeout`` and retries them, growing the
+    timeout per the strategy given."""
+    cancelled = []
+
+    async def slow(duration):
+        try:
+            await asyncio.sleep(duration)
+        except asyncio.CancelledError:
+            cancelled.append(duration)
+            raise
+        return duration
+
+    durations = iter([5, 0.05])
+    clock = VirtualClock()
+    result = run(async_backoff(lambda: slow(next(durations)),
+                               strategy = strategies.Fixed(sequence = [1],
+                                                           jitter = False),
+                               max_tries = 1,
+                               clock = clock,
+                               sleeper = clock.sleep,
+                               attempt_timeout = strategies.Fixed(sequence = [1, 100],
+                                                                  jitter = False,
+                                                                  scale_factor = 0.01)))
+
+    assert result == 0.05
+    assert cancelled == [5]
+    assert clock.sleeps == [1]
+
+    with pytest.raises(AttemptTimeoutError):
+        run(async_backoff(slow,
+                          args = [5],
+                          max_tries = 1,
+                          clock = clock,
+                          sleeper = clock.sleep,
+                          attempt_timeout = 0.01))
+
+
+def test_async_backoff_single_flight():
+    """Test that :ref:`backoff_utils._async_backoff.async_backoff` awaits
+    concurrent identical calls once under a single-flight, and shares their
+    outcome with every caller."""
+    calls = []
+
+    async def load(item):
+        calls.append(item)
+        await asyncio.sleep(0.01)
+        if item == 'missing':
+            raise ZeroDivisionError(item)
+        return item
+
+    single_flight = SingleFlight()
+
+    async def load_all(items):
+        return await asyncio.gather(*[async_backoff(load,
+                                                    args = [item],
+                                                    max_tries = 0,
+                                                    single_flight = single_flight)
+                                      for item in items],
+                                    return_exceptions = True)
+
+    results = run(load_all(['a', 'a', 'b', 'a', 'missing', 'missing']))
+
+    assert sorted(calls) == ['a', 'b', 'missing']
+    assert results[:4] == ['a', 'a', 'b', 'a']
+    assert isinstance(results[4], ZeroDivisionError)
+    assert results[5] is results[4]
+    assert single_flight.shared == 3
+    assert single_flight.in_flight == 0
+
+    with pytest.raises(ValueError):
+        run(async_backoff(load, args = ['a'], single_flight = True))
+    with pytest.raises(TypeError):
+        run(async_backoff(load, args = [['a']], single_flight = single_flight))
@@ -8,6 +8,7 @@ import pytest
 import backoff_utils.strategies as strategies
 
 from backoff_utils._backoff import backoff
+from backoff_utils._clock import VirtualClock
 
 _attempts = 0
 _was_successful = False
@@ -94,8 +95,8 @@ def test_backoff_basic(failure, strategy, max_tries, max_delay, retry_execute):
     """Test the :ref:`backoff_utils._backoff.backoff` function."""
     global _attempts                                                            # pylint: disable=W0603,C0103
     if not failure:
+        clock = VirtualClock()
         with pytest.raises(ZeroDivisionError) as excinfo:
-            start_time = datetime.utcnow()
             backoff(to_execute = divide_by_zero_function,
                     args = [False],
                     kwargs = None,
@@ -107,12 +108,10 @@ def test_backoff_basic(failure, strategy, max_tries, max_delay, retry_execute):
                     max_delay = max_delay,
                     catch_exceptions = [type(ZeroDivisionError())],
                     on_failure = None,
-                    on_success = None)
-        end_time = datetime.utcnow()
-        elapsed_time = start_time - end_time
-        elapsed_time = elapsed_time.total_seconds()
+                    on_success = None,
+                    clock = clock)
         if max_delay is not None:
-            assert elapsed_time <= max_delay
+            assert clock.now() <= max_delay
             assert _attempts <= max_tries
         else:
             assert _attempts == max_tries
@@ -159,7 +158,8 @@ def test_backoff_on_failure_exception(strategy, max_tries, on_failure):
                 max_tries = max_tries,
                 catch_exceptions = [type(ZeroDivisionError())],
                 on_failure = on_failure,
-                on_success = None)
+                on_success = None,
+                clock = VirtualClock())
     assert _attempts == max_tries
     assert _was_successful is False
     _attempts = 0
@@ -186,7 +186,8 @@ def test_backoff_on_failure_function(strategy, max_tries, on_failure):
                 max_tries = max_tries,
                 catch_exceptions = [type(ZeroDivisionError())],
                 on_failure = on_failure,
-                on_success = None)
+                on_success = None,
+                clock = VirtualClock())
     assert _attempts == max_tries
     assert _was_successful is False
     _attempts = 0
@@ -213,7 +214,8 @@ def test_backoff_on_success(strategy, max_tries, on_success):
                            max_tries = max_tries,
                            catch_exceptions = [type(ZeroDivisionError())],
                            on_failure = None,
-                           on_success = on_success)
+                           on_success = on_success,
+                           clock = VirtualClock())
     assert _attempts == max_tries
     assert _was_successful is True
     assert return_value == successful_function(True, max_tries)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._batch"""
+import itertools
+import os
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from backoff_utils._adaptive import AdaptiveController
+from backoff_utils._batch import backoff_map, BackoffResult, _apply_in_worker, \
+    _pickle_for_workers, _worker_state
+from backoff_utils._budget import RetryBudget
+from backoff_utils._circuit_breaker import CircuitBreaker
+from backoff_utils._events import RetryListener
+from backoff_utils._hedge import Hedge
+from backoff_utils._metrics import RetryMetrics
+from backoff_utils._policy import RetryPolicy
+from backoff_utils._single_flight import SingleFlight
+
+
+class FlakyByItem(object):
+    """Callable that fails ``failures`` times per item before returning the item
+    doubled, and always fails for negative items."""
+
+    def __init__(self, failures = 1):
+        self.failures = failures
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        with self.lock:
+            self.calls[item] = self.calls.get(item, 0) + 1
+            calls = self.calls[item]
+
+        if item < 0:
+            raise ValueError('negative item: {}'.format(item))
+        if calls <= self.failures:
+            raise ZeroDivisionError()
+
+        return item * 2
+
+
+_seen_items = set()
+
+
+def fail_on_first_call(item):
+    """Fail the first time this process is called with ``item``, then return
+    ``item`` and the ID of this process."""
+    if item not in _seen_items:
+        _seen_items.add(item)
+        raise ZeroDivisionError()
+
+    return item, os.getpid()
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_backoff_map(ordered):
+    """Test the :ref:`backoff_utils._batch.backoff_map` function."""
+    flaky = FlakyByItem(failures = 1)
+    items = [1, 2, -3, 4, 5]
+
+    results = list(backoff_map(flaky,
+                               items,
+                               workers = 3,
+                               ordered = ordered,
+                               strategy = strategies.Fixed(sequence = [1],
+                                                           scale_factor = 0.01),
+                               max_tries = 2,
+                               catch_exceptions = [ZeroDivisionError]))
+
+    assert len(results) == len(items)
+    assert all(isinstance(result, BackoffResult) for result in results)
+    if ordered:
+        assert [result.index for result in results] == list(range(len(items)))
+
+    for result in sorted(results, key = lambda x: x.index):
+        assert result.item == items[result.index]
+        if result.item < 0:
+            assert result.succeeded is False
+            assert isinstance(result.error, ValueError)
+            with pytest.raises(ValueError):
+                result.result()
+        else:
+            assert result.succeeded is True
+            assert result.result() == result.item * 2
+            assert flaky.calls[result.item] == 2
+
+
+def test_backoff_map_runs_in_parallel():
+    """Test that :ref:`backoff_utils._batch.backoff_map` runs each item's retry
+    loop in parallel."""
+    flaky = FlakyByItem(failures = 2)
+    start_time = datetime.utcnow()
+
+    results = list(backoff_map(flaky,
+                               range(20),
+                               workers = 20,
+                               strategy = strategies.Fixed(sequence = [1],
+                                                           jitter = False,
+                                                           scale_factor = 0.1),
+                               max_tries = 3,
+                               catch_exceptions = [ZeroDivisionError]))
+
+    elapsed_time = (datetime.utcnow() - start_time).total_seconds()
+    assert all(result.succeeded for result in results)
+    assert elapsed_time < 2
+
+
+def test_backoff_map_unordered_returns_fastest_first():
+    """Test that :ref:`backoff_utils._batch.backoff_map` yields results as soon as
+    they are available when ``ordered`` is ``False``."""
+    def slow_first(item):
+        """Take longer for the first item than for any other."""
+        if item == 0:
+            time.sleep(0.5)
+
+        return item
+
+    results = list(backoff_map(slow_first, range(5), workers = 5, ordered = False))
+
+    assert results[0].index != 0
+    assert results[-1].index == 0
+    assert sorted(result.value for result in results) == [0, 1, 2, 3, 4]
+
+
+def test_backoff_map_is_lazy():
+    """Test that :ref:`backoff_utils._batch.backoff_map` only consumes the
+    iterable as results are needed."""
+    results = backoff_map(lambda x: x, itertools.count(), workers = 2)
+
+    assert [result.value for result in itertools.islice(results, 10)] == \
+        list(range(10))
+
+    results.close()
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_backoff_map_processes(ordered):
+    """Test that :ref:`backoff_utils._batch.backoff_map` retries each item within
+    a worker process when ``processes`` is ``True``."""
+    results = list(backoff_map(fail_on_first_call,
+                               range(10),
+                               workers = 2,
+                               ordered = ordered,
+                               processes = True,
+                               strategy = strategies.Fixed(sequence = [1],
+                                                           scale_factor = 0.01),
+                               max_tries = 1,
+                               catch_exceptions = [ZeroDivisionError]))
+
+    assert all(result.succeeded for result in results)
+    assert sorted(result.value[0] for result in results) == list(range(10))
+    assert all(result.value[1] != os.getpid() for result in results)
+    assert not _seen_items
+
+
+def test_backoff_map_processes_requires_pickling():
+    """Test that :ref:`backoff_utils._batch.backoff_map` raises a
+    :class:`TypeError <python:TypeError>` up front if ``processes`` is ``True``
+    and the function cannot be pickled."""
+    with pytest.raises(TypeError):
+        backoff_map(lambda x: x, range(10), processes = True)
+
+
+@pytest.mark.parametrize("kwargs, names", [
+    ({'retry_budget': RetryBudget()}, 'retry_budget'),
+    ({'circuit_breaker': CircuitBreaker()}, 'circuit_breaker'),
+    ({'hedge': Hedge(delay = 1)}, 'hedge'),
+    ({'single_flight': SingleFlight()}, 'single_flight'),
+    ({'strategy': strategies.Adaptive()}, 'strategy'),
+    ({'listeners': RetryMetrics()}, 'listeners'),
+    ({'listeners': [RetryListener(), AdaptiveController()]}, 'listeners'),
+    ({'listeners': RetryMetrics(),
+      'circuit_breaker': CircuitBreaker()}, 'circuit_breaker, listeners'),
+])
+def test_backoff_map_processes_shared_state(kwargs, names):
+    """Test that :ref:`backoff_utils._batch.backoff_map` raises a
+    :class:`ValueError <python:ValueError>` up front if ``processes`` is ``True``
+    and the backoff configuration holds state shared between calls, which each
+    worker process would only have a copy of."""
+    with pytest.raises(ValueError) as error:
+        backoff_map(abs, range(10), processes = True, **kwargs)
+
+    assert str(error.value).startswith(names + ' cannot be shared')
+
+    results = list(backoff_map(abs, [-1, -2], **kwargs))
+    assert [result.value for result in results] == [1, 2]
+
+
+def test_apply_in_worker_unpickles_once():
+    """Test that a worker process only unpickles the policy it is sent once."""
+    payload = _pickle_for_workers(RetryPolicy(max_tries = 1), abs)
+    try:
+        result = _apply_in_worker(0, -3, payload = payload)
+        policy = _worker_state['policy']
+        second_result = _apply_in_worker(1, -4, payload = payload)
+
+        assert (result.index, result.value) == (0, 3)
+        assert (second_result.index, second_result.value) == (1, 4)
+        assert _worker_state['policy'] is policy
+    finally:
+        _worker_state.clear()
+
+
+@pytest.mark.parametrize("to_execute, workers, error", [
+    (None, None, ValueError),
+    ('not-a-callable', None, TypeError),
+    (abs, 0, ValueError),
+    (abs, 'not-an-integer', TypeError),
+])
+def test_backoff_map_validation(to_execute, workers, error):
+    """Test that :ref:`backoff_utils._batch.backoff_map` validates its arguments
+    when called, rather than when its results are first consumed."""
+    with pytest.raises(error):
+        backoff_map(to_execute, [1, 2, 3], workers = workers)
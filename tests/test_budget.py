@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._budget"""
+import pickle
+import threading
+
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from backoff_utils._budget import RetryBudget
+from backoff_utils._clock import VirtualClock
+from backoff_utils._policy import RetryPolicy
+
+
+def always_fail():
+    """Raise a ZeroDivisionError."""
+    raise ZeroDivisionError('Always fails')
+
+
+@pytest.mark.parametrize("ratio, min_per_second, capacity, clock, error", [
+    (0.2, 1.0, 10.0, None, None),
+    (0, 0, 0, VirtualClock(), None),
+    ('0.5', '2', '3', None, None),
+
+    (-0.1, 1.0, 10.0, None, ValueError),
+    (0.2, -1.0, 10.0, None, ValueError),
+    (0.2, 1.0, -10.0, None, ValueError),
+    (0.2, 1.0, 10.0, 'not-a-clock', TypeError),
+])
+def test_retry_budget_init(ratio, min_per_second, capacity, clock, error):
+    """Test the :ref:`backoff_utils._budget.RetryBudget` constructor."""
+    if not error:
+        budget = RetryBudget(ratio = ratio,
+                             min_per_second = min_per_second,
+                             capacity = capacity,
+                             clock = clock)
+        assert budget.tokens == float(capacity)
+    else:
+        with pytest.raises(error):
+            RetryBudget(ratio = ratio,
+                        min_per_second = min_per_second,
+                        capacity = capacity,
+                        clock = clock)
+
+
+def test_retry_budget_withdraw_and_deposit():
+    """Test that :ref:`backoff_utils._budget.RetryBudget` allows one retry per
+    token, and that successful calls deposit ``ratio`` tokens."""
+    budget = RetryBudget(ratio = 0.5,
+                         min_per_second = 0,
+                         capacity = 2,
+                         clock = VirtualClock())
+
+    assert budget.try_withdraw() is True
+    assert budget.try_withdraw() is True
+    assert budget.try_withdraw() is False
+
+    budget.deposit()
+    assert budget.try_withdraw() is False
+    budget.deposit()
+    assert budget.try_withdraw() is True
+
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
+
+
+def test_retry_budget_tops_up_over_time():
+    """Test that :ref:`backoff_utils._budget.RetryBudget` adds
+    ``min_per_second`` tokens per second."""
+    clock = VirtualClock()
+    budget = RetryBudget(ratio = 0,
+                         min_per_second = 2,
+                         capacity = 5,
+                         clock = clock)
+    while budget.try_withdraw():
+        pass
+
+    clock.advance(0.25)
+    assert budget.try_withdraw() is False
+
+    clock.advance(1)
+    assert budget.tokens == 2.5
+
+    clock.advance(60)
+    assert budget.tokens == 5
+
+
+def test_retry_budget_thread_safety():
+    """Test that :ref:`backoff_utils._budget.RetryBudget` never hands out more
+    tokens than it holds when shared between threads."""
+    budget = RetryBudget(ratio = 0,
+                         min_per_second = 0,
+                         capacity = 100)
+    withdrawn = []
+
+    def withdraw():
+        """Try to withdraw 1,000 tokens."""
+        withdrawn.append(sum(budget.try_withdraw() for _ in range(1000)))
+
+    threads = [threading.Thread(target = withdraw) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(withdrawn) == 100
+
+
+def test_retry_budget_named():
+    """Test that :ref:`backoff_utils._budget.RetryBudget.named` shares budgets by
+    name."""
+    budget = RetryBudget.named('test_retry_budget_named', capacity = 3)
+
+    assert RetryBudget.named('test_retry_budget_named') is budget
+    assert RetryBudget.named('test_retry_budget_named', capacity = 99) is budget
+    assert budget.capacity == 3
+    assert RetryBudget.named('test_retry_budget_named_other') is not budget
+
+    assert RetryPolicy(retry_budget = 'test_retry_budget_named').retry_budget is budget
+    with pytest.raises(TypeError):
+        RetryPolicy(retry_budget = 123)
+
+
+def test_retry_budget_pickle():
+    """Test that :ref:`backoff_utils._budget.RetryBudget` can be pickled."""
+    budget = RetryBudget(ratio = 0.5, capacity = 4)
+    budget.try_withdraw()
+
+    copied = pickle.loads(pickle.dumps(budget))
+
+    assert copied.ratio == 0.5
+    assert copied.capacity == 4
+    assert copied.try_withdraw() is True
+
+
+def test_retry_policy_with_retry_budget():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` stops retrying once its
+    budget is exhausted, and that successful calls replenish the budget."""
+    clock = VirtualClock()
+    budget = RetryBudget(ratio = 0.5,
+                         min_per_second = 0,
+                         capacity = 2,
+                         clock = clock)
+    policy = RetryPolicy(strategy = strategies.Linear,
+                         max_tries = 5,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = clock,
+                         retry_budget = budget)
+
+    with pytest.raises(ZeroDivisionError):
+        policy.call(always_fail)
+    assert len(clock.sleeps) == 2
+
+    with pytest.raises(ZeroDivisionError):
+        policy.call(always_fail)
+    assert len(clock.sleeps) == 2
+
+    assert policy.call(abs, -1) == 1
+    assert policy.call(abs, -2) == 2
+    with pytest.raises(ZeroDivisionError):
+        policy.call(always_fail)
+    assert len(clock.sleeps) == 3
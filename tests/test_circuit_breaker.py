@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._circuit_breaker"""
+import pickle
+import threading
+
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from backoff_utils._circuit_breaker import CircuitBreaker, CircuitOpenError
+from backoff_utils._budget import RetryBudget
+from backoff_utils._clock import VirtualClock
+from backoff_utils._policy import RetryPolicy
+
+
+class Dependency(object):
+    """Callable that raises ``error`` while ``down`` is ``True``, counting its
+    calls."""
+
+    def __init__(self, error = ZeroDivisionError):
+        self.error = error
+        self.down = True
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.down:
+            raise self.error()
+
+        return 'up'
+
+
+@pytest.mark.parametrize("failure_threshold, recovery_timeout, clock, error", [
+    (5, 30, None, None),
+    (1, 0, VirtualClock(), None),
+    ('3', '0.5', None, None),
+
+    (0, 30, None, ValueError),
+    (5, -1, None, ValueError),
+    (5, 30, 'not-a-clock', TypeError),
+])
+def test_circuit_breaker_init(failure_threshold, recovery_timeout, clock, error):
+    """Test the :ref:`backoff_utils._circuit_breaker.CircuitBreaker` constructor."""
+    if not error:
+        breaker = CircuitBreaker(failure_threshold = failure_threshold,
+                                 recovery_timeout = recovery_timeout,
+                                 clock = clock)
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.failure_count == 0
+    else:
+        with pytest.raises(error):
+            CircuitBreaker(failure_threshold = failure_threshold,
+                           recovery_timeout = recovery_timeout,
+                           clock = clock)
+
+
+def test_circuit_breaker_states():
+    """Test that :ref:`backoff_utils._circuit_breaker.CircuitBreaker` moves from
+    closed to open to half-open, and back again."""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(failure_threshold = 3,
+                             recovery_timeout = 10,
+                             clock = clock)
+
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request() is True
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is False
+
+    clock.advance(10)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow_request() is False
+
+    clock.advance(10)
+    assert breaker.allow_request() is True
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failure_count == 0
+
+
+def test_circuit_breaker_half_open_trial_expires():
+    """Test that :ref:`backoff_utils._circuit_breaker.CircuitBreaker` allows
+    another trial attempt if the last one is never reported."""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(failure_threshold = 1,
+                             recovery_timeout = 5,
+                             clock = clock)
+    breaker.record_failure()
+
+    clock.advance(5)
+    assert breaker.allow_request() is True
+    clock.advance(4)
+    assert breaker.allow_request() is False
+    clock.advance(1)
+    assert breaker.allow_request() is True
+
+
+def test_circuit_breaker_single_trial_across_threads():
+    """Test that a half-open :ref:`backoff_utils._circuit_breaker.CircuitBreaker`
+    lets exactly one trial attempt through when shared between threads."""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(failure_threshold = 1,
+                             recovery_timeout = 5,
+                             clock = clock)
+    breaker.record_failure()
+    clock.advance(5)
+
+    allowed = []
+    threads = [threading.Thread(target = lambda: allowed.append(breaker.allow_request()))
+               for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert allowed.count(True) == 1
+
+
+def test_circuit_breaker_named():
+    """Test that :ref:`backoff_utils._circuit_breaker.CircuitBreaker.named` shares
+    circuit breakers by name."""
+    breaker = CircuitBreaker.named('test_circuit_breaker_named',
+                                   failure_threshold = 2)
+
+    assert CircuitBreaker.named('test_circuit_breaker_named') is breaker
+    assert breaker.failure_threshold == 2
+    assert CircuitBreaker.named('test_circuit_breaker_named_other') is not breaker
+
+    policy = RetryPolicy(circuit_breaker = 'test_circuit_breaker_named')
+    assert policy.circuit_breaker is breaker
+    with pytest.raises(TypeError):
+        RetryPolicy(circuit_breaker = 123)
+
+
+def test_circuit_breaker_pickle():
+    """Test that :ref:`backoff_utils._circuit_breaker.CircuitBreaker` can be
+    pickled."""
+    breaker = CircuitBreaker(failure_threshold = 2)
+    breaker.record_failure()
+
+    copied = pickle.loads(pickle.dumps(breaker))
+
+    assert copied.failure_count == 1
+    copied.record_failure()
+    assert copied.state == CircuitBreaker.OPEN
+
+
+def test_retry_policy_with_circuit_breaker():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` fails fast while its
+    circuit breaker is open, and recovers once the dependency does."""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(failure_threshold = 3,
+                             recovery_timeout = 60,
+                             clock = clock)
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1], jitter = False),
+                         max_tries = 5,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = clock,
+                         circuit_breaker = breaker)
+    dependency = Dependency()
+
+    with pytest.raises(ZeroDivisionError):
+        policy.call(dependency)
+    assert dependency.calls == 3
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        policy.call(dependency)
+    assert dependency.calls == 3
+
+    clock.advance(60)
+    with pytest.raises(ZeroDivisionError):
+        policy.call(dependency)
+    assert dependency.calls == 4
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.advance(60)
+    dependency.down = False
+    assert policy.call(dependency) == 'up'
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_policy_circuit_breaker_ignores_uncaught_errors():
+    """Test that errors a :ref:`backoff_utils._policy.RetryPolicy` would not retry
+    do not open its circuit breaker."""
+    breaker = CircuitBreaker(failure_threshold = 1)
+    policy = RetryPolicy(catch_exceptions = ZeroDivisionError,
+                         circuit_breaker = breaker)
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            policy.call(Dependency(error = ValueError))
+
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("budget_tokens, max_delay, expected_tokens", [
+    (0, None, 0),
+    (1, 30, 1),
+])
+def test_retry_policy_circuit_breaker_trial_not_wasted(budget_tokens,
+                                                       max_delay,
+                                                       expected_tokens):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` does not reserve a
+    half-open circuit breaker's trial attempt (nor withdraw from its retry
+    budget) for a retry that its retry budget or ``max_delay`` refuses."""
+    clock = VirtualClock()
+    breaker = CircuitBreaker(failure_threshold = 1,
+                             recovery_timeout = 60,
+                             clock = clock)
+    budget = RetryBudget(min_per_second = 0, capacity = budget_tokens, clock = clock)
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1], jitter = False),
+                         max_tries = 5,
+                         max_delay = max_delay,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = clock,
+                         retry_budget = budget,
+                         circuit_breaker = breaker)
+
+    def outage():
+        """Fail, while the circuit breaker opens and becomes due for a trial."""
+        breaker.record_failure()
+        clock.advance(60)
+        raise ZeroDivisionError()
+
+    with pytest.raises(ZeroDivisionError):
+        policy.call(outage)
+
+    assert budget.tokens == expected_tokens
+    assert breaker.allow_request() is True
+    assert breaker.state == CircuitBreaker.HALF_OPEN
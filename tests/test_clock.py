@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._clock"""
+import pytest
+
+from backoff_utils._clock import Clock, MonotonicClock, VirtualClock, \
+    DEFAULT_CLOCK
+
+
+def test_clock_is_abstract():
+    """Test that :ref:`backoff_utils._clock.Clock` cannot be instantiated."""
+    with pytest.raises(TypeError):
+        Clock()
+
+
+def test_monotonic_clock():
+    """Test that :ref:`backoff_utils._clock.MonotonicClock` never goes
+    backwards."""
+    clock = MonotonicClock()
+    readings = [clock.now() for _ in range(1000)]
+
+    assert isinstance(readings[0], float)
+    assert readings == sorted(readings)
+
+
+def test_default_clock():
+    """Test that the default clock is a
+    :ref:`backoff_utils._clock.MonotonicClock`."""
+    assert isinstance(DEFAULT_CLOCK, MonotonicClock)
+
+
+def test_virtual_clock():
+    """Test that :ref:`backoff_utils._clock.VirtualClock` only moves when told
+    to."""
+    clock = VirtualClock(start = 10)
+    assert clock.now() == 10.0
+    assert clock.now() == 10.0
+
+    clock.sleep(2.5)
+    clock.advance(1)
+    clock.sleep(4)
+
+    assert clock.now() == 17.5
+    assert clock.sleeps == [2.5, 4]
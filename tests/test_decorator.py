@@ -1,13 +1,13 @@
 # -*- coding: utf-8 -*-
 
 """Tests for backoff_utils._backoff"""
-from datetime import datetime
-
 import pytest
 
 import backoff_utils.strategies as strategies
 
 from backoff_utils._decorator import apply_backoff
+from backoff_utils._policy import RetryPolicy
+from backoff_utils._clock import VirtualClock
 
 _attempts = 0
 _was_successful = False
@@ -77,33 +77,36 @@ def on_failure_function(error,
 def test_apply_backoff(failure, strategy, max_tries, max_delay):
     """Test the :ref:`backoff_utils._backoff.backoff` function."""
     global _attempts                                                            # pylint: disable=W0603,C0103
-
-    @apply_backoff(strategy = strategy,
-                   max_tries = max_tries,
-                   max_delay = max_delay,
-                   catch_exceptions = [type(ZeroDivisionError())],
-                   on_failure = None,
-                   on_success = None)
-    def divide_by_zero_function():
-        """Raise a ZeroDivisionError counting attempts."""
-        global _attempts                                                            # pylint: disable=W0603,C0103
-        if _attempts > 0:
-            _attempts += 1
-            raise ZeroDivisionError('Failed on Subsequent Attempt')
-        else:
-            _attempts += 1
-            raise ZeroDivisionError()
+    clock = VirtualClock()
+
+    def decorate():
+        """Apply the decorator, which validates its configuration."""
+        @apply_backoff(strategy = strategy,
+                       max_tries = max_tries,
+                       max_delay = max_delay,
+                       catch_exceptions = [type(ZeroDivisionError())],
+                       on_failure = None,
+                       on_success = None,
+                       clock = clock)
+        def divide_by_zero_function():
+            """Raise a ZeroDivisionError counting attempts."""
+            global _attempts                                                    # pylint: disable=W0603,C0103
+            if _attempts > 0:
+                _attempts += 1
+                raise ZeroDivisionError('Failed on Subsequent Attempt')
+            else:
+                _attempts += 1
+                raise ZeroDivisionError()
+
+        return divide_by_zero_function
 
     if not failure:
+        divide_by_zero_function = decorate()
         with pytest.raises(ZeroDivisionError) as excinfo:
-            start_time = datetime.utcnow()
             divide_by_zero_function()
 
-        end_time = datetime.utcnow()
-        elapsed_time = start_time - end_time
-        elapsed_time = elapsed_time.total_seconds()
         if max_delay is not None:
-            assert elapsed_time <= max_delay
+            assert clock.now() <= max_delay
             assert _attempts <= (max_tries + 1)
         else:
             assert _attempts == (max_tries + 1)
@@ -111,10 +114,59 @@ def test_apply_backoff(failure, strategy, max_tries, max_delay):
             assert 'Subsequent Attempt' in str(excinfo.value)
     else:
         with pytest.raises(failure):
-            start_time = datetime.utcnow()
-            divide_by_zero_function()
-        end_time = datetime.utcnow()
-        elapsed_time = start_time - end_time
-        elapsed_time = elapsed_time.total_seconds()
+            decorate()
 
     _attempts = 0
+
+
+@pytest.mark.parametrize("max_tries, failures, expected_calls", [
+    (3, 0, 1),
+    (3, 1, 2),
+])
+def test_apply_backoff_retry_policy(max_tries, failures, expected_calls):
+    """Test that the :ref:`backoff_utils._decorator.apply_backoff` decorator
+    re-uses a single pre-validated policy."""
+    calls = []
+
+    @apply_backoff(strategy = strategies.Linear,
+                   max_tries = max_tries,
+                   catch_exceptions = [type(ZeroDivisionError())])
+    def flaky_function(value, kwarg1 = None):
+        """Fail ``failures`` times, then return the arguments."""
+        calls.append(value)
+        if len(calls) <= failures:
+            raise ZeroDivisionError()
+
+        return value, kwarg1
+
+    assert isinstance(flaky_function.retry_policy, RetryPolicy)
+    assert flaky_function.retry_policy.max_tries == max_tries
+    assert flaky_function.__name__ == 'flaky_function'
+
+    assert flaky_function('value', kwarg1 = 'kwvalue') == ('value', 'kwvalue')
+    assert len(calls) == expected_calls
+
+
+@pytest.mark.parametrize("results, max_tries, expected_result, expected_calls", [
+    ([None, None, 'page'], 3, 'page', 3),
+    (['page'], 3, 'page', 1),
+    ([None, None, None, None, 'page'], 2, None, 3),
+])
+def test_apply_backoff_retry_on_result(results, max_tries, expected_result, expected_calls):
+    """Test that the :ref:`backoff_utils._decorator.apply_backoff` decorator
+    retries calls whose result is rejected by ``retry_on_result``."""
+    clock = VirtualClock()
+    calls = []
+
+    @apply_backoff(strategy = strategies.Fixed(sequence = [1], jitter = False),
+                   max_tries = max_tries,
+                   clock = clock,
+                   retry_on_result = lambda result: result is None)
+    def fetch_page():
+        """Return the next of ``results``."""
+        calls.append(1)
+        return results[len(calls) - 1]
+
+    assert fetch_page() == expected_result
+    assert len(calls) == expected_calls
+    assert clock.sleeps == [1] * (expected_calls - 1)
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._events"""
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from backoff_utils._clock import VirtualClock
+from backoff_utils._events import RetryListener, RetryEvent, _get_listeners, _Hooks
+from backoff_utils._policy import RetryPolicy
+
+from tests.conftest import SlowFlaky
+
+
+class Recorder(RetryListener):
+    """Listener that records every event it receives, with the hook's name."""
+
+    def __init__(self):
+        super(Recorder, self).__init__()
+        self.events = []
+
+    def on_attempt_start(self, event):
+        self.events.append(('on_attempt_start', event))
+
+    def on_attempt_end(self, event):
+        self.events.append(('on_attempt_end', event))
+
+    def on_retry(self, event):
+        self.events.append(('on_retry', event))
+
+    def on_giveup(self, event):
+        self.events.append(('on_giveup', event))
+
+
+def test_retry_listener_init():
+    """Test the :ref:`backoff_utils._events.RetryListener` constructor."""
+    calls = []
+    listener = RetryListener(on_retry = calls.append)
+    assert listener._implements('on_retry')
+    assert not listener._implements('on_giveup')
+
+    listener.on_retry('event')
+    assert calls == ['event']
+
+    assert Recorder()._implements('on_giveup')
+
+    with pytest.raises(TypeError):
+        RetryListener(on_retry = 'not-callable')
+
+
+@pytest.mark.parametrize("value, expected_length, error", [
+    (None, 0, None),
+    (RetryListener(), 1, None),
+    ([RetryListener(), RetryListener()], 2, None),
+    ((), 0, None),
+
+    ('not-a-listener', None, TypeError),
+    (123, None, TypeError),
+    ([RetryListener(), 'not-a-listener'], None, TypeError),
+])
+def test_get_listeners(value, expected_length, error):
+    """Test :ref:`backoff_utils._events._get_listeners`."""
+    if not error:
+        assert len(_get_listeners(value)) == expected_length
+    else:
+        with pytest.raises(error):
+            _get_listeners(value)
+
+
+def test_listeners_without_hooks_cost_nothing():
+    """Test that listeners which implement no hooks leave
+    :ref:`backoff_utils._policy.RetryPolicy` on its fast path."""
+    assert not _Hooks([RetryListener(), RetryListener()])
+    assert _Hooks([RetryListener(on_giveup = len)])
+
+    policy = RetryPolicy(listeners = RetryListener())
+    assert policy._hooks is None
+    assert policy._needs_bookkeeping is False
+
+    policy = RetryPolicy(listeners = Recorder())
+    assert policy._hooks is not None
+    assert policy._needs_bookkeeping is True
+
+
+def test_retry_events():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` sends the expected
+    events, in order, for a call that succeeds on its third attempt."""
+    clock = VirtualClock()
+    recorder = Recorder()
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [2, 4],
+                                                     jitter = False),
+                         max_tries = 5,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = clock,
+                         listeners = recorder)
+    function = SlowFlaky(clock, failures = 2, duration = 1)
+
+    assert policy.call(function) == 'value'
+
+    hooks = [(name, event.attempt) for name, event in recorder.events]
+    assert hooks == [('on_attempt_start', 1),
+                     ('on_attempt_end', 1),
+                     ('on_retry', 1),
+                     ('on_attempt_start', 2),
+                     ('on_attempt_end', 2),
+                     ('on_retry', 2),
+                     ('on_attempt_start', 3),
+                     ('on_attempt_end', 3)]
+
+    events = [event for _, event in recorder.events]
+    assert all(isinstance(event, RetryEvent) for event in events)
+    assert all(event.function is function for event in events)
+    assert all(event.strategy is policy.strategy for event in events)
+    assert all(event.state is events[0].state for event in events)
+    assert [event.elapsed for event in events] == [0, 1, 1, 3, 4, 4, 8, 9]
+    assert [event.delay for event in events if event.delay is not None] == [2, 4]
+
+    ends = [event for name, event in recorder.events if name == 'on_attempt_end']
+    assert [end.duration for end in ends] == [1, 1, 1]
+    assert isinstance(ends[0].error, ZeroDivisionError)
+    assert ends[0].value is None
+    assert ends[2].error is None
+    assert ends[2].value == 'value'
+
+
+@pytest.mark.parametrize("error, max_tries, max_delay, expected_attempts", [
+    (ZeroDivisionError, 2, None, 3),
+    (ZeroDivisionError, 5, 4, 2),
+    (ValueError, 5, None, 1),
+])
+def test_giveup_event(error, max_tries, max_delay, expected_attempts):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` sends ``on_giveup`` for
+    the last attempt, whether it gave up because of ``max_tries``, ``max_delay``,
+    or an error it does not retry."""
+    clock = VirtualClock()
+    giveups = []
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [2],
+                                                     jitter = False),
+                         max_tries = max_tries,
+                         max_delay = max_delay,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = clock,
+                         skip_late_attempt = True,
+                         listeners = RetryListener(on_giveup = giveups.append))
+    function = SlowFlaky(clock, failures = 10, duration = 1, error = error)
+
+    with pytest.raises(error):
+        policy.call(function)
+
+    assert function.calls == expected_attempts
+    assert len(giveups) == 1
+    assert giveups[0].attempt == expected_attempts
+    assert isinstance(giveups[0].error, error)
+
+
+def test_multiple_listeners():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` sends each event to
+    every listener that implements its hook."""
+    retries = []
+    recorder = Recorder()
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 1,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = VirtualClock(),
+                         listeners = [RetryListener(on_retry = retries.append),
+                                      recorder])
+
+    with pytest.raises(ZeroDivisionError):
+        policy.call(SlowFlaky(VirtualClock(), failures = 10, duration = 1))
+
+    assert len(retries) == 1
+    assert [name for name, _ in recorder.events].count('on_retry') == 1
+    assert recorder.events[-1][0] == 'on_giveup'
+
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._hedge"""
+import pickle
+import threading
+import time
+
+import pytest
+
+from backoff_utils._hedge import Hedge, _get_hedge, _MIN_SAMPLES
+from backoff_utils._policy import RetryPolicy
+
+from tests.conftest import make_policy
+
+
+class SlowThenFast(object):
+    """Callable whose first call blocks until ``release`` is set (or ``timeout``
+    seconds pass) and then returns ``'slow'`` (or raises ``error``), and whose
+    later calls return ``'fast'`` immediately."""
+
+    def __init__(self, error = None, timeout = 5):
+        self.release = threading.Event()
+        self.error = error
+        self.timeout = timeout
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            first = self.calls == 1
+        if not first:
+            return 'fast'
+
+        self.release.wait(self.timeout)
+        if self.error is not None:
+            raise self.error
+        return 'slow'
+
+
+@pytest.mark.parametrize("kwargs, error", [
+    ({'delay': 0.1}, None),
+    ({'percentile': 95}, None),
+    ({'delay': 0, 'percentile': 99.9, 'max_ratio': 0, 'window': 1}, None),
+
+    ({}, ValueError),
+    ({'delay': -1}, ValueError),
+    ({'percentile': 0}, ValueError),
+    ({'percentile': 100}, ValueError),
+    ({'delay': 1, 'max_ratio': 1.5}, ValueError),
+    ({'delay': 1, 'window': 0}, ValueError),
+])
+def test_hedge_init(kwargs, error):
+    """Test the :ref:`backoff_utils._hedge.Hedge` constructor."""
+    if not error:
+        hedge = Hedge(**kwargs)
+        assert hedge.threshold == kwargs.get('delay')
+        assert hedge.calls == 0
+        assert hedge.hedges == 0
+    else:
+        with pytest.raises(error):
+            Hedge(**kwargs)
+
+
+def test_hedge_returns_first_to_succeed():
+    """Test that a policy applying :ref:`backoff_utils._hedge.Hedge` makes a
+    second attempt when the first is slow, and returns whichever succeeds
+    first."""
+    hedge = Hedge(delay = 0.01, max_ratio = 1)
+    policy = make_policy(max_tries = 1, hedge = hedge)
+    assert policy._needs_bookkeeping is True
+
+    function = SlowThenFast()
+    try:
+        assert policy.call(function) == 'fast'
+    finally:
+        function.release.set()
+
+    assert function.calls == 2
+    assert hedge.calls == 1
+    assert hedge.hedges == 1
+
+    assert policy.call(abs, -1) == 1
+    assert hedge.calls == 2
+    assert hedge.hedges == 1
+
+
+def test_hedge_uses_retry_execute():
+    """Test that :ref:`backoff_utils._hedge.Hedge` makes its second attempt using
+    ``retry_execute``, and waits for it if the first attempt fails."""
+    function = SlowThenFast(error = ZeroDivisionError(), timeout = 0.05)
+    policy = make_policy(max_tries = 1,
+                         hedge = Hedge(delay = 0.01, max_ratio = 1))
+
+    def fallback():
+        """Return after the first attempt has failed."""
+        time.sleep(0.1)
+        return 'fallback'
+
+    assert policy.execute(function, retry_execute = fallback) == 'fallback'
+    assert function.calls == 1
+
+
+def test_hedge_both_attempts_fail():
+    """Test that :ref:`backoff_utils._hedge.Hedge` raises the first error when
+    both attempts fail, which the policy then retries."""
+    attempts = []
+
+    def failing():
+        """Fail slowly on the first attempt, and quickly on the second."""
+        attempts.append(1)
+        if len(attempts) == 1:
+            time.sleep(0.05)
+            raise ZeroDivisionError('slow')
+        if len(attempts) == 2:
+            raise ZeroDivisionError('fast')
+        return 'value'
+
+    policy = make_policy(max_tries = 1,
+                         hedge = Hedge(delay = 0.01, max_ratio = 1))
+    assert policy.call(failing) == 'value'
+    assert len(attempts) == 3
+
+
+def test_hedge_max_ratio():
+    """Test that :ref:`backoff_utils._hedge.Hedge` hedges no more than
+    ``max_ratio`` of calls."""
+    hedge = Hedge(delay = 0.005, max_ratio = 0.5)
+    policy = make_policy(max_tries = 1, hedge = hedge)
+
+    def slow():
+        """Take longer than the hedge's delay."""
+        time.sleep(0.03)
+        return 'value'
+
+    for _ in range(4):
+        assert policy.call(slow) == 'value'
+
+    assert hedge.calls == 4
+    assert hedge.hedges == 2
+
+
+def test_hedge_percentile():
+    """Test that :ref:`backoff_utils._hedge.Hedge` only hedges at a percentile
+    once it has observed enough first attempts."""
+    hedge = Hedge(percentile = 50, max_ratio = 1)
+    policy = make_policy(max_tries = 1, hedge = hedge)
+
+    for _ in range(_MIN_SAMPLES - 1):
+        policy.call(abs, -1)
+    assert hedge.threshold is None
+
+    policy.call(abs, -1)
+    threshold = hedge.threshold
+    assert threshold is not None
+    assert 0 <= threshold < 0.1
+    assert hedge.hedges == 0
+
+    function = SlowThenFast()
+    try:
+        assert policy.call(function) == 'fast'
+    finally:
+        function.release.set()
+    assert hedge.hedges == 1
+
+
+def test_hedge_concurrency():
+    """Test that :ref:`backoff_utils._hedge.Hedge` does not limit the number of
+    concurrent calls, nor hedge calls for time spent waiting on other calls."""
+    hedge = Hedge(delay = 0.5, max_ratio = 1)
+    policy = make_policy(max_tries = 1, hedge = hedge)
+    latencies = []
+
+    def slow():
+        """Take a tenth of the hedge's delay."""
+        time.sleep(0.05)
+        return 'value'
+
+    def make_call():
+        started_at = time.time()
+        assert policy.call(slow) == 'value'
+        latencies.append(time.time() - started_at)
+
+    threads = [threading.Thread(target = make_call) for _ in range(100)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(latencies) == 100
+    assert max(latencies) < 0.5
+    assert hedge.calls == 100
+    assert hedge.hedges == 0
+
+
+def test_hedge_named_and_pickle():
+    """Test that hedges are shared by name, and that pickled hedges keep their
+    configuration but not what they have observed."""
+    hedge = Hedge.named('test_hedge_named', delay = 0.5)
+    assert Hedge.named('test_hedge_named') is hedge
+    assert _get_hedge('test_hedge_named') is hedge
+    assert _get_hedge(hedge) is hedge
+    assert _get_hedge(None) is None
+    with pytest.raises(TypeError):
+        _get_hedge(0.5)
+    with pytest.raises(TypeError):
+        RetryPolicy(hedge = 0.5)
+
+    make_policy(max_tries = 1, hedge = hedge).call(abs, -1)
+    copied = pickle.loads(pickle.dumps(hedge))
+    assert copied.delay == 0.5
+    assert copied.calls == 0
+    assert hedge.calls == 1
+
+
+def test_hedge_unregistered_name():
+    """Test that a hedge named but never registered raises a
+    :class:`ValueError <python:ValueError>` which says so."""
+    with pytest.raises(ValueError) as error:
+        _get_hedge('test_hedge_unregistered')
+    assert 'no hedge is registered' in str(error.value)
+
+    with pytest.raises(ValueError):
+        RetryPolicy(hedge = 'test_hedge_unregistered')
+    assert 'test_hedge_unregistered' not in Hedge._REGISTRY                     # pylint: disable=protected-access
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._metrics"""
+import pickle
+import threading
+
+import pytest
+
+from backoff_utils._clock import VirtualClock
+from backoff_utils._decorator import apply_backoff
+from backoff_utils._metrics import RetryMetrics
+from backoff_utils._policy import RetryPolicy
+
+from tests.conftest import SlowFlaky, make_policy
+
+
+@pytest.mark.parametrize("prefix, buckets, expected_buckets, error", [
+    ('backoff', None, (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0), None),
+    ('my_app', [2, 1, 1], (1.0, 2.0), None),
+
+    ('', None, None, ValueError),
+    ('not-a-name', None, None, ValueError),
+    ('backoff', [-1], None, ValueError),
+])
+def test_retry_metrics_init(prefix, buckets, expected_buckets, error):
+    """Test the :ref:`backoff_utils._metrics.RetryMetrics` constructor."""
+    if not error:
+        metrics = RetryMetrics(prefix = prefix, buckets = buckets)
+        assert metrics.buckets == expected_buckets
+        assert metrics.snapshot() == {}
+    else:
+        with pytest.raises(error):
+            RetryMetrics(prefix = prefix, buckets = buckets)
+
+
+def test_retry_metrics_snapshot():
+    """Test that :ref:`backoff_utils._metrics.RetryMetrics` aggregates attempts,
+    retries, give-ups, delays and durations per function."""
+    clock = VirtualClock()
+    metrics = RetryMetrics(buckets = [0.1, 0.5])
+    policy = make_policy(clock = clock, listeners = metrics)
+
+    assert policy.call(SlowFlaky(clock, failures = 2)) == 'value'
+    with pytest.raises(ZeroDivisionError):
+        make_policy(max_tries = 1,
+                    clock = clock,
+                    listeners = metrics).call(SlowFlaky(clock, failures = 10))
+    policy.call(SlowFlaky(clock, failures = 0, duration = 0.0625))
+
+    snapshot = metrics.snapshot()
+    name = '{}.SlowFlaky'.format(SlowFlaky.__module__)
+    assert list(snapshot) == [name]
+
+    stats = snapshot[name]
+    assert stats['attempts'] == 6
+    assert stats['retries'] == 3
+    assert stats['giveups'] == 1
+    assert stats['sleep_seconds'] == 4
+    assert stats['duration_sum'] == 1.3125
+    assert stats['duration_buckets'] == [(0.1, 1), (0.5, 6), (float('inf'), 6)]
+
+
+def test_retry_metrics_per_function():
+    """Test that :ref:`backoff_utils._metrics.RetryMetrics` reports the functions
+    decorated by :ref:`backoff_utils._decorator.apply_backoff` by name."""
+    metrics = RetryMetrics()
+
+    @apply_backoff(max_tries = 1, listeners = metrics)
+    def first():
+        return 1
+
+    @apply_backoff(max_tries = 1, listeners = metrics)
+    def second():
+        return 2
+
+    first()
+    first()
+    second()
+
+    snapshot = metrics.snapshot()
+    names = sorted(snapshot)
+    assert len(names) == 2
+    assert names[0].endswith('first')
+    assert names[1].endswith('second')
+    assert snapshot[names[0]]['attempts'] == 2
+    assert snapshot[names[1]]['attempts'] == 1
+
+
+def test_retry_metrics_render():
+    """Test that :ref:`backoff_utils._metrics.RetryMetrics.render` produces the
+    Prometheus text exposition format."""
+    clock = VirtualClock()
+    metrics = RetryMetrics(prefix = 'app', buckets = [0.5])
+    policy = make_policy(clock = clock, listeners = metrics)
+    policy.call(SlowFlaky(clock, failures = 1))
+
+    text = metrics.render()
+    label = 'function="{}.SlowFlaky"'.format(SlowFlaky.__module__)
+
+    assert text.endswith('\n')
+    assert '# TYPE app_attempts_total counter' in text
+    assert 'app_attempts_total{%s} 2' % label in text
+    assert 'app_retries_total{%s} 1' % label in text
+    assert 'app_giveups_total{%s} 0' % label in text
+    assert 'app_sleep_seconds_total{%s} 1' % label in text
+    assert '# TYPE app_attempt_duration_seconds histogram' in text
+    assert 'app_attempt_duration_seconds_bucket{%s,le="0.5"} 2' % label in text
+    assert 'app_attempt_duration_seconds_bucket{%s,le="+Inf"} 2' % label in text
+    assert 'app_attempt_duration_seconds_sum{%s} 0.5' % label in text
+    assert 'app_attempt_duration_seconds_count{%s} 2' % label in text
+
+    assert RetryMetrics().render().count('# TYPE') == 5
+
+
+def test_retry_metrics_threads():
+    """Test that :ref:`backoff_utils._metrics.RetryMetrics` counts every attempt
+    made across threads, including threads that have since finished."""
+    metrics = RetryMetrics()
+    policy = RetryPolicy(max_tries = 1, listeners = metrics)
+
+    def work():
+        """Make 500 calls."""
+        for _ in range(500):
+            policy.call(abs, -1)
+
+    threads = [threading.Thread(target = work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    assert sum(stats['attempts'] for stats in metrics.snapshot().values()) <= 4000
+    for thread in threads:
+        thread.join()
+
+    work()
+    snapshot = metrics.snapshot()
+    assert sum(stats['attempts'] for stats in snapshot.values()) == 4500
+    assert len(metrics._shards) == 1
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_retry_metrics_named_and_pickle():
+    """Test that :ref:`backoff_utils._metrics.RetryMetrics.named` shares metrics by
+    name, and that pickled metrics keep their configuration but not their
+    counts."""
+    metrics = RetryMetrics.named('test_retry_metrics_named', prefix = 'named')
+    assert RetryMetrics.named('test_retry_metrics_named') is metrics
+    assert metrics.prefix == 'named'
+
+    clock = VirtualClock()
+    policy = make_policy(clock = clock, listeners = metrics)
+    policy.call(SlowFlaky(clock, failures = 1))
+
+    copied = pickle.loads(pickle.dumps(metrics))
+    assert copied.prefix == 'named'
+    assert copied.buckets == metrics.buckets
+    assert copied.snapshot() == {}
+    assert metrics.snapshot() != {}
@@ -0,0 +1,657 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._policy"""
+import threading
+
+import pytest
+
+import backoff_utils._policy as _policy
+import backoff_utils.strategies as strategies
+
+from backoff_utils._policy import RetryPolicy, BackoffTimeoutError, AttemptTimeoutError
+from backoff_utils._circuit_breaker import CircuitBreaker
+from backoff_utils._clock import Clock, VirtualClock, DEFAULT_CLOCK
+from backoff_utils._events import RetryListener
+
+
+class SteppingClock(Clock):
+    """Clock that returns each of ``readings`` in turn, repeating the last."""
+
+    def __init__(self, *readings):
+        self.readings = list(readings)
+
+    def now(self):
+        if len(self.readings) > 1:
+            return self.readings.pop(0)
+
+        return self.readings[0]
+
+
+class FlakyFunction(object):
+    """Callable that fails ``failures`` times before returning its arguments."""
+
+    def __init__(self, failures, error = ZeroDivisionError):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error('Failed on attempt {}'.format(self.calls))
+
+        return args, kwargs
+
+
+@pytest.mark.parametrize("strategy, max_tries, on_failure, on_success, error", [
+    (None, None, None, None, None),
+    (strategies.Linear, 5, None, None, None),
+    (strategies.Fixed(sequence = [1, 2]), '2', None, None, None),
+    (strategies.Exponential, 1, ValueError, len, None),
+
+    ('invalid-value', 1, None, None, TypeError),
+    (strategies.Linear, 1, 'not-a-callable', None, TypeError),
+    (strategies.Linear, 1, None, 'not-a-callable', TypeError),
+    (strategies.Linear, 'not-an-integer', None, None, TypeError),
+])
+def test_retry_policy_init(strategy, max_tries, on_failure, on_success, error):
+    """Test the :ref:`backoff_utils._policy.RetryPolicy` constructor."""
+    if not error:
+        policy = RetryPolicy(strategy = strategy,
+                             max_tries = max_tries,
+                             on_failure = on_failure,
+                             on_success = on_success)
+        assert policy.strategy is (strategy or strategies.Exponential)
+        assert isinstance(policy.max_tries, int)
+    else:
+        with pytest.raises(error):
+            RetryPolicy(strategy = strategy,
+                        max_tries = max_tries,
+                        on_failure = on_failure,
+                        on_success = on_success)
+
+
+@pytest.mark.parametrize("failures, max_tries, expected_calls, raises", [
+    (0, 3, 1, False),
+    (1, 3, 2, False),
+    (2, 2, 3, False),
+    (3, 2, 3, True),
+])
+def test_retry_policy_call(failures, max_tries, expected_calls, raises):
+    """Test the :ref:`backoff_utils._policy.RetryPolicy.call` method."""
+    successes = []
+    policy = RetryPolicy(strategy = strategies.Linear,
+                         max_tries = max_tries,
+                         catch_exceptions = [type(ZeroDivisionError())],
+                         on_success = successes.append)
+    flaky = FlakyFunction(failures)
+
+    if not raises:
+        result = policy.call(flaky, 'value', kwarg1 = 'kwvalue')
+        assert result == (('value',), {'kwarg1': 'kwvalue'})
+        assert successes == [result]
+    else:
+        with pytest.raises(ZeroDivisionError):
+            policy.call(flaky, 'value', kwarg1 = 'kwvalue')
+        assert successes == []
+
+    assert flaky.calls == expected_calls
+
+
+@pytest.mark.parametrize("max_delay, wrapped", [
+    (None, False),
+    (None, True),
+    (60, False),
+])
+def test_retry_policy_errors_not_chained(max_delay, wrapped):
+    """Test that the error raised when :ref:`backoff_utils._policy.RetryPolicy`
+    gives up is not chained to the errors raised by earlier attempts."""
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 2,
+                         max_delay = max_delay,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = VirtualClock())
+    flaky = FlakyFunction(3)
+    call = policy.wrap(flaky) if wrapped else lambda: policy.call(flaky)
+
+    with pytest.raises(ZeroDivisionError) as error:
+        call()
+
+    assert str(error.value) == 'Failed on attempt 3'
+    assert getattr(error.value, '__context__', None) is None
+
+
+def test_retry_policy_call_uncaught_exception():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy.call` does not retry
+    exceptions that it was not configured to catch."""
+    policy = RetryPolicy(strategy = strategies.Linear,
+                         max_tries = 3,
+                         catch_exceptions = [type(ZeroDivisionError())])
+    flaky = FlakyFunction(1, error = KeyError)
+
+    with pytest.raises(KeyError):
+        policy.call(flaky)
+
+    assert flaky.calls == 1
+
+
+def test_retry_policy_execute():
+    """Test the :ref:`backoff_utils._policy.RetryPolicy.execute` method."""
+    policy = RetryPolicy(strategy = strategies.Linear,
+                         max_tries = 1,
+                         catch_exceptions = ZeroDivisionError)
+    first = FlakyFunction(1)
+    retry = FlakyFunction(0)
+
+    result = policy.execute(first,
+                            args = ['value'],
+                            retry_execute = retry,
+                            retry_args = ['retry-value'],
+                            retry_kwargs = {'kwarg1': 'kwvalue'})
+
+    assert result == (('retry-value',), {'kwarg1': 'kwvalue'})
+    assert first.calls == 1
+    assert retry.calls == 1
+
+
+def test_retry_policy_timeout():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` times out when
+    ``max_delay`` has already elapsed."""
+    policy = RetryPolicy(strategy = strategies.Linear,
+                         max_tries = 3,
+                         max_delay = 0,
+                         catch_exceptions = ZeroDivisionError)
+    flaky = FlakyFunction(0)
+
+    with pytest.raises(BackoffTimeoutError):
+        policy.call(flaky)
+
+    assert flaky.calls == 0
+
+
+@pytest.mark.parametrize("on_failure, expected_error", [
+    (None, ZeroDivisionError),
+    (ValueError, ValueError),
+])
+def test_retry_policy_failure_without_message(on_failure, expected_error):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` handles failures
+    whose exception was raised without a message."""
+    def always_fail():
+        """Raise a ZeroDivisionError without a message."""
+        raise ZeroDivisionError()
+
+    policy = RetryPolicy(strategy = strategies.Linear,
+                         max_tries = 1,
+                         catch_exceptions = ZeroDivisionError,
+                         on_failure = on_failure)
+
+    with pytest.raises(expected_error):
+        policy.call(always_fail)
+
+
+@pytest.mark.parametrize("max_tries", [0, 2])
+def test_retry_policy_on_failure_traceback(max_tries):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` passes the traceback
+    of the last error to an ``on_failure`` function, and chains an
+    ``on_failure`` exception to the last error."""
+    failures = []
+
+    def record_failure(error, message, stacktrace):
+        """Record the arguments ``on_failure`` is called with."""
+        failures.append((error, message, stacktrace))
+
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = max_tries,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = VirtualClock(),
+                         on_failure = record_failure)
+
+    assert policy.call(FlakyFunction(10)) is None
+    error, message, stacktrace = failures[0]
+    assert isinstance(error, ZeroDivisionError)
+    assert message == 'Failed on attempt {}'.format(max_tries + 1)
+    assert stacktrace is not None
+
+    policy.on_failure = ValueError
+    with pytest.raises(ValueError) as raised:
+        policy.call(FlakyFunction(10))
+
+    if not _policy.is_py2:
+        assert isinstance(raised.value.__cause__, ZeroDivisionError)
+
+
+@pytest.mark.parametrize("clock, error", [
+    (None, None),
+    (SteppingClock(0.0), None),
+    ('not-a-clock', TypeError),
+    (object(), TypeError),
+])
+def test_retry_policy_clock(clock, error):
+    """Test the ``clock`` accepted by :ref:`backoff_utils._policy.RetryPolicy`."""
+    if not error:
+        policy = RetryPolicy(clock = clock)
+        assert policy.clock is (clock or DEFAULT_CLOCK)
+    else:
+        with pytest.raises(error):
+            RetryPolicy(clock = clock)
+
+
+@pytest.mark.parametrize("readings, expected_calls", [
+    ((100.0, 100.0, 105.0, 109.9, 110.0), 3),
+    ((100.0, 100.0, 110.0), 1),
+    ((100.0, 100.0, 50.0, 60.0, 70.0), 4),
+])
+def test_retry_policy_timeout_uses_clock(readings, expected_calls):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` measures ``max_delay``
+    using its clock."""
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [0], jitter = False),
+                         max_tries = 3,
+                         max_delay = 10,
+                         catch_exceptions = ZeroDivisionError,
+                         on_failure = ValueError,
+                         clock = SteppingClock(*readings))
+    flaky = FlakyFunction(10)
+
+    with pytest.raises(ValueError):
+        policy.call(flaky)
+
+    assert flaky.calls == expected_calls
+
+
+@pytest.mark.parametrize("sequence, max_delay, cost, skip_late_attempt, expected_calls, expected_sleeps", [
+    (4, 10, 1, False, 3, [4.0, 4.0]),
+    (4, 10, 1, True, 2, [4.0]),
+    (64, 10, 0, False, 2, [10.0]),
+    (64, 10, 0, True, 1, []),
+    (1, 100, 0, False, 6, [1.0] * 5),
+])
+def test_retry_policy_clamps_delay_to_max_delay(sequence,
+                                                max_delay,
+                                                cost,
+                                                skip_late_attempt,
+                                                expected_calls,
+                                                expected_sleeps):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` never sleeps past
+    ``max_delay``."""
+    clock = VirtualClock()
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [sequence],
+                                                     jitter = False),
+                         max_tries = 5,
+                         max_delay = max_delay,
+                         catch_exceptions = ZeroDivisionError,
+                         on_failure = ValueError,
+                         clock = clock,
+                         skip_late_attempt = skip_late_attempt)
+    flaky = FlakyFunction(10)
+
+    def costly_flaky():
+        """Call ``flaky`` after spending ``cost`` seconds."""
+        clock.advance(cost)
+        return flaky()
+
+    with pytest.raises(ValueError):
+        policy.call(costly_flaky)
+
+    assert flaky.calls == expected_calls
+    assert clock.sleeps == expected_sleeps
+    assert clock.now() <= max_delay + cost
+
+
+def test_retry_policy_sleeper():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` waits using the
+    ``sleeper`` it was given, or else its clock's ``sleep()``."""
+    sleeps = []
+    clock = VirtualClock()
+
+    assert RetryPolicy().sleeper is None
+    assert RetryPolicy(clock = clock).sleeper == clock.sleep
+    assert RetryPolicy(clock = clock, sleeper = sleeps.append).sleeper == sleeps.append
+    with pytest.raises(TypeError):
+        RetryPolicy(sleeper = 'not-a-callable')
+
+    policy = RetryPolicy(strategy = strategies.Linear(jitter = False),
+                         max_tries = 3,
+                         catch_exceptions = ZeroDivisionError,
+                         sleeper = sleeps.append)
+    flaky = FlakyFunction(3)
+
+    assert policy.call(flaky, 'value') == (('value', ), {})
+    assert sleeps == [0.0, 1.0, 2.0]
+
+
+class HTTPError(IOError):
+    """Error carrying an HTTP ``status`` code."""
+
+    def __init__(self, status):
+        super(HTTPError, self).__init__('HTTP {}'.format(status))
+        self.status = status
+
+
+@pytest.mark.parametrize("catch_exceptions, expected, error", [
+    (None, (Exception, ), None),
+    (ZeroDivisionError, (ZeroDivisionError, ), None),
+    (type(ZeroDivisionError()), (ZeroDivisionError, ), None),
+    (ZeroDivisionError(), (ZeroDivisionError, ), None),
+    ([ValueError, type(KeyError())], (ValueError, KeyError), None),
+    ((ValueError, KeyError()), (ValueError, KeyError), None),
+    (set([ValueError]), (ValueError, ), None),
+
+    (type(ValueError), None, TypeError),
+    ([ValueError, 'KeyError'], None, TypeError),
+    ('ValueError', None, TypeError),
+    (123, None, TypeError),
+])
+def test_retry_policy_catch_exceptions(catch_exceptions, expected, error):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` accepts exception
+    classes, ``type(exception())`` values and exception instances as
+    ``catch_exceptions``."""
+    if not error:
+        policy = RetryPolicy(catch_exceptions = catch_exceptions)
+        assert policy.catch_exceptions == expected
+    else:
+        with pytest.raises(error):
+            RetryPolicy(catch_exceptions = catch_exceptions)
+
+
+@pytest.mark.parametrize("catch_exceptions, error, expected", [
+    (None, ZeroDivisionError(), True),
+    (None, KeyboardInterrupt(), False),
+    (ArithmeticError, ZeroDivisionError(), True),
+    (LookupError, KeyError(), True),
+    ((LookupError, ArithmeticError), ValueError(), False),
+    (IOError, HTTPError(503), True),
+    (HTTPError, IOError(), False),
+])
+def test_retry_policy_is_retryable(catch_exceptions, error, expected):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy.is_retryable` matches
+    subclasses of the ``catch_exceptions``, and caches its decision per type."""
+    policy = RetryPolicy(catch_exceptions = catch_exceptions)
+
+    assert policy.is_retryable(error) is expected
+    assert policy._decisions == {type(error): expected}
+    assert policy.is_retryable(error) is expected
+
+
+def test_retry_policy_giveup():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` gives up on the errors
+    for which ``giveup`` returns ``True``, without retrying them."""
+    with pytest.raises(TypeError):
+        RetryPolicy(giveup = 'not-a-callable')
+
+    checked = []
+
+    def is_client_error(error):
+        """Give up on 4xx errors."""
+        checked.append(error)
+        return error.status < 500
+
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 3,
+                         catch_exceptions = IOError,
+                         clock = VirtualClock(),
+                         giveup = is_client_error)
+
+    assert policy.is_retryable(HTTPError(503)) is True
+    assert policy.is_retryable(HTTPError(404)) is False
+    assert policy.is_retryable(ValueError()) is False
+    assert len(checked) == 2
+
+    flaky = FlakyFunction(10, error = lambda message: HTTPError(404))
+    with pytest.raises(HTTPError):
+        policy.call(flaky)
+    assert flaky.calls == 1
+
+    flaky = FlakyFunction(10, error = lambda message: HTTPError(503))
+    with pytest.raises(HTTPError):
+        policy.call(flaky)
+    assert flaky.calls == 4
+
+
+def test_retry_policy_retry_on_result():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` retries attempts whose
+    result is rejected by ``retry_on_result``, returning the last result if it
+    gives up."""
+    with pytest.raises(TypeError):
+        RetryPolicy(retry_on_result = 'not-a-callable')
+
+    successes = []
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 2,
+                         catch_exceptions = ZeroDivisionError,
+                         clock = VirtualClock(),
+                         on_success = successes.append,
+                         retry_on_result = lambda result: result == 503)
+    assert policy._needs_bookkeeping is True
+
+    results = iter([503, 503, 200])
+    assert policy.call(lambda: next(results)) == 200
+    assert successes == [200]
+
+    results = iter([503, 503, 503, 200])
+    assert policy.call(lambda: next(results)) == 503
+    assert successes == [200]
+
+    flaky = FlakyFunction(1)
+    assert policy.call(flaky, 'value') == (('value', ), {})
+    assert flaky.calls == 2
+
+
+def test_retry_policy_retry_on_result_events():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` reports attempts whose
+    result is rejected by ``retry_on_result`` as failed, and counts them as
+    failures with its circuit breaker."""
+    events = []
+    breaker = CircuitBreaker(failure_threshold = 2)
+    listener = RetryListener(on_attempt_end = events.append,
+                             on_giveup = events.append)
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 1,
+                         clock = VirtualClock(),
+                         circuit_breaker = breaker,
+                         listeners = listener,
+                         retry_on_result = lambda result: result is None)
+
+    assert policy.call(lambda: None) is None
+
+    assert [event.failed for event in events] == [True, True, True]
+    assert [event.value for event in events] == [None, None, None]
+    assert all(event.error is None for event in events)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    del events[:]
+    breaker.reset()
+    assert policy.call(lambda: 'value') == 'value'
+    assert [(event.failed, event.value) for event in events] == [(False, 'value')]
+
+
+class RateLimitedError(IOError):
+    """Error carrying the number of seconds the server asked to wait (if any)."""
+
+    def __init__(self, retry_after = None):
+        super(RateLimitedError, self).__init__('HTTP 429')
+        self.retry_after = retry_after
+
+
+@pytest.mark.parametrize("hints, overrides, expected_sleeps", [
+    ([10, None, 1], False, [10.0, 4.0, 4.0]),
+    ([10, None, 1], True, [10.0, 4.0, 1.0]),
+    ([-5, 0], True, [0.0, 0.0]),
+])
+def test_retry_policy_retry_after(hints, overrides, expected_sleeps):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` lengthens (or, if
+    ``retry_after_overrides`` is set, replaces) the strategy's delay with the
+    hint returned by ``retry_after``."""
+    clock = VirtualClock()
+    errors = iter([RateLimitedError(hint) for hint in hints])
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [4],
+                                                     jitter = False),
+                         max_tries = len(hints),
+                         catch_exceptions = IOError,
+                         clock = clock,
+                         retry_after = lambda error: error.retry_after,
+                         retry_after_overrides = overrides)
+
+    def rate_limited():
+        """Raise the next error, or return ``'value'`` once there are none left."""
+        for error in errors:
+            raise error
+        return 'value'
+
+    assert policy.call(rate_limited) == 'value'
+    assert clock.sleeps == expected_sleeps
+
+
+def test_retry_policy_retry_after_max_delay():
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` gives up rather than
+    retrying early when the hint returned by ``retry_after`` would overshoot
+    ``max_delay``, and passes it the values rejected by ``retry_on_result``."""
+    with pytest.raises(TypeError):
+        RetryPolicy(retry_after = 'not-a-callable')
+
+    clock = VirtualClock()
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 5,
+                         max_delay = 30,
+                         catch_exceptions = IOError,
+                         clock = clock,
+                         retry_after = lambda error: error.retry_after)
+
+    flaky = FlakyFunction(10, error = lambda message: RateLimitedError(60))
+    with pytest.raises(RateLimitedError):
+        policy.call(flaky)
+    assert flaky.calls == 1
+    assert clock.sleeps == []
+
+    hints = []
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 5,
+                         clock = clock,
+                         retry_on_result = lambda result: result[0] == 429,
+                         retry_after = lambda result: hints.append(result) or result[1])
+    results = iter([(429, 2), (200, None)])
+    assert policy.call(lambda: next(results)) == (200, None)
+    assert hints == [(429, 2)]
+    assert clock.sleeps == [2.0]
+
+    policy = RetryPolicy(max_tries = 1,
+                         clock = clock,
+                         retry_after = lambda error: 'soon')
+    with pytest.raises(TypeError):
+        policy.call(FlakyFunction(1))
+
+
+class HangingFunction(object):
+    """Callable that hangs (until ``release`` is set) for its first ``hangs``
+    calls, and otherwise returns ``'value'``."""
+
+    def __init__(self, hangs):
+        self.hangs = hangs
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.hangs:
+            self.release.wait()
+            return 'hung'
+
+        return 'value'
+
+
+@pytest.mark.parametrize("attempt_timeout, error", [
+    (0.05, None),
+    (1, None),
+    (strategies.Fixed, None),
+    (strategies.Fixed(sequence = [1, 2]), None),
+    (0, ValueError),
+    (-1, ValueError),
+    (True, TypeError),
+    (object(), TypeError),
+    (strategies.BackoffStrategy, TypeError),
+])
+def test_retry_policy_attempt_timeout_init(attempt_timeout, error):
+    """Test the validation of the ``attempt_timeout`` of
+    :ref:`backoff_utils._policy.RetryPolicy`."""
+    if error is None:
+        policy = RetryPolicy(attempt_timeout = attempt_timeout)
+        if isinstance(attempt_timeout, (int, float)):
+            assert policy.attempt_timeout == float(attempt_timeout)
+        else:
+            assert policy.attempt_timeout is attempt_timeout
+    else:
+        with pytest.raises(error):
+            RetryPolicy(attempt_timeout = attempt_timeout)
+
+
+@pytest.mark.parametrize("hangs, max_tries, expected_calls, raises", [
+    (0, 2, 1, False),
+    (2, 2, 3, False),
+    (3, 2, 3, True),
+])
+def test_retry_policy_attempt_timeout(hangs, max_tries, expected_calls, raises):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` abandons attempts that
+    exceed the ``attempt_timeout`` and retries them, even if the
+    :class:`AttemptTimeoutError` is not in ``catch_exceptions``."""
+    function = HangingFunction(hangs)
+    clock = VirtualClock()
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = max_tries,
+                         catch_exceptions = ValueError,
+                         clock = clock,
+                         attempt_timeout = 0.05)
+
+    try:
+        if raises:
+            with pytest.raises(AttemptTimeoutError):
+                policy.call(function)
+        else:
+            assert policy.call(function) == 'value'
+    finally:
+        function.release.set()
+
+    assert function.calls == expected_calls
+    assert clock.sleeps == [1.0] * (expected_calls - 1)
+    assert issubclass(AttemptTimeoutError, BackoffTimeoutError)
+
+
+def test_retry_policy_attempt_timeout_schedule(monkeypatch):
+    """Test that :ref:`backoff_utils._policy.RetryPolicy` applies the delays of a
+    strategy as escalating attempt timeouts, shortened to fit ``max_delay``."""
+    timeouts = []
+
+    def time_out(to_execute, args, kwargs, timeout):
+        """Record ``timeout`` and time the attempt out."""
+        timeouts.append(timeout)
+        raise AttemptTimeoutError('timed out')
+
+    monkeypatch.setattr(_policy, '_call_with_timeout', time_out)
+
+    clock = VirtualClock()
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 3,
+                         clock = clock,
+                         attempt_timeout = strategies.Fixed(sequence = [2, 4, 8],
+                                                            jitter = False))
+    with pytest.raises(AttemptTimeoutError):
+        policy.call(lambda: 'value')
+    assert timeouts == [2.0, 4.0, 8.0, 8.0]
+
+    del timeouts[:]
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 10,
+                         max_delay = 3.5,
+                         clock = clock,
+                         attempt_timeout = 10)
+    with pytest.raises(AttemptTimeoutError):
+        policy.call(lambda: 'value')
+    assert timeouts == [3.5, 2.5, 1.5, 0.5]
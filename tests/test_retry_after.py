@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._retry_after"""
+import time
+
+from email.utils import formatdate
+
+import pytest
+
+from backoff_utils._retry_after import parse_retry_after
+
+
+@pytest.mark.parametrize("value, timestamp, expected_result", [
+    ('120', False, 120.0),
+    (' 2.5 ', False, 2.5),
+    (30, False, 30.0),
+    ('-10', False, 0.0),
+    (formatdate(0, usegmt = True), False, 0.0),
+
+    (None, False, None),
+    ('', False, None),
+    ('soon', False, None),
+    ('nan', False, None),
+    ('inf', False, None),
+    (True, False, None),
+    ([1], False, None),
+    (0, True, 0.0),
+])
+def test_parse_retry_after(value, timestamp, expected_result):
+    """Test :ref:`backoff_utils._retry_after.parse_retry_after`."""
+    assert parse_retry_after(value, timestamp = timestamp) == expected_result
+
+
+def test_parse_retry_after_relative_to_now():
+    """Test that :ref:`backoff_utils._retry_after.parse_retry_after` measures
+    HTTP-dates and timestamps from the current time."""
+    reset_at = time.time() + 60
+
+    assert 55 < parse_retry_after(formatdate(reset_at, usegmt = True)) <= 60
+    assert 55 < parse_retry_after(str(reset_at), timestamp = True) <= 60
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._single_flight"""
+import pickle
+import threading
+import time
+
+import pytest
+
+from backoff_utils._backoff import backoff
+from backoff_utils._decorator import apply_backoff
+from backoff_utils._single_flight import SingleFlight, _get_single_flight
+
+from tests.conftest import make_policy
+
+
+class Interrupt(BaseException):
+    """Error that interrupts a call without giving it an outcome."""
+    pass
+
+
+class BlockingLoader(object):
+    """Callable that blocks until ``release`` is set, then raises ``error`` (if
+    any) or returns its arguments, counting how many times it has been called."""
+
+    def __init__(self, error = None):
+        self.release = threading.Event()
+        self.error = error
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self.lock:
+            self.calls += 1
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+
+        return args, kwargs
+
+
+def call_concurrently(single_flight, loader, calls, max_tries = 1):
+    """Make each of ``calls`` (pairs of positional and keyword arguments) to
+    ``loader`` under ``single_flight`` on its own thread, releasing ``loader``
+    once they have all been made, and return the value returned (or the error
+    raised) by each."""
+    policy = make_policy(max_tries = max_tries, single_flight = single_flight)
+    outcomes = [None] * len(calls)
+    calls_before = single_flight.calls
+
+    def make_call(index, args, kwargs):
+        try:
+            outcomes[index] = policy.call(loader, *args, **kwargs)
+        except BaseException as error:                                          # pylint: disable=broad-except
+            outcomes[index] = error
+
+    threads = [threading.Thread(target = make_call, args = (index, ) + call)
+               for index, call in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+
+    started_at = time.time()
+    while single_flight.calls < calls_before + len(calls) and \
+          time.time() - started_at < 5:
+        time.sleep(0.001)
+    loader.release.set()
+
+    for thread in threads:
+        thread.join(5)
+
+    return outcomes
+
+
+@pytest.mark.parametrize("value, expected, error", [
+    (None, None, None),
+    (False, None, None),
+    (True, SingleFlight, None),
+    (SingleFlight(), SingleFlight, None),
+    (123, None, TypeError),
+])
+def test_get_single_flight(value, expected, error):
+    """Test the :ref:`backoff_utils._single_flight._get_single_flight` function."""
+    if error:
+        with pytest.raises(error):
+            _get_single_flight(value)
+    elif expected is None:
+        assert _get_single_flight(value) is None
+    else:
+        assert isinstance(_get_single_flight(value), expected)
+
+    with pytest.raises(TypeError):
+        SingleFlight(key = 'not-a-callable')
+
+
+def test_single_flight_coalesces_calls():
+    """Test that :ref:`backoff_utils._single_flight.SingleFlight` runs concurrent
+    identical calls once, and shares the outcome with every caller."""
+    single_flight = SingleFlight()
+    loader = BlockingLoader()
+
+    outcomes = call_concurrently(single_flight,
+                                 loader,
+                                 [(('item',), {'fresh': True})] * 10)
+
+    assert loader.calls == 1
+    assert outcomes == [(('item',), {'fresh': True})] * 10
+    assert single_flight.calls == 10
+    assert single_flight.shared == 9
+    assert single_flight.in_flight == 0
+
+    loader.release.clear()
+    outcomes = call_concurrently(single_flight,
+                                 loader,
+                                 [(('item',), {'fresh': True})])
+    assert loader.calls == 2
+    assert outcomes == [(('item',), {'fresh': True})]
+    assert single_flight.shared == 9
+
+
+def test_single_flight_key():
+    """Test that :ref:`backoff_utils._single_flight.SingleFlight` only coalesces
+    calls which share a ``key``."""
+    loader = BlockingLoader()
+    calls = [(('a', 1), {}), (('a', 2), {}), (('b', 1), {})]
+
+    outcomes = call_concurrently(SingleFlight(), loader, calls)
+    assert loader.calls == 3
+    assert outcomes == [(args, kwargs) for args, kwargs in calls]
+
+    loader = BlockingLoader()
+    single_flight = SingleFlight(key = lambda name, version: name)
+    outcomes = call_concurrently(single_flight, loader, calls)
+    assert loader.calls == 2
+    assert outcomes[0] == outcomes[1]
+    assert outcomes[2] == (('b', 1), {})
+
+
+def test_single_flight_unhashable_key():
+    """Test that :ref:`backoff_utils._single_flight.SingleFlight` raises a
+    :class:`TypeError <python:TypeError>` naming the ``key`` option if calls
+    cannot be keyed on their arguments, or ``key`` returns an unhashable value."""
+    loader = BlockingLoader()
+    loader.release.set()
+
+    policy = make_policy(max_tries = 1, single_flight = SingleFlight())
+    with pytest.raises(TypeError) as error:
+        policy.call(loader, ['item'])
+    assert 'supply a key' in str(error.value)
+
+    policy = make_policy(max_tries = 1,
+                         single_flight = SingleFlight(key = list))
+    with pytest.raises(TypeError) as error:
+        policy.call(loader, ['item'])
+    assert 'key of a SingleFlight' in str(error.value)
+
+    single_flight = SingleFlight(key = lambda items: tuple(items))
+    policy = make_policy(max_tries = 1, single_flight = single_flight)
+    assert policy.call(loader, ['item']) == ((['item'],), {})
+    assert loader.calls == 1
+    assert single_flight.in_flight == 0
+
+
+def test_backoff_single_flight_true():
+    """Test that :ref:`backoff_utils._backoff.backoff` rejects
+    ``single_flight = True``, which could never coalesce anything."""
+    with pytest.raises(ValueError):
+        backoff(len, args = ['item'], single_flight = True)
+
+    assert backoff(len,
+                   args = ['item'],
+                   single_flight = SingleFlight()) == 4
+
+
+def test_single_flight_shares_error():
+    """Test that :ref:`backoff_utils._single_flight.SingleFlight` raises the error
+    raised by the call in flight in every caller, once it has given up."""
+    error = ZeroDivisionError('failed')
+    loader = BlockingLoader(error = error)
+
+    outcomes = call_concurrently(SingleFlight(),
+                                 loader,
+                                 [(('item',), {})] * 5,
+                                 max_tries = 2)
+
+    assert loader.calls == 3
+    assert outcomes == [error] * 5
+
+
+def test_single_flight_interrupted():
+    """Test that the followers of a call interrupted without an outcome make
+    their own calls."""
+    loader = BlockingLoader(error = Interrupt())
+
+    outcomes = call_concurrently(SingleFlight(),
+                                 loader,
+                                 [(('item',), {})] * 3)
+
+    assert loader.calls == 3
+    assert all(isinstance(outcome, Interrupt) for outcome in outcomes)
+
+
+def test_single_flight_decorator():
+    """Test that :ref:`backoff_utils._decorator.apply_backoff` applies a new
+    single-flight when passed ``single_flight = True``."""
+    loader = BlockingLoader()
+    loader.release.set()
+
+    decorated = apply_backoff(single_flight = True)(loader)
+    assert isinstance(decorated.retry_policy.single_flight, SingleFlight)
+    assert decorated('item') == (('item',), {})
+    assert decorated.retry_policy.single_flight.calls == 1
+
+
+def test_single_flight_named_and_pickle():
+    """Test that single-flights are shared by name, and that pickled
+    single-flights keep their configuration but not their calls in flight."""
+    single_flight = SingleFlight.named('test_single_flight_named',
+                                       key = len)
+    assert SingleFlight.named('test_single_flight_named') is single_flight
+    assert _get_single_flight('test_single_flight_named') is single_flight
+
+    single_flight._join('in-flight', object)                                    # pylint: disable=protected-access
+    assert single_flight.in_flight == 1
+
+    copied = pickle.loads(pickle.dumps(single_flight))
+    assert copied.key is len
+    assert copied.calls == 0
+    assert copied.in_flight == 0
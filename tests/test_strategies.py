@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils.strategies"""
+import copy
+import pickle
+import random
+import threading
+
+import pytest
+
+import backoff_utils.strategies as strategies
+
+
+def recursive_fibonacci(value):
+    """Reference implementation of the sequence used by
+    :class:`backoff_utils.strategies.Fibonacci`."""
+    if value < 1:
+        return 1
+
+    return recursive_fibonacci(value - 1) + recursive_fibonacci(value - 2)
+
+
+@pytest.mark.parametrize("attempt", list(range(-2, 20)))
+def test_fibonacci_sequence(attempt):
+    """Test that :ref:`backoff_utils.strategies.Fibonacci` returns the same
+    sequence as the recursive definition."""
+    strategy = strategies.Fibonacci(attempt = attempt)
+
+    assert strategy.time_to_sleep == recursive_fibonacci(attempt)
+    assert strategies.Fibonacci.compute(attempt, jitter = False) == \
+        float(recursive_fibonacci(attempt))
+
+
+def test_fibonacci_large_attempt():
+    """Test that :ref:`backoff_utils.strategies.Fibonacci` handles attempts far
+    beyond the recursion limit."""
+    expected = strategies.Fibonacci._get_sub_value(4999) + \
+               strategies.Fibonacci._get_sub_value(4998)
+
+    assert strategies.Fibonacci._get_sub_value(5000) == expected
+    assert strategies.Fibonacci(attempt = 5000).time_to_sleep == expected
+
+
+@pytest.mark.parametrize("strategy, count, kwargs, expected_result, error", [
+    (strategies.Exponential, 5, {'jitter': False}, [1.0, 2.0, 4.0, 8.0, 16.0], None),
+    (strategies.Exponential(jitter = False), 3, {}, [1.0, 2.0, 4.0], None),
+    (strategies.Exponential(jitter = False), 3, {'start': 2}, [4.0, 8.0, 16.0], None),
+    (strategies.Exponential(jitter = False, scale_factor = 0.5), 3, {}, [0.5, 1.0, 2.0], None),
+    (strategies.Exponential, 3, {'jitter': False, 'scale_factor': 3}, [3.0, 6.0, 12.0], None),
+    (strategies.Fibonacci(jitter = False), 5, {}, [1.0, 2.0, 3.0, 5.0, 8.0], None),
+    (strategies.Fixed(sequence = [2, 3], jitter = False), 4, {}, [2.0, 3.0, 3.0, 3.0], None),
+    (strategies.Fixed(jitter = False), 2, {}, [1.0, 1.0], None),
+    (strategies.Linear(jitter = False, minimum = 2), 4, {}, [2.0, 2.0, 2.0, 3.0], None),
+    (strategies.Linear, 3, {'jitter': False, 'minimum': 1.5}, [1.5, 1.5, 2.0], None),
+    (strategies.Polynomial(exponent = 2, jitter = False), 3, {'start': 1}, [1.0, 4.0, 9.0], None),
+    (strategies.Exponential(jitter = False, max_single_delay = 5), 5, {}, [1.0, 2.0, 4.0, 5.0, 5.0], None),
+    (strategies.Fixed(sequence = [1, 9], jitter = False), 3, {'max_single_delay': 3}, [1.0, 3.0, 3.0], None),
+    (strategies.Linear(jitter = False, minimum = 4, max_single_delay = 3), 2, {}, [3.0, 3.0], None),
+    (strategies.Exponential, 2, {'max_single_delay': -1}, None, ValueError),
+    (strategies.Exponential, 0, {}, [], None),
+    (strategies.Exponential, -1, {}, None, ValueError),
+    (strategies.Exponential, 'invalid-value', {}, None, TypeError),
+])
+def test_delays(strategy, count, kwargs, expected_result, error):
+    """Test the :ref:`backoff_utils.strategies.BackoffStrategy.delays` method."""
+    if not error:
+        result = strategy.delays(count, **kwargs)
+        assert result == expected_result
+    else:
+        with pytest.raises(error):
+            strategy.delays(count, **kwargs)
+
+
+@pytest.mark.parametrize("strategy", [
+    strategies.Exponential,
+    strategies.Exponential(),
+    strategies.Fibonacci(scale_factor = 2),
+    strategies.Linear(minimum = 3),
+])
+def test_schedule_jitter(strategy):
+    """Test that :ref:`backoff_utils.strategies.BackoffStrategy.schedule` applies
+    jitter to each delay."""
+    schedule = strategy.schedule()
+    baseline = strategy.schedule(jitter = False)
+    scale_factor = 1.0 if isinstance(strategy, type) else strategy.scale_factor
+
+    for _ in range(10):
+        delay = next(schedule)
+        base_delay = next(baseline)
+        assert base_delay <= delay < base_delay + scale_factor
+
+
+def test_schedule_does_not_modify_strategy():
+    """Test that consuming a schedule does not change the strategy, and that
+    schedules are independent of one another."""
+    strategy = strategies.Exponential(jitter = False)
+    first = strategy.schedule()
+    second = strategy.schedule()
+
+    assert [next(first) for _ in range(3)] == [1.0, 2.0, 4.0]
+    assert next(second) == 1.0
+    assert next(first) == 8.0
+    assert strategy.attempt is None
+
+
+def test_max_single_delay_validation():
+    """Test that ``max_single_delay`` cannot be negative."""
+    with pytest.raises(ValueError):
+        strategies.Exponential(max_single_delay = -1)
+
+
+@pytest.mark.parametrize("strategy", [
+    strategies.Exponential(jitter = False, max_single_delay = 60),
+    strategies.Exponential(max_single_delay = 60),
+    strategies.Fibonacci(max_single_delay = 60),
+    strategies.Polynomial(exponent = 2.5, max_single_delay = 60),
+    strategies.FullJitter(max_single_delay = 60),
+    strategies.EqualJitter(max_single_delay = 60),
+])
+@pytest.mark.parametrize("start", [1023, 1475, 10**6])
+def test_max_single_delay_large_attempt(strategy, start):
+    """Test that ``max_single_delay`` bounds the delays of attempts whose base
+    delay is too large to represent as a float."""
+    delays = strategy.delays(3, start = start)
+
+    assert len(delays) == 3
+    for delay in delays:
+        assert 0 <= delay <= 60
+
+    assert strategy.compute(start) <= 60
+
+
+@pytest.mark.parametrize("strategy, lower, upper", [
+    (strategies.FullJitter(), lambda a: 0.0, lambda a: 2.0**a),
+    (strategies.FullJitter(scale_factor = 0.5), lambda a: 0.0, lambda a: 0.5 * 2**a),
+    (strategies.FullJitter(max_single_delay = 10), lambda a: 0.0, lambda a: min(10.0, 2.0**a)),
+    (strategies.FullJitter(minimum = 1), lambda a: 1.0, lambda a: max(1.0, 2.0**a)),
+    (strategies.EqualJitter(), lambda a: 2.0**a / 2, lambda a: 2.0**a),
+    (strategies.EqualJitter(max_single_delay = 10), lambda a: min(10.0, 2.0**a) / 2,
+     lambda a: min(10.0, 2.0**a)),
+])
+def test_exponential_jitter_bounds(strategy, lower, upper):
+    """Test that :ref:`backoff_utils.strategies.FullJitter` and
+    :ref:`backoff_utils.strategies.EqualJitter` randomize each delay within the
+    exponential delay."""
+    for _ in range(50):
+        for attempt, delay in enumerate(strategy.delays(10)):
+            assert lower(attempt) <= delay <= upper(attempt)
+
+
+def test_exponential_jitter_spreads_delays():
+    """Test that the randomness of :ref:`backoff_utils.strategies.FullJitter`
+    scales with the delay, rather than being limited to one second."""
+    delays = [strategies.FullJitter.compute(8) for _ in range(200)]
+
+    assert max(delays) - min(delays) > 100
+
+
+@pytest.mark.parametrize("strategy, cap", [
+    (strategies.DecorrelatedJitter(), None),
+    (strategies.DecorrelatedJitter(scale_factor = 0.1), None),
+    (strategies.DecorrelatedJitter(max_single_delay = 20), 20),
+])
+def test_decorrelated_jitter(strategy, cap):
+    """Test that each delay applied by
+    :ref:`backoff_utils.strategies.DecorrelatedJitter` lies between the base delay
+    and three times the previous delay."""
+    base = strategy.scale_factor
+    for _ in range(50):
+        previous = base
+        for delay in strategy.delays(15):
+            upper = previous * 3 if cap is None else min(cap, previous * 3)
+            assert min(base, upper) <= delay <= upper
+            previous = delay
+
+
+@pytest.mark.parametrize("strategy_class", [
+    strategies.Exponential,
+    strategies.Fixed,
+    strategies.FullJitter,
+    strategies.EqualJitter,
+    strategies.DecorrelatedJitter,
+])
+def test_schedule_seed(strategy_class):
+    """Test that every schedule of a strategy given a ``seed`` yields the same
+    delays."""
+    strategy = strategy_class(seed = 42, jitter = True)
+
+    assert strategy.delays(8) == strategy.delays(8)
+    assert strategy_class(seed = 42, jitter = True).delays(8) == strategy.delays(8)
+    assert strategy_class(seed = 43, jitter = True).delays(8) != strategy.delays(8)
+
+
+def test_schedule_rng():
+    """Test that a strategy given an ``rng`` randomizes its delays with it."""
+    strategy = strategies.Exponential(rng = random.Random(7))
+    expected_rng = random.Random(7)
+
+    assert strategy.delays(3) == [2**attempt + expected_rng.random()
+                                  for attempt in range(3)]
+    assert strategy.delays(3) == [2**attempt + expected_rng.random()
+                                  for attempt in range(3)]
+
+
+def test_thread_rng():
+    """Test that each thread randomizes delays using a generator of its own."""
+    rngs = []
+    thread = threading.Thread(target = lambda: rngs.append(strategies._thread_rng()))
+    thread.start()
+    thread.join()
+
+    assert strategies._thread_rng() is strategies._thread_rng()
+    assert rngs[0] is not strategies._thread_rng()
+
+
+@pytest.mark.parametrize("rng, seed, error", [
+    (None, None, None),
+    (random.Random(), None, None),
+    (None, 'incident-1234', None),
+    (random.Random(), 42, ValueError),
+    ('not-an-rng', None, TypeError),
+])
+def test_rng_validation(rng, seed, error):
+    """Test that strategies validate their ``rng`` and ``seed``."""
+    if not error:
+        strategy = strategies.Linear(rng = rng, seed = seed)
+        assert strategy.seed == seed
+        if rng is not None:
+            assert strategy.rng is rng
+    else:
+        with pytest.raises(error):
+            strategies.Linear(rng = rng, seed = seed)
+
+
+class CustomStrategy(strategies.BackoffStrategy):
+    """Strategy that only defines ``time_to_sleep``."""
+
+    @property
+    def time_to_sleep(self):
+        return self.attempt * 10
+
+
+@pytest.mark.parametrize("strategy", [
+    strategies.Exponential(),
+    strategies.Fixed(sequence = [1, 2]),
+    strategies.Polynomial(exponent = 2),
+    strategies.DecorrelatedJitter(),
+    strategies.Adaptive(),
+    CustomStrategy(),
+])
+def test_strategies_are_immutable(strategy):
+    """Test that a strategy's configuration cannot be changed once it has been
+    instantiated."""
+    with pytest.raises(AttributeError):
+        strategy.jitter = False
+    with pytest.raises(AttributeError):
+        strategy.attempt = 3
+
+    if not isinstance(strategy, CustomStrategy):
+        assert not hasattr(strategy, '__dict__')
+
+
+@pytest.mark.parametrize("strategy, attempt, expected_result", [
+    (strategies.Exponential(jitter = False, scale_factor = 0.5), 3, 4.0),
+    (strategies.Fixed(sequence = [1, 2], jitter = False), 5, 2.0),
+    (strategies.Polynomial(exponent = 2, jitter = False, minimum = 10), 2, 10.0),
+    (strategies.Linear(jitter = False, max_single_delay = 3), 4, 3.0),
+    (CustomStrategy(jitter = False), 2, 20.0),
+])
+def test_compute_applies_instance_configuration(strategy, attempt, expected_result):
+    """Test that :ref:`backoff_utils.strategies.BackoffStrategy.compute` applies
+    the configuration of the instance it is called on, without modifying it."""
+    assert strategy.compute(attempt) == expected_result
+    assert strategy.attempt is None
+    assert strategy.jitter is False
+    assert CustomStrategy(jitter = False).delays(3, start = 1) == [10.0, 20.0, 30.0]
+
+
+def test_strategy_shared_between_threads():
+    """Test that a single strategy instance can be used by many threads at
+    once."""
+    strategy = strategies.Exponential(jitter = False)
+    errors = []
+
+    def compute():
+        """Compute the delay of every attempt many times."""
+        for _ in range(200):
+            for attempt in range(10):
+                if strategy.compute(attempt) != 2.0**attempt:
+                    errors.append(attempt)
+
+    threads = [threading.Thread(target = compute) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+
+
+@pytest.mark.parametrize("strategy", [
+    strategies.Exponential(jitter = False, max_single_delay = 10),
+    strategies.Fixed(sequence = [3, 1], jitter = False),
+    strategies.Polynomial(exponent = 3, jitter = False),
+    strategies.FullJitter(seed = 42),
+    strategies.Adaptive(),
+])
+def test_strategy_copy_and_pickle(strategy):
+    """Test that strategies can be copied and pickled."""
+    for copied in [copy.copy(strategy),
+                   copy.deepcopy(strategy),
+                   pickle.loads(pickle.dumps(strategy))]:
+        assert type(copied) is type(strategy)
+        assert copied.delays(5) == strategy.delays(5)
+        with pytest.raises(AttributeError):
+            copied.jitter = True
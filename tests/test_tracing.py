@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+"""Tests for backoff_utils._tracing"""
+import pytest
+
+import backoff_utils.strategies as strategies
+
+from backoff_utils._clock import VirtualClock
+from backoff_utils._policy import RetryPolicy
+from backoff_utils._tracing import TracingListener
+
+from tests.conftest import make_policy
+
+pytest.importorskip('opentelemetry.sdk')
+
+from opentelemetry.sdk.trace import TracerProvider                              # pylint: disable=wrong-import-position
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor                  # pylint: disable=wrong-import-position
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import \
+    InMemorySpanExporter                                                        # pylint: disable=wrong-import-position
+from opentelemetry.trace import StatusCode                                      # pylint: disable=wrong-import-position
+
+
+@pytest.fixture
+def exporter():
+    """Return an exporter that keeps the spans finished by ``tracer`` in memory."""
+    return InMemorySpanExporter()
+
+
+@pytest.fixture
+def tracer(exporter):                                                           # pylint: disable=redefined-outer-name
+    """Return a tracer whose spans are exported to ``exporter``."""
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+
+    return provider.get_tracer('test_tracing')
+
+
+class Flaky(object):
+    """Callable that raises ``error`` for its first ``failures`` calls, starting a
+    span of its own on each call."""
+
+    def __init__(self, tracer, failures, error = ZeroDivisionError):            # pylint: disable=redefined-outer-name
+        self.tracer = tracer
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        with self.tracer.start_as_current_span('inner'):
+            if self.calls <= self.failures:
+                raise self.error('failure {}'.format(self.calls))
+
+        return 'value'
+
+
+def test_tracing_listener_init(tracer):                                         # pylint: disable=redefined-outer-name
+    """Test the :ref:`backoff_utils._tracing.TracingListener` constructor."""
+    assert TracingListener(tracer = tracer).tracer is tracer
+    assert TracingListener().tracer is not None
+
+    with pytest.raises(TypeError):
+        TracingListener(tracer = 'not-a-tracer')
+
+
+def test_tracing_spans(tracer, exporter):                                       # pylint: disable=redefined-outer-name
+    """Test that :ref:`backoff_utils._tracing.TracingListener` records a span per
+    call, with child spans for each attempt and each sleep."""
+    policy = make_policy(listeners = TracingListener(tracer = tracer))
+    assert policy.call(Flaky(tracer, failures = 2)) == 'value'
+
+    spans = exporter.get_finished_spans()
+    by_name = {}
+    for span in spans:
+        by_name.setdefault(span.name, []).append(span)
+
+    call = by_name['backoff {}.Flaky'.format(__name__)]
+    assert len(call) == 1
+    call = call[0]
+    assert call.attributes['backoff.function'] == '{}.Flaky'.format(__name__)
+    assert call.attributes['backoff.strategy'] == 'Fixed'
+    assert call.attributes['backoff.attempts'] == 3
+    assert call.status.status_code != StatusCode.ERROR
+
+    attempts = by_name['backoff.attempt']
+    sleeps = by_name['backoff.sleep']
+    assert [span.attributes['backoff.attempt'] for span in attempts] == [1, 2, 3]
+    assert [span.attributes['backoff.delay'] for span in sleeps] == [1, 2]
+    assert [span.attributes['backoff.attempt'] for span in sleeps] == [1, 2]
+
+    for span in attempts + sleeps:
+        assert span.parent.span_id == call.context.span_id
+        assert span.context.trace_id == call.context.trace_id
+
+    assert [span.status.status_code for span in attempts] == [StatusCode.ERROR,
+                                                              StatusCode.ERROR,
+                                                              StatusCode.UNSET]
+    assert attempts[0].events[0].name == 'exception'
+
+    inner = by_name['inner']
+    assert [span.parent.span_id for span in inner] == \
+        [span.context.span_id for span in attempts]
+
+
+@pytest.mark.parametrize("error, max_tries, expected_attempts", [
+    (ZeroDivisionError, 1, 2),
+    (ValueError, 5, 1),
+])
+def test_tracing_giveup(tracer, exporter, error, max_tries, expected_attempts):  # pylint: disable=redefined-outer-name
+    """Test that :ref:`backoff_utils._tracing.TracingListener` ends the call's span
+    with an error when the call gives up."""
+    policy = make_policy(max_tries = max_tries,
+                         listeners = TracingListener(tracer = tracer))
+    with pytest.raises(error):
+        policy.call(Flaky(tracer, failures = 10, error = error))
+
+    call = [span for span in exporter.get_finished_spans()
+            if span.name.startswith('backoff ')]
+    assert len(call) == 1
+    assert call[0].attributes['backoff.attempts'] == expected_attempts
+    assert call[0].status.status_code == StatusCode.ERROR
+
+    sleeps = [span for span in exporter.get_finished_spans()
+              if span.name == 'backoff.sleep']
+    assert len(sleeps) == expected_attempts - 1
+
+
+def test_tracing_nested_under_current_span(tracer, exporter):                   # pylint: disable=redefined-outer-name
+    """Test that :ref:`backoff_utils._tracing.TracingListener` nests the call's
+    span within the current span, and restores the current span afterwards."""
+    policy = make_policy(listeners = TracingListener(tracer = tracer))
+    with tracer.start_as_current_span('outer') as outer:
+        policy.call(Flaky(tracer, failures = 1))
+        with tracer.start_as_current_span('after') as after:
+            pass
+
+    call = [span for span in exporter.get_finished_spans()
+            if span.name.startswith('backoff ')][0]
+    assert call.parent.span_id == outer.get_span_context().span_id
+    assert after.parent.span_id == outer.get_span_context().span_id
+
+
+def test_tracing_rejected_result(tracer, exporter):                             # pylint: disable=redefined-outer-name
+    """Test that :ref:`backoff_utils._tracing.TracingListener` marks attempts
+    whose result is rejected by ``retry_on_result`` as failed."""
+    results = iter([None, 'value'])
+    policy = RetryPolicy(strategy = strategies.Fixed(sequence = [1],
+                                                     jitter = False),
+                         max_tries = 3,
+                         clock = VirtualClock(),
+                         listeners = TracingListener(tracer = tracer),
+                         retry_on_result = lambda result: result is None)
+
+    assert policy.call(lambda: next(results)) == 'value'
+
+    spans = exporter.get_finished_spans()
+    attempts = [span for span in spans if span.name == 'backoff.attempt']
+    call = [span for span in spans if span.name.startswith('backoff ')]
+    assert [span.status.status_code for span in attempts] == [StatusCode.ERROR,
+                                                              StatusCode.UNSET]
+    assert len(call) == 1
+    assert call[0].attributes['backoff.attempts'] == 2